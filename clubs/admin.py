@@ -1,20 +1,64 @@
-from django.contrib import admin
-from .models import Club, Member, Poll, PollOption, Vote
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .imports import IMPORT_BATCH_SIZE, import_members, read_member_rows
+from .models import ArchivedVote, Club, Job, Member, Poll, PollOption, Vote
+
+class MemberImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV rows of username,club,role or JSONL objects with those keys. club is a club id or exact name.')
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSONL')])
+    batch_size = forms.IntegerField(min_value=1, initial=IMPORT_BATCH_SIZE)
 
 @admin.register(Club)
 class ClubAdmin(admin.ModelAdmin):
-    list_display = ('name', 'creator', 'created_at')
+    list_display = ('name', 'creator', 'created_at', 'deleted_at')
     search_fields = ('name', 'description')
 
+    def get_queryset(self, request):
+        # Show clubs that are still being purged too
+        return Club.all_objects.select_related('creator')
+
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
     list_display = ('user', 'club', 'role', 'joined_at')
     list_filter = ('role', 'joined_at')
     search_fields = ('user__username', 'club__name')
+    change_list_template = 'admin/clubs/member/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_members_view), name='clubs_member_import'),
+        ] + super().get_urls()
+
+    def import_members_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:clubs_member_changelist')
+        form = MemberImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            stream = io.TextIOWrapper(form.cleaned_data['file'], encoding='utf-8', newline='')
+            result = import_members(
+                read_member_rows(stream, form.cleaned_data['format']),
+                batch_size=form.cleaned_data['batch_size'],
+            )
+            self.message_user(request, result.summary(), messages.SUCCESS if not result.error_count else messages.WARNING)
+            for error in result.errors:
+                self.message_user(request, error, messages.ERROR)
+            return redirect('admin:clubs_member_changelist')
+        return TemplateResponse(request, 'admin/clubs/member/import_members.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import members',
+        })
 
 @admin.register(Poll)
 class PollAdmin(admin.ModelAdmin):
-    list_display = ('title', 'club', 'created_by', 'created_at', 'end_date', 'is_active')
+    list_display = ('title', 'club', 'created_by', 'created_at', 'end_date', 'is_active', 'closed_at')
     list_filter = ('created_at', 'end_date')
     search_fields = ('title', 'description')
 
@@ -28,3 +72,14 @@ class VoteAdmin(admin.ModelAdmin):
     list_display = ('user', 'poll', 'option', 'voted_at')
     list_filter = ('voted_at',)
     search_fields = ('user__username', 'poll__title')
+
+@admin.register(ArchivedVote)
+class ArchivedVoteAdmin(admin.ModelAdmin):
+    list_display = ('user', 'poll', 'option', 'voted_at')
+    search_fields = ('user__username', 'poll__title')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('name', 'payload', 'attempts', 'locked_at', 'progress', 'last_error', 'created_at', 'finished_at')
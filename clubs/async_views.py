@@ -0,0 +1,179 @@
+"""
+Async versions of the read-heavy views, used when the site is served over ASGI.
+
+student_club.urls routes to these instead of clubs.views when
+CLUB_ASYNC_VIEWS is on, which student_club/asgi.py turns on by default.
+Queries go through the async ORM, fuzzy scoring runs on a small thread pool
+so it doesn't stall the event loop, and templates are rendered in a worker
+thread because the session, messages and user in their context load lazily
+through the sync ORM.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render
+
+from . import views
+from .instrumentation import timed
+from .live import aevent_stream
+from .membership import club_role
+from .models import Club, Poll
+from .polls import aget_poll_results
+from .views import (
+    PROPOSALS_PER_PAGE,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    _club_json,
+    _club_proposals,
+    _continues_fallback,
+    _decode_search_cursor,
+    _keyset_queryset,
+    _proposal_sort,
+    _rerank_size,
+    _search_backend,
+    _search_cursor,
+    _search_results,
+    _substring_matches,
+    _use_fallback,
+    _voted_proposal_ids,
+    _wants_json,
+)
+
+logger = logging.getLogger(__name__)
+
+# Threads available for fuzzy scoring; the in-memory index is per process,
+# so scoring stays in threads rather than worker processes
+SCORING_WORKERS = 4
+
+_scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix='clubs-search')
+
+
+async def _score(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_scoring_executor, partial(func, *args, **kwargs))
+
+
+async def _resolve_user(request):
+    # request.auser() and the lazy request.user cache the user separately;
+    # load it once so club_role and the templates don't query for it again
+    request.user = await request.auser()
+
+
+async def _search_clubs(search_query, after=None, limit=None, rerank=0):
+    """Async version of clubs.views._search_clubs"""
+    if not search_query:
+        return [club async for club in _keyset_queryset(Club.objects.all(), after, None)[:limit]]
+
+    club_ids = ranks = None
+    if not _continues_fallback(after):
+        try:
+            with timed('search'):
+                if settings.CLUB_SEARCH_BACKEND == 'fts':
+                    club_ids, ranks = await sync_to_async(_search_backend)(search_query, after, limit)
+                else:
+                    from .search import club_index
+
+                    # Building the index queries the database, so it happens on the
+                    # ORM's thread; scoring against the built index doesn't
+                    await sync_to_async(club_index.ensure_built)()
+                    club_ids, ranks = await _score(_search_backend, search_query, after, limit)
+        except Exception:
+            logger.exception('Search failed, falling back to a substring search')
+
+    if _use_fallback(club_ids, after):
+        clubs = _keyset_queryset(_substring_matches(search_query), after)
+        return [club async for club in clubs[:limit]]
+    clubs_by_id = await Club.objects.ain_bulk(club_ids)
+    return await _score(_search_results, clubs_by_id, club_ids, ranks, search_query, _rerank_size(after, rerank))
+
+
+async def _club_search_response(request, search_query):
+    """Async version of clubs.views._club_search_response"""
+    try:
+        limit = int(request.GET.get('limit', SEARCH_PAGE_SIZE))
+        after = _decode_search_cursor(request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit or cursor.'}, status=400)
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    snippet = request.GET.get('snippet', '').lower() in ('1', 'true', 'yes')
+
+    clubs = await _search_clubs(search_query, after=after, limit=limit + 1, rerank=limit)
+    next_cursor = _search_cursor(clubs[:limit]) if len(clubs) > limit else None
+    return JsonResponse({'clubs': _club_json(clubs[:limit], snippet), 'next': next_cursor})
+
+
+async def club_search(request):
+    search_query = request.GET.get('q', '').strip()
+    return await _club_search_response(request, search_query)
+
+
+async def club_list(request):
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return await _club_search_response(request, request.GET.get('q', '').strip())
+    # The full page is rendered by the sync view
+    return await sync_to_async(views.club_list)(request)
+
+
+@login_required
+async def proposal_list(request, club_id):
+    await _resolve_user(request)
+    club = await aget_object_or_404(Club, id=club_id)
+    role = await sync_to_async(club_role)(request, club.id)
+    is_member = role is not None
+    is_admin = role == 'ADMIN'
+
+    sort = _proposal_sort(request)
+    proposals = _club_proposals(club, sort)
+    paginator = Paginator(proposals, PROPOSALS_PER_PAGE)
+    # Paginator counts through the sync ORM; give it the count up front
+    paginator.count = await proposals.acount()
+    page = paginator.get_page(request.GET.get('page'))
+    page.object_list = [proposal async for proposal in page.object_list]
+
+    user_voted = set()
+    if is_member:
+        user_voted = {proposal_id async for proposal_id in _voted_proposal_ids(request.user, page)}
+
+    return await sync_to_async(render)(request, 'clubs/proposal_list.html', {
+        'club': club,
+        'proposals': page,
+        'is_member': is_member,
+        'is_admin': is_admin,
+        'user_voted': user_voted,
+        'sort': sort,
+        'live_updates': True
+    })
+
+
+@login_required
+async def club_events(request, club_id):
+    club = await aget_object_or_404(Club, id=club_id)
+    response = StreamingHttpResponse(aevent_stream(club.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+async def poll_results(request, poll_id):
+    await _resolve_user(request)
+    poll = await aget_object_or_404(Poll.objects.select_related('club'), id=poll_id, club__deleted_at__isnull=True)
+    results = await aget_poll_results(poll)
+
+    if _wants_json(request) or request.GET.get('format') == 'json':
+        return JsonResponse(results)
+
+    return await sync_to_async(render)(request, 'clubs/poll_results.html', {
+        'club': poll.club,
+        'poll': poll,
+        'results': results,
+        'live_updates': True
+    })
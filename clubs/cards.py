@@ -0,0 +1,57 @@
+"""
+Cached club cards for the home page.
+
+A club's card looks the same to every member, so the rendered card is cached
+once per club, and each user gets a cached list of the clubs they belong to.
+Member and Club signals clear exactly the entries a change affects, so a
+warm home page is built from the cache without touching the database.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Club, Member
+
+HOME_CACHE_TIMEOUT = 60 * 60
+
+
+def _user_clubs_key(user_id):
+    return f'clubs:home-clubs:{user_id}'
+
+
+def _card_key(club_id):
+    return f'clubs:card:{club_id}'
+
+
+def home_club_cards(user):
+    """Return the rendered cards for the user's clubs, ordered by name and then newest first"""
+    club_ids = cache.get(_user_clubs_key(user.id))
+    if club_ids is None:
+        # Members of a deleted club keep their rows until it is purged
+        club_ids = list(
+            Member.objects.filter(user=user, club__deleted_at__isnull=True).values_list('club_id', flat=True)
+        )
+        cache.set(_user_clubs_key(user.id), club_ids, HOME_CACHE_TIMEOUT)
+
+    keys = {club_id: _card_key(club_id) for club_id in club_ids}
+    cards = cache.get_many(keys.values())
+    missing = [club_id for club_id, key in keys.items() if key not in cards]
+    if missing:
+        fresh = {}
+        clubs = Club.objects.filter(id__in=missing).annotate(member_count=Count('member'))
+        for club in clubs:
+            html = render_to_string('clubs/club_card.html', {'club': club})
+            fresh[_card_key(club.id)] = (club.name, -club.created_at.timestamp(), html)
+        cache.set_many(fresh, HOME_CACHE_TIMEOUT)
+        cards.update(fresh)
+
+    return [mark_safe(html) for _, _, html in sorted(cards.values(), key=lambda card: card[:2])]
+
+
+def forget_home_cards(user_ids=(), club_ids=()):
+    """Clear the club lists of user_ids and the cards of club_ids"""
+    cache.delete_many(
+        [_user_clubs_key(user_id) for user_id in set(user_ids)]
+        + [_card_key(club_id) for club_id in set(club_ids)]
+    )
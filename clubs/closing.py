@@ -0,0 +1,72 @@
+"""
+Closing polls once they have ended.
+
+close_due_polls(), run by `manage.py close_polls`, finds polls whose end
+date passed more than CLOSE_GRACE ago. It first stores each poll's final
+results on the poll. Then it moves the poll's votes from Vote to
+ArchivedVote, ARCHIVE_BATCH_SIZE rows per transaction, so the Vote table and
+its indexes only hold votes that can still change. Results of a closed poll
+are read from the stored snapshot. A run that stops part way leaves the poll
+open and the next run finishes it.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedVote, Poll, Vote
+from .polls import forget_poll_results, snapshot_results
+
+logger = logging.getLogger(__name__)
+
+# Votes moved to the archive per transaction
+ARCHIVE_BATCH_SIZE = 1000
+
+# How long after its end date a poll is closed, so a vote whose request
+# started just before the end is in before the results are frozen
+CLOSE_GRACE = timedelta(minutes=1)
+
+
+def due_polls(now=None):
+    """Polls that have ended but whose votes have not been archived"""
+    ended_before = (now or timezone.now()) - CLOSE_GRACE
+    return Poll.objects.filter(closed_at__isnull=True, end_date__lte=ended_before, club__deleted_at__isnull=True)
+
+
+def close_poll(poll, batch_size=ARCHIVE_BATCH_SIZE):
+    """Store the poll's final results and archive its votes; returns the number of votes moved"""
+    if poll.final_results is None:
+        poll.final_results = snapshot_results(poll)
+        poll.save(update_fields=['final_results'])
+
+    moved = 0
+    votes = Vote.objects.filter(poll=poll).order_by('id').values_list('id', 'option_id', 'user_id', 'voted_at')
+    while True:
+        with transaction.atomic():
+            batch = list(votes[:batch_size])
+            if batch:
+                # Archived votes keep their ids, so a vote can be traced across the move
+                ArchivedVote.objects.bulk_create(
+                    ArchivedVote(id=vote_id, poll_id=poll.id, option_id=option_id, user_id=user_id, voted_at=voted_at)
+                    for vote_id, option_id, user_id, voted_at in batch
+                )
+                Vote.objects.filter(id__in=[vote_id for vote_id, _, _, _ in batch]).delete()
+        if not batch:
+            break
+        moved += len(batch)
+
+    poll.closed_at = timezone.now()
+    poll.save(update_fields=['closed_at'])
+    forget_poll_results(poll.id)
+    return moved
+
+
+def close_due_polls(batch_size=ARCHIVE_BATCH_SIZE, limit=None):
+    """Close every due poll, oldest first, up to limit; returns (poll, votes moved) pairs"""
+    closed = []
+    for poll in list(due_polls().order_by('end_date', 'id')[:limit]):
+        moved = close_poll(poll, batch_size)
+        logger.info('Closed poll %s and archived %s vote(s)', poll.id, moved)
+        closed.append((poll, moved))
+    return closed
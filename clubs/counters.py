@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Rows reconciled per transaction, so the write lock is released between batches
+RECONCILE_BATCH_SIZE = 1000
+
+# Seconds member and proposal counts stay cached; Member and Proposal signals
+# clear them sooner
+CLUB_COUNTS_CACHE_TIMEOUT = 60 * 60
+
+
+def _club_counts_key(club_id):
+    return f'clubs:counts:{club_id}'
+
+
+def club_counts(club_id):
+    """Return the club's member and proposal counts, cached between requests"""
+    from .models import Member, Proposal
+
+    key = _club_counts_key(club_id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = {
+            'members': Member.objects.filter(club_id=club_id).count(),
+            'proposals': Proposal.objects.filter(club_id=club_id).count(),
+        }
+        cache.set(key, counts, CLUB_COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+def forget_club_counts(*club_ids):
+    cache.delete_many([_club_counts_key(club_id) for club_id in club_ids])
+
+
+def _actual_count(vote_model, fk_name):
+    votes = (
+        vote_model.objects.filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(votes), 0)
+
+
+def reconcile_vote_counts(model, vote_model, fk_name, batch_size=RECONCILE_BATCH_SIZE, rows=None):
+    """
+    Reset model.vote_count to the number of vote_model rows pointing at each row.
+
+    Rows are walked in primary key batches, one transaction per batch, and
+    only rows whose stored count has drifted are written. rows limits the
+    check to a queryset of model. Returns the number of rows that were
+    corrected.
+    """
+    if rows is None:
+        rows = model.objects.all()
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            rows.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return fixed
+        with transaction.atomic():
+            fixed += (
+                rows.filter(pk__gt=last_pk, pk__lte=batch[-1])
+                .annotate(actual=_actual_count(vote_model, fk_name))
+                .exclude(vote_count=F('actual'))
+                .update(vote_count=_actual_count(vote_model, fk_name))
+            )
+        last_pk = batch[-1]
+
+
+def record_vote(vote, counted):
+    """
+    Save a new vote and add it to counted.vote_count in one transaction.
+
+    The unique constraint on the vote table decides whether the user has
+    voted already, so there is no separate check to race against: the
+    INSERT either succeeds or fails and nothing is changed. Returns whether
+    the vote was recorded; other integrity errors are raised.
+    """
+    try:
+        with transaction.atomic():
+            vote.save(force_insert=True)
+            type(counted).objects.filter(id=counted.id).update(vote_count=F('vote_count') + 1)
+    except IntegrityError:
+        # Anything but the user's earlier vote, such as a missing poll or
+        # user, is a real error
+        if not _has_voted(vote):
+            raise
+        return False
+    return True
+
+
+def _has_voted(vote):
+    """Whether a vote already holds vote's (poll, user) or (proposal, user) pair"""
+    fields = [vote._meta.get_field(name) for name in vote._meta.unique_together[0]]
+    return type(vote).objects.filter(**{field.attname: getattr(vote, field.attname) for field in fields}).exists()
+
+
+def withdraw_votes(votes, counted):
+    """Delete the votes queryset and take them off counted.vote_count in one transaction; returns how many went"""
+    with transaction.atomic():
+        deleted, _ = votes.delete()
+        if deleted:
+            type(counted).objects.filter(id=counted.id).update(vote_count=F('vote_count') - deleted)
+    return deleted
@@ -0,0 +1,48 @@
+"""
+Retrying writes that lose the race for SQLite's write lock.
+
+SQLite lets one connection write at a time. The busy timeout makes a writer
+wait for the lock, but a write can still fail with "database is locked"
+when the wait runs out under a burst of votes. retry_write() runs such a
+write again after a short random pause, up to SQLITE_WRITE_RETRIES times.
+"""
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+# Backoff before retry n is a random time up to
+# min(WRITE_RETRY_MAX_DELAY, WRITE_RETRY_BASE_DELAY * 2 ** n) seconds
+WRITE_RETRY_BASE_DELAY = 0.05
+WRITE_RETRY_MAX_DELAY = 1.0
+
+
+def is_lock_error(error):
+    """Whether error is SQLite's SQLITE_BUSY or SQLITE_LOCKED, and so worth retrying"""
+    code = getattr(error.__cause__, 'sqlite_errorcode', None)
+    if code is not None:
+        # Extended result codes keep the primary code in their low byte
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_write(func, *args, **kwargs):
+    """
+    Call func(*args, **kwargs), retrying with jittered backoff while SQLite
+    reports the database as locked.
+
+    func must do all of its writing in its own transaction. Inside an outer
+    transaction nothing is retried, since the whole transaction would have
+    to be run again.
+    """
+    retries = settings.SQLITE_WRITE_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as e:
+            if attempt == retries or not is_lock_error(e) or connection.in_atomic_block:
+                raise
+            time.sleep(random.uniform(0, min(WRITE_RETRY_MAX_DELAY, WRITE_RETRY_BASE_DELAY * 2 ** attempt)))
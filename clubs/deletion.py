@@ -0,0 +1,79 @@
+"""
+Deleting clubs without one huge cascade.
+
+mark_club_deleted() only stamps Club.deleted_at, which hides the club
+everywhere Club.objects is used, and queues a job. The job purges the club's
+rows table by table, children before parents, PURGE_BATCH_SIZE rows at a
+time in id order, each batch in its own transaction. Progress is recorded on the
+job; if the process dies, the job is picked up again once its lock expires
+and carries on from the rows that are left.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cards import forget_home_cards
+from .jobs import current_job, enqueue, report_progress
+from .models import ArchivedVote, Club, Member, Poll, PollOption, Proposal, ProposalVote, Vote
+
+logger = logging.getLogger(__name__)
+
+# Rows deleted per transaction while purging a deleted club
+PURGE_BATCH_SIZE = 1000
+
+# Every table holding club rows, leaves first so each delete cascades to nothing
+PURGE_STEPS = [
+    ('votes', Vote, 'poll__club_id'),
+    ('archived_votes', ArchivedVote, 'poll__club_id'),
+    ('poll_options', PollOption, 'poll__club_id'),
+    ('polls', Poll, 'club_id'),
+    ('proposal_votes', ProposalVote, 'proposal__club_id'),
+    ('proposals', Proposal, 'club_id'),
+    ('members', Member, 'club_id'),
+]
+
+
+def mark_club_deleted(club):
+    """Hide club right away and queue the purge of everything in it"""
+    with transaction.atomic():
+        club.deleted_at = timezone.now()
+        club.save(update_fields=['deleted_at'])
+        enqueue('clubs.purge_club', club_id=club.id)
+    # Take the club off its members' home pages now rather than when their
+    # rows are purged
+    forget_home_cards(
+        user_ids=Member.objects.filter(club=club).values_list('user_id', flat=True),
+        club_ids=[club.id],
+    )
+
+
+def purge_club(club_id, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete a deleted club and all of its rows, batch_size rows at a time.
+
+    Progress is reported as the number of rows deleted from each table so
+    far, continuing from the counts of an earlier, interrupted run.
+    """
+    club = Club.all_objects.filter(id=club_id, deleted_at__isnull=False).first()
+    if club is None:
+        return
+    job = current_job()
+    deleted = dict(job.progress.get('deleted', {})) if job is not None else {}
+
+    for step, model, club_field in PURGE_STEPS:
+        rows = model.objects.filter(**{club_field: club_id}).order_by('id').values_list('id', flat=True)
+        while True:
+            with transaction.atomic():
+                batch = list(rows[:batch_size])
+                if batch:
+                    model.objects.filter(id__in=batch).delete()
+            if not batch:
+                break
+            deleted[step] = deleted.get(step, 0) + len(batch)
+            report_progress(step=step, deleted=deleted)
+
+    # Nothing references the club any more, so this is a single-row delete
+    club.delete()
+    report_progress(step='done', deleted=deleted)
+    logger.info('Purged club %s: %s', club_id, deleted)
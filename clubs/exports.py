@@ -0,0 +1,102 @@
+import csv
+import json
+from datetime import datetime
+from itertools import chain
+
+from .models import ArchivedVote, Member, Proposal, ProposalVote, Vote
+
+# Rows fetched from the database per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+# Each export: the querysets for a club, read one after another, then
+# (column name, values_list field) pairs
+EXPORTS = {
+    'members': (
+        lambda club: [Member.objects.filter(club=club)],
+        [('username', 'user__username'), ('role', 'role'), ('joined_at', 'joined_at')],
+    ),
+    'votes': (
+        # Votes of closed polls have been moved to the archive
+        lambda club: [ArchivedVote.objects.filter(poll__club=club), Vote.objects.filter(poll__club=club)],
+        [
+            ('poll_id', 'poll_id'),
+            ('poll', 'poll__title'),
+            ('option', 'option__text'),
+            ('username', 'user__username'),
+            ('voted_at', 'voted_at'),
+        ],
+    ),
+    'proposals': (
+        lambda club: [Proposal.objects.filter(club=club)],
+        [
+            ('proposal_id', 'id'),
+            ('title', 'title'),
+            ('created_by', 'created_by__username'),
+            ('created_at', 'created_at'),
+            ('votes', 'vote_count'),
+        ],
+    ),
+    'proposal-votes': (
+        lambda club: [ProposalVote.objects.filter(proposal__club=club)],
+        [
+            ('proposal_id', 'proposal_id'),
+            ('proposal', 'proposal__title'),
+            ('username', 'user__username'),
+            ('voted_at', 'voted_at'),
+        ],
+    ),
+}
+
+# Spreadsheets run CSV cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands back the line, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value):
+    """Like _value, with user-entered text that a spreadsheet would treat as a formula quoted"""
+    value = _value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_rows(club, dataset, fmt):
+    """
+    Yield an export of a club's data as CSV or JSONL lines.
+
+    Only the exported columns are selected and rows are read with a chunked
+    iterator, so memory use does not grow with the size of the club. CSV
+    cells that a spreadsheet would run as a formula get a leading
+    apostrophe; JSONL values are exported as they are.
+    """
+    querysets, columns = EXPORTS[dataset]
+    names = [name for name, _ in columns]
+    rows = chain.from_iterable(
+        queryset.order_by('id').values_list(*[field for _, field in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for queryset in querysets(club)
+    )
+
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(names, map(_value, row)))) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
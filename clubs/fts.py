@@ -0,0 +1,145 @@
+"""
+SQLite FTS5 full-text search over club names and descriptions.
+
+The clubs_club_fts virtual table is an external-content FTS5 index on
+clubs_club, kept in sync by triggers. It is installed by a migration and
+re-checked after every migrate, because SQLite table rebuilds done by later
+migrations drop the triggers attached to clubs_club.
+"""
+import logging
+
+from django.db import DatabaseError, connection
+from fuzzywuzzy import fuzz, utils
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'clubs_club_fts'
+
+# BM25 column weights: a hit in the name counts more than one in the description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+CREATE_TABLE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    name, description,
+    content='clubs_club', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)
+"""
+
+TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON clubs_club BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON clubs_club BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, description ON clubs_club BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def install_club_fts(conn):
+    """
+    Create the FTS table and its triggers if they are missing.
+
+    The index is rebuilt from clubs_club whenever a trigger had to be
+    (re)created, since writes made without it were not mirrored.
+    """
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_TABLE_SQL)
+        except DatabaseError as e:
+            # SQLite builds without FTS5 keep working with the other search backends
+            logger.warning('Could not create %s: %s', FTS_TABLE, e)
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'clubs_club'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_club_fts(conn):
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def match_expression(query):
+    """Build an FTS5 MATCH expression that prefix-matches any query term"""
+    # Accented letters are kept: the tokenizer removes diacritics from the
+    # query terms the same way it did when indexing
+    terms = utils.full_process(query, force_ascii=False).split()
+    # full_process leaves only word characters and spaces, so terms are safe to quote
+    return ' OR '.join(f'"{term}"*' for term in terms)
+
+
+def fts_search(query, after=None, limit=None):
+    """
+    Return (club id, rank) pairs for clubs matching query, most relevant first.
+
+    rank is the club's weighted BM25 score, lower being better, and results
+    are ordered by (rank, id). after is the (rank, id) of the last club of
+    the previous page; only clubs after it are returned, at most limit of
+    them. Ranks depend on every indexed club, so pages fetched while clubs
+    are being edited can skip or repeat a club, as with any relevance order.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    rank = f'bm25({FTS_TABLE}, %s, %s)'
+    sql = (
+        f'SELECT {FTS_TABLE}.rowid, {rank} AS search_rank FROM {FTS_TABLE} '
+        f'JOIN clubs_club ON clubs_club.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s AND clubs_club.deleted_at IS NULL'
+    )
+    params = [NAME_WEIGHT, DESCRIPTION_WEIGHT, expression]
+    if after is not None:
+        after_rank, after_id = after
+        sql += f' AND ({rank} > %s OR ({rank} = %s AND {FTS_TABLE}.rowid > %s))'
+        params += [NAME_WEIGHT, DESCRIPTION_WEIGHT, after_rank, NAME_WEIGHT, DESCRIPTION_WEIGHT, after_rank, after_id]
+    sql += f' ORDER BY search_rank, {FTS_TABLE}.rowid'
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def rerank(query, clubs):
+    """
+    Re-order full-text hits, given in BM25 order, by fuzzy score.
+
+    The hits are scored with the same fuzzy scorers the in-memory index
+    uses, and BM25 order breaks ties.
+    """
+    processed_query = utils.full_process(query)
+    scored = []
+    for position, club in enumerate(clubs):
+        score = max(
+            fuzz.token_sort_ratio(processed_query, club.name or ''),
+            fuzz.token_set_ratio(processed_query, club.description or ''),
+        )
+        scored.append((-score, position, club))
+    return [club for _, _, club in sorted(scored, key=lambda item: item[:2])]
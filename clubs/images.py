@@ -0,0 +1,83 @@
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Size of the logo thumbnails shown on club cards, about twice the size a card
+# displays so they stay sharp on high-density screens
+THUMBNAIL_SIZE = (720, 400)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def _on_white(image):
+    """Flatten a transparent image onto white, for formats without an alpha channel"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _thumbnail(logo):
+    with logo.open('rb') as file, Image.open(file) as image:
+        # Transparency is kept for the WebP thumbnail
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    # Never upscale: small logos get a proportionally smaller thumbnail
+    scale = min(1.0, image.width / THUMBNAIL_SIZE[0], image.height / THUMBNAIL_SIZE[1])
+    size = (max(1, round(THUMBNAIL_SIZE[0] * scale)), max(1, round(THUMBNAIL_SIZE[1] * scale)))
+    return ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+
+def make_logo_thumbnails(club):
+    """
+    Generate JPEG and WebP thumbnails of the club's logo.
+
+    The logo is cropped around its centre to the THUMBNAIL_SIZE aspect ratio,
+    the way the cards display it, and any previous thumbnails are replaced.
+    Transparent logos keep their alpha channel in the WebP thumbnail and are
+    put on a white background in the JPEG one.
+    If the logo is missing or cannot be decoded the thumbnails are removed,
+    and in the latter case the OSError from Pillow is re-raised.
+    """
+    storage = club.logo_thumbnail.storage
+    # FieldFile.save renames the file in place, so remember the old names now
+    old_names = [field.name for field in (club.logo_thumbnail, club.logo_thumbnail_webp) if field]
+    error = None
+    try:
+        image = _thumbnail(club.logo) if club.logo else None
+    except OSError as e:
+        image, error = None, e
+
+    if image is None:
+        club.logo_thumbnail = None
+        club.logo_thumbnail_webp = None
+    else:
+        base = os.path.splitext(os.path.basename(club.logo.name))[0]
+        club.logo_thumbnail.save(
+            f'{base}.jpg',
+            _encode(_on_white(image), 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True),
+            save=False,
+        )
+        club.logo_thumbnail_webp.save(
+            f'{base}.webp',
+            _encode(image, 'WEBP', quality=WEBP_QUALITY, method=6),
+            save=False,
+        )
+    club.save(update_fields=['logo_thumbnail', 'logo_thumbnail_webp'])
+    for name in old_names:
+        storage.delete(name)
+    if error is not None:
+        raise error
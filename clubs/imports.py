@@ -0,0 +1,188 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .cards import forget_home_cards
+from .counters import forget_club_counts
+from .membership import forget_club_roles
+from .models import Club, Member
+
+# Rows resolved and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+ROLES = dict(Member.ROLE_CHOICES)
+
+# Stands in for a club id when several clubs share the name given in the file
+AMBIGUOUS = object()
+
+
+class MemberImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'line {line}: {message}')
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f'Imported {self.created} member(s) from {self.rows} row(s): '
+            f'{self.skipped} already existed, {self.error_count} error(s). '
+            f'{self.elapsed:.2f}s, {self.rows_per_second:,.0f} rows/s.'
+        )
+
+
+def read_member_rows(stream, fmt='csv'):
+    """
+    Yield (line, username, club, role) tuples from a CSV or JSONL stream.
+
+    CSV rows are username,club[,role] with an optional header row. JSONL
+    lines are objects with username, club and optional role keys. club is
+    a club id or an exact club name.
+    """
+    if fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+                yield line, str(row['username']), str(row['club']), row.get('role') or ''
+            except (ValueError, KeyError, TypeError, AttributeError):
+                yield line, None, None, None
+        return
+
+    for line, row in enumerate(csv.reader(stream), start=1):
+        if not row or not any(field.strip() for field in row):
+            continue
+        if line == 1 and row[0].strip().lower() == 'username':
+            continue
+        if len(row) < 2:
+            yield line, None, None, None
+            continue
+        yield line, row[0], row[1], row[2] if len(row) > 2 else ''
+
+
+class _ClubResolver:
+    """Map club ids or names from the file to club ids, remembering every lookup"""
+
+    def __init__(self):
+        self._ids = {}
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key not in self._ids}
+        if not missing:
+            return
+        numeric = {key for key in missing if key.isdigit()}
+        found_ids = set(Club.objects.filter(id__in=[int(key) for key in numeric]).values_list('id', flat=True))
+        for key in numeric:
+            self._ids[key] = int(key) if int(key) in found_ids else None
+
+        names = missing - numeric
+        by_name = {}
+        for club_id, name in Club.objects.filter(name__in=names).values_list('id', 'name'):
+            by_name.setdefault(name, []).append(club_id)
+        for name in names:
+            matches = by_name.get(name, [])
+            # Club names are not unique; ambiguous names have to be given by id
+            if len(matches) > 1:
+                self._ids[name] = AMBIGUOUS
+            else:
+                self._ids[name] = matches[0] if matches else None
+
+    def __getitem__(self, key):
+        return self._ids[key]
+
+
+def import_members(rows, batch_size=IMPORT_BATCH_SIZE, default_role='MEMBER'):
+    """
+    Create Member rows for (line, username, club, role) tuples in bulk.
+
+    Users and clubs are resolved per batch, pairs that are already members
+    (or repeat within the file) are skipped, and each batch is inserted with
+    bulk_create in its own transaction.
+    """
+    result = MemberImportResult()
+    clubs = _ClubResolver()
+    seen = set()
+    started = time.perf_counter()
+    rows = iter(rows)
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        result.rows += len(batch)
+
+        valid = []
+        for row in batch:
+            if row[1] is None:
+                result.add_error(row[0], 'malformed row')
+            else:
+                valid.append(row)
+        usernames = {username.strip() for _, username, _, _ in valid}
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        clubs.resolve({club.strip() for _, _, club, _ in valid})
+
+        candidates = []
+        for line, username, club, role in valid:
+            user_id = user_ids.get(username.strip())
+            club_id = clubs[club.strip()]
+            role = (role or default_role).strip().upper()
+            if user_id is None:
+                result.add_error(line, f'unknown user {username!r}')
+            elif club_id is None:
+                result.add_error(line, f'unknown club {club!r}')
+            elif club_id is AMBIGUOUS:
+                result.add_error(line, f'more than one club is named {club!r}; use its id')
+            elif role not in ROLES:
+                result.add_error(line, f'invalid role {role!r}')
+            elif (user_id, club_id) in seen:
+                result.skipped += 1
+            else:
+                seen.add((user_id, club_id))
+                candidates.append(Member(user_id=user_id, club_id=club_id, role=role))
+
+        if not candidates:
+            continue
+        batch_members = Member.objects.filter(
+            user_id__in={member.user_id for member in candidates},
+            club_id__in={member.club_id for member in candidates},
+        )
+        existing = set(batch_members.values_list('user_id', 'club_id'))
+        new_members = [member for member in candidates if (member.user_id, member.club_id) not in existing]
+
+        with transaction.atomic():
+            # ignore_conflicts also covers members added while the import
+            # runs, which it drops without saying so; count the rows instead
+            before = batch_members.count()
+            Member.objects.bulk_create(new_members, ignore_conflicts=True)
+            created = batch_members.count() - before
+        result.created += created
+        result.skipped += len(candidates) - created
+        # bulk_create sends no post_save, so clear cached roles and home cards directly
+        forget_club_roles((member.user_id, member.club_id) for member in new_members)
+        forget_home_cards(
+            user_ids=[member.user_id for member in new_members],
+            club_ids=[member.club_id for member in new_members],
+        )
+        forget_club_counts(*{member.club_id for member in new_members})
+
+    result.elapsed = time.perf_counter() - started
+    return result
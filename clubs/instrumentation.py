@@ -0,0 +1,217 @@
+"""
+Per-request timings, reported in a Server-Timing header and a slow request log.
+
+TimingMiddleware times a sample of requests, chosen with
+CLUB_TIMING_SAMPLE_RATE. For each one it records the number and total time of
+its database queries, the time spent rendering templates and the time spent
+scoring club search results. Browser dev tools show the Server-Timing header
+next to the request. Timed requests slower than CLUB_SLOW_REQUEST_MS are also
+appended to the CLUB_SLOW_LOG file as one JSON line, with their queries
+grouped by SQL fingerprint.
+
+A request that isn't sampled costs one random() call, plus a context variable
+lookup for each of its queries.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+# Query fingerprints listed in a slow request's log entry, by total time
+SLOW_LOG_MAX_FINGERPRINTS = 10
+
+_current = ContextVar('clubs_request_timings', default=None)
+_slow_log_lock = threading.Lock()
+
+
+class RequestTimings:
+    """What one timed request spent its time on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # (sql, seconds) for every query, sql still holding its placeholders
+        self.queries = []
+        self.sections = {}
+        self._depth = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def db_time(self):
+        return sum(seconds for _, seconds in self.queries)
+
+
+@contextmanager
+def timed(section):
+    """Add the time spent in the block to section of the current request, if it is being timed"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    # A block inside another of the same section, such as a template
+    # rendered while rendering a template, is only counted once
+    depth = timings._depth.get(section, 0)
+    timings._depth[section] = depth + 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._depth[section] = depth
+        if depth == 0:
+            timings.sections[section] = timings.sections.get(section, 0.0) + time.perf_counter() - started
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper that records each query of a timed request"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries.append((sql, time.perf_counter() - started))
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with rendering counted in the request's timings"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+_IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def fingerprint(sql):
+    """Return sql with its values taken out, so queries that differ only in values match"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('(%s, ...)', sql)
+
+
+def _fingerprints(queries):
+    grouped = {}
+    for sql, seconds in queries:
+        normalized = fingerprint(sql)
+        entry = grouped.get(normalized)
+        if entry is None:
+            entry = grouped[normalized] = {
+                'fingerprint': hashlib.sha1(normalized.encode()).hexdigest()[:12],
+                'sql': normalized,
+                'count': 0,
+                'total_ms': 0.0,
+            }
+        entry['count'] += 1
+        entry['total_ms'] += seconds * 1000
+    slowest = sorted(grouped.values(), key=lambda entry: entry['total_ms'], reverse=True)
+    for entry in slowest:
+        entry['total_ms'] = round(entry['total_ms'], 2)
+    return slowest[:SLOW_LOG_MAX_FINGERPRINTS]
+
+
+def server_timing(timings, total):
+    """The Server-Timing header value for a timed request that took total seconds"""
+    metrics = [f'db;dur={timings.db_time() * 1000:.1f};desc="{len(timings.queries)} queries"']
+    metrics += [f'{section};dur={seconds * 1000:.1f}' for section, seconds in timings.sections.items()]
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+def log_slow_request(request, response, timings, total):
+    """Append the request's timings and query fingerprints to CLUB_SLOW_LOG as one JSON line"""
+    match = request.resolver_match
+    entry = {
+        'time': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'duration_ms': round(total * 1000, 1),
+        'queries': len(timings.queries),
+        'db_ms': round(timings.db_time() * 1000, 1),
+        'sections': {section: round(seconds * 1000, 1) for section, seconds in timings.sections.items()},
+        'fingerprints': _fingerprints(timings.queries),
+    }
+    path = settings.CLUB_SLOW_LOG
+    with _slow_log_lock:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as log:
+            log.write(json.dumps(entry) + '\n')
+
+
+class TimingMiddleware:
+    """
+    Times a sample of requests; put it first in MIDDLEWARE so the timings
+    include the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= settings.CLUB_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.CLUB_TIMING_SAMPLE_RATE:
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        # A streamed response is timed until its headers are ready, not
+        # until its content has been sent
+        total = timings.elapsed()
+        header = server_timing(timings, total)
+        if response.has_header('Server-Timing'):
+            header = f'{response["Server-Timing"]}, {header}'
+        response['Server-Timing'] = header
+        if settings.CLUB_SLOW_LOG and total * 1000 >= settings.CLUB_SLOW_REQUEST_MS:
+            log_slow_request(request, response, timings, total)
+        return response
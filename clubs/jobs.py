@@ -0,0 +1,225 @@
+"""
+Background jobs stored in the database and run without extra services.
+
+Views call enqueue() to record a Job row; once the surrounding transaction
+commits, the job is handed to a small in-process thread pool. Jobs that the
+pool cannot take, retries that come due later and jobs left behind by a
+crashed process are picked up by whichever runner polls next: the pool's
+threads drain due jobs after each one they finish, and `manage.py run_jobs`
+does the same out of process.
+"""
+import logging
+import random
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Retry delays grow from JOB_RETRY_BASE_DELAY seconds, doubling per attempt
+JOB_RETRY_BASE_DELAY = 5
+JOB_RETRY_MAX_DELAY = 600
+
+# A RUNNING job whose lock hasn't been renewed for this long is assumed to
+# belong to a dead process; handlers renew it with report_progress or heartbeat
+JOB_LOCK_TIMEOUT = timedelta(minutes=15)
+
+_tasks = {}
+
+# The job each thread is executing, for report_progress
+_current = threading.local()
+
+
+def task(name):
+    """Register a function as the job handler for name"""
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, max_attempts=5, delay=0, **payload):
+    """
+    Record a job to run name(**payload) in the background.
+
+    payload must be JSON serializable. The job only starts once the current
+    transaction commits, so it never sees uncommitted data.
+    """
+    if name not in _tasks:
+        raise ValueError(f'Unknown job {name!r}.')
+    job = Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    if settings.JOBS_RUN_IN_PROCESS:
+        transaction.on_commit(lambda: _submit(job.id, delay))
+    return job
+
+
+def current_job():
+    """Return the job this thread is executing, or None outside a job"""
+    return getattr(_current, 'job', None)
+
+
+def report_progress(**progress):
+    """
+    Merge progress into the running job's progress record and renew its lock.
+
+    The record survives retries, so a handler resuming after a crash can
+    read where it got to from current_job().progress. Does nothing when
+    called outside a job.
+    """
+    job = current_job()
+    if job is None:
+        return
+    job.progress.update(progress)
+    Job.objects.filter(id=job.id).update(progress=job.progress, locked_at=timezone.now())
+
+
+def heartbeat():
+    """
+    Renew the running job's lock, so no other runner takes it over.
+
+    Handlers that run for longer than JOB_LOCK_TIMEOUT call this (or
+    report_progress) every so often. Does nothing when called outside a job.
+    """
+    job = current_job()
+    if job is not None:
+        Job.objects.filter(id=job.id, status='RUNNING').update(locked_at=timezone.now())
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt: exponential backoff with jitter"""
+    delay = min(JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1), JOB_RETRY_MAX_DELAY)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _claimable(now):
+    return Q(status='PENDING', run_after__lte=now) | Q(status='RUNNING', locked_at__lt=now - JOB_LOCK_TIMEOUT)
+
+
+def claim(job_id):
+    """Mark a due job as RUNNING for this runner; None if it is not due or someone else has it"""
+    now = timezone.now()
+    claimed = Job.objects.filter(_claimable(now), id=job_id).update(
+        status='RUNNING',
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return Job.objects.get(id=job_id) if claimed else None
+
+
+def claim_next():
+    """Claim the job that has been due longest, or return None when nothing is due"""
+    while True:
+        job_id = (
+            Job.objects.filter(_claimable(timezone.now()))
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        job = claim(job_id)
+        if job is not None:
+            return job
+        # Another runner claimed it first; look again
+
+
+def execute(job):
+    """
+    Run a claimed job and record the outcome.
+
+    Returns the retry delay in seconds when the job failed and will be
+    retried, otherwise None.
+    """
+    func = _tasks.get(job.name)
+    _current.job = job
+    try:
+        if func is None:
+            raise LookupError(f'No handler registered for job {job.name!r}.')
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s failed (attempt %s of %s)', job, job.attempts, job.max_attempts)
+        if func is not None and job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            Job.objects.filter(id=job.id).update(
+                status='PENDING',
+                run_after=timezone.now() + timedelta(seconds=delay),
+                locked_at=None,
+                last_error=error,
+            )
+            return delay
+        Job.objects.filter(id=job.id).update(status='FAILED', finished_at=timezone.now(), last_error=error)
+        return None
+    finally:
+        _current.job = None
+    Job.objects.filter(id=job.id).update(status='DONE', finished_at=timezone.now(), locked_at=None)
+    return None
+
+
+def run_pending_jobs(limit=None):
+    """Run due jobs one after another until none are left; returns how many ran"""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next()
+        if job is None:
+            break
+        execute(job)
+        ran += 1
+    return ran
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _slots = threading.BoundedSemaphore(settings.JOBS_MAX_QUEUED)
+            _executor = ThreadPoolExecutor(max_workers=settings.JOBS_WORKERS, thread_name_prefix='clubs-jobs')
+        return _executor
+
+
+def _submit(job_id, delay=0):
+    if delay > 0:
+        timer = threading.Timer(delay, _submit, args=[job_id])
+        timer.daemon = True
+        timer.start()
+        return
+    executor = _get_executor()
+    # When the pool is backed up the job stays PENDING; a busy thread or the
+    # run_jobs worker will reach it through claim_next()
+    if _slots.acquire(blocking=False):
+        executor.submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        close_old_connections()
+        job = claim(job_id)
+        if job is not None:
+            delay = execute(job)
+            if delay is not None:
+                _submit(job.id, delay)
+        run_pending_jobs()
+    except Exception:
+        logger.exception('Background job runner failed')
+    finally:
+        _slots.release()
+        # Each pool thread has its own connection; don't leave it open
+        connection.close()
@@ -0,0 +1,195 @@
+"""
+Live vote tallies pushed to browsers over Server-Sent Events.
+
+Vote views call publish_vote_deltas(), which hands the change to the broker
+once the transaction commits. Every open stream holds a Subscription that
+collects the rows whose counts changed; once per LIVE_TICK the stream reads
+their current counts and sends them, so a burst of votes reaches each
+browser as a single batched event. A stream starts with the counts of all
+the club's proposals and open poll options, and events carry counts rather
+than changes, so a browser that missed events, for instance while it was
+reconnecting, is right again with the next one.
+
+Streams are only served under ASGI (CLUB_ASYNC_VIEWS), where an open stream
+costs a coroutine; under WSGI it would hold a worker thread for
+LIVE_STREAM_MAX_AGE seconds, so pages don't subscribe there.
+
+The broker is chosen with the CLUB_LIVE_BROKER setting. LocalBroker only
+reaches streams served by the same process, which is enough for runserver
+or a single ASGI worker; deployments with several workers need a Broker
+backed by something they share.
+"""
+import asyncio
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import PollOption, Proposal
+
+# Seconds between flushes of a stream's pending deltas
+LIVE_TICK = 0.5
+
+# Seconds between keep-alive comments on an idle stream
+LIVE_HEARTBEAT = 15
+
+# Streams end after this many seconds and the browser reconnects, so a
+# dropped client never holds a worker for long
+LIVE_STREAM_MAX_AGE = 300
+
+# Milliseconds the browser waits before reconnecting
+LIVE_RETRY = 3000
+
+
+class Subscription:
+    """Rows of one club whose counts changed since they were last sent to one stream"""
+
+    def __init__(self, broker, club_id):
+        self.broker = broker
+        self.club_id = club_id
+        self._lock = threading.Lock()
+        self._changed = set()
+
+    def push(self, deltas):
+        with self._lock:
+            self._changed.update(deltas)
+
+    def drain(self):
+        """Return and clear the (kind, id) keys changed since the last drain"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker(ABC):
+    """
+    Carries vote deltas from the process that recorded a vote to every
+    process with a stream open for the club.
+
+    deltas maps (kind, id) pairs, kind being 'option' or 'proposal', to the
+    change in that row's vote count.
+    """
+
+    @abstractmethod
+    def publish(self, club_id, deltas):
+        pass
+
+    @abstractmethod
+    def subscribe(self, club_id):
+        """Return a Subscription that receives everything published for club_id"""
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        pass
+
+
+class LocalBroker(Broker):
+    """Delivers deltas to the streams of this process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, club_id, deltas):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(club_id, ()))
+        for subscription in subscriptions:
+            subscription.push(deltas)
+
+    def subscribe(self, club_id):
+        subscription = Subscription(self, club_id)
+        with self._lock:
+            self._subscriptions.setdefault(club_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.club_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.club_id]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.CLUB_LIVE_BROKER)()
+        return _broker
+
+
+def publish_vote_deltas(club_id, options=None, proposals=None):
+    """
+    Announce vote count changes in a club once the current transaction commits.
+
+    options and proposals map PollOption and Proposal ids to the change in
+    their vote_count.
+    """
+    deltas = {('option', option_id): amount for option_id, amount in (options or {}).items()}
+    deltas.update({('proposal', proposal_id): amount for proposal_id, amount in (proposals or {}).items()})
+    if deltas:
+        transaction.on_commit(lambda: get_broker().publish(club_id, deltas))
+
+
+def vote_counts(club_id, keys=None):
+    """
+    Return {(kind, id): vote count} for the club's proposals and the options
+    of its open polls, or only for the (kind, id) pairs in keys.
+    """
+    options = PollOption.objects.filter(poll__club_id=club_id)
+    proposals = Proposal.objects.filter(club_id=club_id)
+    if keys is None:
+        options = options.filter(poll__closed_at__isnull=True, poll__end_date__gt=timezone.now())
+    else:
+        options = options.filter(id__in=[row_id for kind, row_id in keys if kind == 'option'])
+        proposals = proposals.filter(id__in=[row_id for kind, row_id in keys if kind == 'proposal'])
+    counts = {('option', pk): count for pk, count in options.values_list('id', 'vote_count')}
+    counts.update({('proposal', pk): count for pk, count in proposals.values_list('id', 'vote_count')})
+    return counts
+
+
+def _event(counts):
+    data = {'options': {}, 'proposals': {}}
+    for (kind, row_id), count in counts.items():
+        data[f'{kind}s'][str(row_id)] = count
+    return f'event: votes\ndata: {json.dumps(data)}\n\n'
+
+
+async def aevent_stream(club_id):
+    """Yield SSE messages with the club's vote counts for LIVE_STREAM_MAX_AGE seconds"""
+    # Subscribing before reading the counts means a vote committed in
+    # between is sent again on the first tick rather than lost. Subscribing
+    # here rather than in the view means a stream that is never iterated
+    # never subscribes, so there is nothing to leak.
+    subscription = get_broker().subscribe(club_id)
+    started = time.monotonic()
+    try:
+        yield f'retry: {LIVE_RETRY}\n\n'
+        yield _event(await sync_to_async(vote_counts)(club_id))
+        last_sent = time.monotonic()
+        while time.monotonic() - started < LIVE_STREAM_MAX_AGE:
+            await asyncio.sleep(LIVE_TICK)
+            changed = subscription.drain()
+            if changed:
+                yield _event(await sync_to_async(vote_counts)(club_id, changed))
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= LIVE_HEARTBEAT:
+                # Writing is also how the server notices the client left
+                yield ': ping\n\n'
+                last_sent = time.monotonic()
+    finally:
+        subscription.close()
@@ -0,0 +1,134 @@
+"""
+A small HTTP load generator for the benchmark commands.
+
+Each simulated client holds one keep-alive connection and sends GET requests
+back to back for a fixed time. There are no dependencies beyond asyncio, so
+the same client drives any server that speaks HTTP/1.1.
+"""
+import asyncio
+import math
+import resource
+import time
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values by the nearest-rank method"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def raise_open_file_limit(needed):
+    """Let this process hold at least needed sockets, up to the hard limit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+async def _read_response(reader):
+    """Read one response; returns (status, keep_alive)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+async def _client(host, port, paths, deadline, latencies, stats, headers):
+    request_lines = {
+        path: (f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{headers}\r\n').encode()
+        for path in paths
+    }
+    writer = None
+    turn = 0
+    while time.perf_counter() < deadline:
+        path = paths[turn % len(paths)]
+        turn += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request_lines[path])
+            await writer.drain()
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), deadline - started + 30)
+            latencies.append(time.perf_counter() - started)
+            stats['responses'] += 1
+            if status >= 400:
+                stats['errors'] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+            stats['errors'] += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            # Back off briefly so a refused connection doesn't spin
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def _run(host, port, paths, concurrency, duration, headers):
+    latencies = []
+    stats = {'responses': 0, 'errors': 0}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[
+        _client(host, port, paths, deadline, latencies, stats, headers)
+        for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'duration': round(elapsed, 2),
+        'responses': stats['responses'],
+        'errors': stats['errors'],
+        'requests_per_second': round(stats['responses'] / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def run_load(host, port, paths, concurrency, duration, headers=None):
+    """
+    Drive host:port with concurrency clients for duration seconds.
+
+    Clients cycle through paths. headers is a dict of extra request headers.
+    Returns throughput, error count and p50/p95/p99 latency.
+    """
+    raise_open_file_limit(concurrency + 64)
+    header_lines = ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+    return asyncio.run(_run(host, port, list(paths), concurrency, duration, header_lines))
+
+
+def wait_for_server(host, port, path, timeout=30):
+    """Block until the server answers a request for path, or raise TimeoutError"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = run_load(host, port, [path], 1, 0.01)
+        if result['responses'] and not result['errors']:
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f'Nothing answered on {host}:{port} within {timeout}s.')
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from clubs.loadtest import run_load, wait_for_server
+
+HOST = '127.0.0.1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI (gunicorn) and ASGI (uvicorn) throughput for the read-heavy '
+        'club endpoints at increasing numbers of concurrent connections. '
+        'Needs gunicorn and uvicorn installed; runs against the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request; repeat to cycle through several (default: club search).',
+        )
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[100, 250, 500, 1000])
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run each level.')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server.')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file as JSON.')
+
+    def server_command(self, server, options):
+        port = str(options['port'])
+        if server == 'wsgi':
+            return [
+                sys.executable, '-m', 'gunicorn', 'student_club.wsgi:application',
+                '--bind', f'{HOST}:{port}',
+                '--worker-class', 'gthread',
+                '--workers', str(options['workers']),
+                '--threads', str(options['threads']),
+                '--backlog', '2048',
+                '--log-level', 'warning',
+            ]
+        return [
+            sys.executable, '-m', 'uvicorn', 'student_club.asgi:application',
+            '--host', HOST,
+            '--port', port,
+            '--workers', str(options['workers']),
+            '--backlog', '2048',
+            '--log-level', 'warning',
+            '--no-access-log',
+        ]
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/clubs/search/?q=club&limit=24']
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'student_club.settings')}
+        results = []
+
+        for server in options['servers']:
+            # The WSGI run uses the sync views, the ASGI run the async ones
+            env['CLUB_ASYNC_VIEWS'] = '1' if server == 'asgi' else '0'
+            try:
+                process = subprocess.Popen(self.server_command(server, options), cwd=settings.BASE_DIR, env=env)
+            except OSError as e:
+                raise CommandError(f'Could not start the {server} server: {e}')
+            try:
+                wait_for_server(HOST, options['port'], paths[0])
+                # One short pass so the search index is built in every worker
+                run_load(HOST, options['port'], paths, options['workers'] * 4, 2)
+                for concurrency in options['concurrency']:
+                    result = run_load(HOST, options['port'], paths, concurrency, options['duration'])
+                    result['server'] = server
+                    results.append(result)
+                    self.stdout.write(
+                        f'{server:>4} c={concurrency:<5} {result["requests_per_second"]:>9,.1f} req/s  '
+                        f'p50 {result["p50_ms"]:>8.1f}ms  p95 {result["p95_ms"]:>8.1f}ms  '
+                        f'p99 {result["p99_ms"]:>8.1f}ms  errors {result["errors"]}'
+                    )
+            except TimeoutError as e:
+                raise CommandError(f'The {server} server did not start: {e}')
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump({'paths': paths, 'workers': options['workers'], 'results': results}, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["json_path"]}'))
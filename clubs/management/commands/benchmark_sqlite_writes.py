@@ -0,0 +1,165 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from clubs.loadtest import percentile
+
+
+def _setup_django(db_path, high_concurrency):
+    os.environ['SQLITE_PATH'] = db_path
+    os.environ['SQLITE_HIGH_CONCURRENCY'] = '1' if high_concurrency else '0'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_club.settings')
+    import django
+
+    django.setup()
+
+
+def _seed(db_path, high_concurrency, users):
+    """Create a fresh database with one club, an open poll and users; returns their ids"""
+    _setup_django(db_path, high_concurrency)
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from clubs.models import Club, Poll, PollOption
+
+    call_command('migrate', verbosity=0)
+    creator = User.objects.create_user(username='benchmark')
+    club = Club.objects.create(name='Benchmark', description='Write benchmark', creator=creator)
+    poll = Poll.objects.create(
+        club=club, title='Election', description='', created_by=creator,
+        end_date=timezone.now() + timedelta(days=1),
+    )
+    option_ids = [PollOption.objects.create(poll=poll, text=f'Candidate {i}').id for i in range(4)]
+    User.objects.bulk_create(User(username=f'voter{i}') for i in range(users))
+    user_ids = list(User.objects.filter(username__startswith='voter').values_list('id', flat=True))
+    return {'club_id': club.id, 'poll_id': poll.id, 'option_ids': option_ids, 'user_ids': user_ids}
+
+
+def _write(user_id, ids):
+    """The writes of one voter: join the club, then vote in its poll, as the views do"""
+    from clubs.counters import record_vote
+    from clubs.db import retry_write
+    from clubs.models import Member, PollOption, Vote
+
+    retry_write(Member.objects.get_or_create, user_id=user_id, club_id=ids['club_id'])
+    option = PollOption(id=ids['option_ids'][user_id % len(ids['option_ids'])])
+    retry_write(record_vote, Vote(poll_id=ids['poll_id'], option=option, user_id=user_id), option)
+
+
+def _run_worker(db_path, high_concurrency, ids, user_ids, threads):
+    _setup_django(db_path, high_concurrency)
+    from django.db import OperationalError, connection
+
+    latencies = []
+    errors = {'locked': 0, 'other': 0}
+    lock = threading.Lock()
+
+    def run(chunk):
+        try:
+            for user_id in chunk:
+                started = time.perf_counter()
+                try:
+                    _write(user_id, ids)
+                except OperationalError as e:
+                    with lock:
+                        errors['locked' if 'locked' in str(e) else 'other'] += 1
+                    continue
+                except Exception:
+                    with lock:
+                        errors['other'] += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=run, args=[user_ids[i::threads]]) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors
+
+
+def _count_votes(db_path, high_concurrency, poll_id):
+    _setup_django(db_path, high_concurrency)
+    from clubs.models import PollOption, Vote
+
+    votes = Vote.objects.filter(poll_id=poll_id).count()
+    tallied = sum(PollOption.objects.filter(poll_id=poll_id).values_list('vote_count', flat=True))
+    return votes, tallied
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure vote and membership write throughput and error rate against a '
+        'scratch SQLite database, with SQLite defaults and in high-concurrency mode.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Voters; each joins the club and votes once.')
+        parser.add_argument('--processes', type=int, default=4, help='Writer processes, like web workers.')
+        parser.add_argument('--threads', type=int, default=8, help='Writer threads per process.')
+        parser.add_argument('--modes', nargs='+', choices=['default', 'high-concurrency'], default=['default', 'high-concurrency'])
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file as JSON.')
+
+    def handle(self, *args, **options):
+        # Each process sets up Django afresh with the mode's settings
+        context = multiprocessing.get_context('spawn')
+        results = []
+        for mode in options['modes']:
+            high_concurrency = mode == 'high-concurrency'
+            with tempfile.TemporaryDirectory() as directory:
+                db_path = os.path.join(directory, 'benchmark.sqlite3')
+                with context.Pool(1) as pool:
+                    ids = pool.apply(_seed, (db_path, high_concurrency, options['users']))
+
+                user_ids = ids['user_ids']
+                processes = options['processes']
+                started = time.perf_counter()
+                with context.Pool(processes) as pool:
+                    outcomes = pool.starmap(_run_worker, [
+                        (db_path, high_concurrency, ids, user_ids[i::processes], options['threads'])
+                        for i in range(processes)
+                    ])
+                elapsed = time.perf_counter() - started
+
+                with context.Pool(1) as pool:
+                    votes, tallied = pool.apply(_count_votes, (db_path, high_concurrency, ids['poll_id']))
+
+            latencies = [latency for worker_latencies, _ in outcomes for latency in worker_latencies]
+            locked = sum(errors['locked'] for _, errors in outcomes)
+            other = sum(errors['other'] for _, errors in outcomes)
+            result = {
+                'mode': mode,
+                'voters': len(user_ids),
+                'succeeded': len(latencies),
+                'locked_errors': locked,
+                'other_errors': other,
+                'error_rate': round((locked + other) / len(user_ids), 4) if user_ids else 0.0,
+                'voters_per_second': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'votes': votes,
+                'tallied': tallied,
+            }
+            results.append(result)
+            self.stdout.write(
+                f'{mode:>16}: {result["voters_per_second"]:>8,.1f} voters/s  '
+                f'errors {locked + other} ({result["error_rate"]:.1%})  '
+                f'p50 {result["p50_ms"]}ms  p95 {result["p95_ms"]}ms  p99 {result["p99_ms"]}ms  '
+                f'votes {votes}, tallied {tallied}'
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump({'processes': options['processes'], 'threads': options['threads'], 'results': results}, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["json_path"]}'))
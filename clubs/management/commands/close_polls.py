@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from clubs.closing import ARCHIVE_BATCH_SIZE, close_due_polls
+
+
+class Command(BaseCommand):
+    help = (
+        'Close polls that have ended: store their final results and move their '
+        'votes to the archive table. Run it from cron, or with --interval to keep it running.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f'Votes moved per transaction (default {ARCHIVE_BATCH_SIZE})',
+        )
+        parser.add_argument('--limit', type=int, help='Close at most this many polls per run')
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between runs; 0 runs once and exits')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                closed = close_due_polls(options['batch_size'], options['limit'])
+                if closed or not options['interval']:
+                    moved = sum(count for _, count in closed)
+                    self.stdout.write(self.style.SUCCESS(f'Closed {len(closed)} poll(s) and archived {moved} vote(s).'))
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from clubs.images import make_logo_thumbnails
+from clubs.models import Club
+
+
+class Command(BaseCommand):
+    help = 'Generate card thumbnails for club logos that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate thumbnails for every club with a logo')
+
+    def handle(self, *args, **options):
+        clubs = Club.objects.exclude(logo='').exclude(logo__isnull=True)
+        if not options['all']:
+            clubs = clubs.filter(logo_thumbnail__isnull=True)
+        done = failed = 0
+        for club in clubs.iterator():
+            try:
+                make_logo_thumbnails(club)
+                done += 1
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f'{club.name} (id {club.id}): {e}')
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {done} club(s), {failed} failed.'))
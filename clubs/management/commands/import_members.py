@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clubs.imports import IMPORT_BATCH_SIZE, import_members, read_member_rows
+
+
+class Command(BaseCommand):
+    help = 'Add users to clubs in bulk from a CSV (username,club,role) or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file; club is a club id or exact club name')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='File format (default: from the file extension, else csv)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Rows inserted per transaction (default {IMPORT_BATCH_SIZE})',
+        )
+        parser.add_argument('--role', default='MEMBER', help='Role for rows that do not give one (default MEMBER)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        try:
+            stream = open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        with stream:
+            result = import_members(
+                read_member_rows(stream, fmt),
+                batch_size=options['batch_size'],
+                default_role=options['role'],
+            )
+
+        for error in result.errors:
+            self.stderr.write(error)
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more error(s)')
+        self.stdout.write(self.style.SUCCESS(result.summary()))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from clubs.counters import RECONCILE_BATCH_SIZE, reconcile_vote_counts
+from clubs.models import PollOption, Proposal, ProposalVote, Vote
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored vote counts on proposals and poll options that have drifted from the vote tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=RECONCILE_BATCH_SIZE,
+            help=f'Rows checked per transaction (default {RECONCILE_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        proposals = reconcile_vote_counts(Proposal, ProposalVote, 'proposal', batch_size)
+        # Votes of closed polls are archived and their results stored, so
+        # only options of polls still open are checked
+        poll_options = reconcile_vote_counts(
+            PollOption, Vote, 'option', batch_size, rows=PollOption.objects.filter(poll__closed_at__isnull=True),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Corrected {proposals} proposal(s) and {poll_options} poll option(s).'
+        ))
@@ -0,0 +1,211 @@
+import json
+import random
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clubs.loadtest import percentile
+from clubs.models import Club, Member, Proposal, ProposalVote, Vote
+
+from .seed_benchmark import TOPICS, USERNAME_PREFIX
+
+SCENARIOS = ['search', 'club_detail', 'proposal_list', 'vote']
+
+
+class Target:
+    """A benchmark user together with a club they belong to and its proposals"""
+
+    def __init__(self, member):
+        self.user = member.user
+        self.club_id = member.club_id
+        self.proposal_ids = list(Proposal.objects.filter(club_id=member.club_id).values_list('id', flat=True))
+        self.voted = set(
+            ProposalVote.objects.filter(proposal_id__in=self.proposal_ids, user=member.user)
+            .values_list('proposal_id', flat=True)
+        )
+
+
+def _pick_targets(count, rng):
+    """Pick count members of random clubs, using only benchmark users"""
+    bounds = Club.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    targets = []
+    for _ in range(count * 20):
+        if len(targets) == count:
+            break
+        club_id = rng.randint(bounds['low'], bounds['high'])
+        member = (
+            Member.objects.select_related('user')
+            .filter(club_id=club_id, club__deleted_at__isnull=True, user__username__startswith=USERNAME_PREFIX)
+            .order_by('id').first()
+        )
+        if member is not None:
+            targets.append(Target(member))
+    return targets
+
+
+def _request(client, target, scenario, rng):
+    """Send one request of the scenario for target; returns the response"""
+    if scenario == 'search':
+        return client.get(reverse('club_search'), {'q': rng.choice(TOPICS).lower()})
+    if scenario == 'club_detail':
+        return client.get(reverse('club_detail', args=[target.club_id]))
+    if scenario == 'proposal_list':
+        return client.get(reverse('proposal_list', args=[target.club_id]))
+
+    # Voting toggles a vote on and off, so repeated runs leave the data as it was
+    proposal_id = rng.choice(target.proposal_ids)
+    name = 'unvote_proposal' if proposal_id in target.voted else 'vote_proposal'
+    response = client.post(reverse(name, args=[proposal_id]), headers={'X-Requested-With': 'XMLHttpRequest'})
+    if response.status_code == 200:
+        target.voted.symmetric_difference_update([proposal_id])
+    return response
+
+
+def _client_loop(target, scenario, deadline, seed, samples, lock):
+    rng = random.Random(seed)
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(target.user)
+    latencies, queries, errors = [], [], 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                try:
+                    response = _request(client, target, scenario, rng)
+                    failed = response.status_code >= 400
+                except Exception:
+                    failed = True
+            latencies.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            errors += failed
+    finally:
+        connection.close()
+    with lock:
+        samples['latencies'].extend(latencies)
+        samples['queries'].extend(queries)
+        samples['errors'] += errors
+
+
+def run_scenario(targets, scenario, duration, seed):
+    """Run one client thread per target for duration seconds; returns the scenario's results"""
+    if scenario == 'vote':
+        targets = [target for target in targets if target.proposal_ids]
+    samples = {'latencies': [], 'queries': [], 'errors': 0}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=_client_loop, args=[target, scenario, deadline, seed + i, samples, lock])
+        for i, target in enumerate(targets)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies, queries = samples['latencies'], samples['queries']
+    return {
+        'scenario': scenario,
+        'clients': len(threads),
+        'duration': round(elapsed, 2),
+        'requests': len(latencies),
+        'errors': samples['errors'],
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'max_queries': max(queries, default=0),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the club URLs (search, club detail, proposal list and voting) with '
+        'concurrent in-process clients against the configured database, and report '
+        'p50/p95/p99 latency, throughput and queries per request. Seed the database '
+        'with seed_benchmark first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent clients, each a thread logged in as a different user.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run each scenario.')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Seconds to run each scenario before measuring.')
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for picking users, clubs and queries.')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file as JSON.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as previous:
+                    baseline = {result['scenario']: result for result in json.load(previous)['results']}
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+
+        targets = _pick_targets(options['clients'], random.Random(options['seed']))
+        if len(targets) < options['clients']:
+            raise CommandError(
+                f'Found {len(targets)} of {options["clients"]} benchmark members; run seed_benchmark first.'
+            )
+
+        results = []
+        for scenario in options['scenarios']:
+            # Builds the search index and fills caches, as on a server that has been up for a while
+            run_scenario(targets, scenario, options['warmup'], options['seed'])
+            result = run_scenario(targets, scenario, options['duration'], options['seed'])
+            results.append(result)
+            line = (
+                f'{scenario:>13}: {result["requests_per_second"]:>8,.1f} req/s  '
+                f'p50 {result["p50_ms"]:>7.1f}ms  p95 {result["p95_ms"]:>7.1f}ms  p99 {result["p99_ms"]:>7.1f}ms  '
+                f'{result["queries_per_request"]:>5.1f} queries/req  errors {result["errors"]}'
+            )
+            previous = (baseline or {}).get(scenario)
+            if previous:
+                line += (
+                    f'  (p95 {result["p95_ms"] - previous["p95_ms"]:+.1f}ms, '
+                    f'{result["requests_per_second"] - previous["requests_per_second"]:+,.1f} req/s, '
+                    f'{result["queries_per_request"] - previous["queries_per_request"]:+.1f} queries)'
+                )
+            self.stdout.write(line)
+
+        if options['json_path']:
+            report = {
+                'commit': _git_commit(),
+                'finished_at': timezone.now().isoformat(),
+                'async_views': settings.CLUB_ASYNC_VIEWS,
+                'clients': len(targets),
+                'dataset': {
+                    'clubs': Club.objects.count(),
+                    'members': Member.objects.count(),
+                    'votes': Vote.objects.count(),
+                },
+                'results': results,
+            }
+            with open(options['json_path'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["json_path"]}'))
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from clubs.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs, polling the job table for new ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Jobs run at the same time (default 1)')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due instead of polling')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        totals = []
+
+        def work():
+            ran = 0
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    count = run_pending_jobs(limit=50)
+                    ran += count
+                    if not count:
+                        if options['burst']:
+                            break
+                        stop.wait(options['poll_interval'])
+            finally:
+                totals.append(ran)
+                connection.close()
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, options['concurrency']))]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the current jobs...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS(f'Ran {sum(totals)} job(s).'))
@@ -0,0 +1,193 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from clubs.models import Club, Member, Poll, PollOption, Proposal, ProposalVote, Vote
+
+# Prefix of every generated username, so benchmark users are easy to find
+USERNAME_PREFIX = 'bench'
+
+TOPICS = [
+    'Chess', 'Robotics', 'Debate', 'Photography', 'Astronomy', 'Drama', 'Hiking', 'Jazz',
+    'Film', 'Poetry', 'Coding', 'Gardening', 'Cycling', 'Anime', 'Choir', 'Climbing',
+    'Baking', 'Economics', 'Esports', 'Volunteering', 'Salsa', 'Origami', 'Rowing', 'Philosophy',
+]
+KINDS = ['Club', 'Society', 'Circle', 'Team', 'Collective', 'Guild']
+ADJECTIVES = ['friendly', 'competitive', 'beginner', 'weekly', 'student-run', 'casual', 'advanced']
+
+# Tables in the order they can be written, each after the ones it points at
+WRITE_ORDER = [User, Club, Member, Poll, PollOption, Vote, Proposal, ProposalVote]
+
+
+class Seeder:
+    """Generates the dataset with explicit ids, writing each table in bulk batches"""
+
+    def __init__(self, options, stdout):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.stdout = stdout
+        self.now = timezone.now()
+        self.pending = {}
+        self.written = {}
+
+    def next_id(self, model):
+        return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+    def add(self, obj):
+        rows = self.pending.setdefault(type(obj), [])
+        rows.append(obj)
+        if len(rows) >= self.batch_size:
+            self.flush(type(obj))
+
+    def flush(self, model=ProposalVote):
+        """Write the pending rows of model and of every table it may point at"""
+        for pending_model in WRITE_ORDER[:WRITE_ORDER.index(model) + 1]:
+            rows = self.pending.pop(pending_model, [])
+            if rows:
+                with transaction.atomic():
+                    pending_model.objects.bulk_create(rows, batch_size=self.batch_size)
+                self.written[pending_model] = self.written.get(pending_model, 0) + len(rows)
+
+    def club_sizes(self, clubs, members, users):
+        """Split members over clubs with a long tail: a few large clubs, many small ones"""
+        weights = [self.rng.paretovariate(1.2) for _ in range(clubs)]
+        # A club can't have more members than there are users, so what the
+        # largest clubs can't take is shared among the others
+        full = set()
+        while len(full) < clubs:
+            remaining = members - users * len(full)
+            open_weight = sum(weight for i, weight in enumerate(weights) if i not in full)
+            sizes = [
+                users if i in full else max(1, round(remaining * weight / open_weight))
+                for i, weight in enumerate(weights)
+            ]
+            overflowing = {i for i, size in enumerate(sizes) if size > users}
+            if not overflowing:
+                return sizes
+            full |= overflowing
+        return [users] * clubs
+
+    def seed(self, users, clubs, members, votes, proposal_votes, polls_per_club, options_per_poll, proposals_per_club, password):
+        started = time.perf_counter()
+
+        first_user = self.next_id(User)
+        hashed = make_password(password)
+        for i in range(users):
+            user_id = first_user + i
+            self.add(User(id=user_id, username=f'{USERNAME_PREFIX}{user_id}', password=hashed, date_joined=self.now))
+        self.flush()
+        user_ids = range(first_user, first_user + users)
+        self.stdout.write(f'users: {users} ({time.perf_counter() - started:.1f}s)')
+
+        sizes = self.club_sizes(clubs, members, users)
+        seats = sum(sizes)
+        # Turnout per poll and per proposal needed to reach the vote targets
+        poll_turnout = min(1.0, votes / (seats * polls_per_club)) if polls_per_club else 0
+        proposal_turnout = min(1.0, proposal_votes / (seats * proposals_per_club)) if proposals_per_club else 0
+
+        club_id = self.next_id(Club)
+        poll_id = self.next_id(Poll)
+        option_id = self.next_id(PollOption)
+        proposal_id = self.next_id(Proposal)
+        for n, size in enumerate(sizes, start=1):
+            topic = self.rng.choice(TOPICS)
+            club_members = self.rng.sample(user_ids, size)
+            self.add(Club(
+                id=club_id,
+                name=f'{topic} {self.rng.choice(KINDS)} {club_id}',
+                description=(
+                    f'A {self.rng.choice(ADJECTIVES)} {topic.lower()} group for students. '
+                    f'We meet every {self.rng.choice(["Monday", "Wednesday", "Friday"])} '
+                    f'and welcome members of every level.'
+                ),
+                creator_id=club_members[0],
+            ))
+
+            for position, user_id in enumerate(club_members):
+                role = 'ADMIN' if position == 0 else ('SECRETARY' if position == 1 else 'MEMBER')
+                self.add(Member(user_id=user_id, club_id=club_id, role=role))
+
+            for _ in range(polls_per_club):
+                # Two thirds of the polls are still open
+                ends = self.now + timedelta(days=self.rng.randint(-30, 60))
+                self.add(Poll(id=poll_id, club_id=club_id, title=f'{topic} poll {poll_id}', description='', end_date=ends, created_by_id=club_members[0]))
+                voters = self.rng.sample(club_members, round(size * poll_turnout))
+                option_ids = list(range(option_id, option_id + options_per_poll))
+                choices = [self.rng.choice(option_ids) for _ in voters]
+                for position, chosen in enumerate(option_ids, start=1):
+                    self.add(PollOption(id=chosen, poll_id=poll_id, text=f'Option {position}', vote_count=choices.count(chosen)))
+                for user_id, chosen in zip(voters, choices):
+                    self.add(Vote(poll_id=poll_id, option_id=chosen, user_id=user_id))
+                poll_id += 1
+                option_id += options_per_poll
+
+            for _ in range(proposals_per_club):
+                # Some proposals are far more popular than others
+                turnout = min(1.0, proposal_turnout * self.rng.uniform(0.2, 1.8))
+                voters = self.rng.sample(club_members, round(size * turnout))
+                self.add(Proposal(
+                    id=proposal_id, club_id=club_id, title=f'{topic} proposal {proposal_id}',
+                    description='Proposed change for the club.', created_by_id=self.rng.choice(club_members),
+                    vote_count=len(voters),
+                ))
+                for user_id in voters:
+                    self.add(ProposalVote(proposal_id=proposal_id, user_id=user_id))
+                proposal_id += 1
+
+            club_id += 1
+            if n % 500 == 0 or n == len(sizes):
+                self.stdout.write(f'clubs: {n}/{clubs} ({time.perf_counter() - started:.1f}s)')
+        self.flush()
+        return self.written, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible synthetic dataset for load testing: users, clubs '
+        'with a long-tailed size distribution, members, polls with votes and '
+        'proposals with votes. Vote counters are filled in as rows are generated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--clubs', type=int, default=10_000)
+        parser.add_argument('--members', type=int, default=1_000_000, help='Memberships across all clubs (approximate).')
+        parser.add_argument('--votes', type=int, default=5_000_000, help='Poll votes (approximate).')
+        parser.add_argument('--proposal-votes', type=int, default=1_000_000, help='Proposal votes (approximate).')
+        parser.add_argument('--polls-per-club', type=int, default=8)
+        parser.add_argument('--options-per-poll', type=int, default=4)
+        parser.add_argument('--proposals-per-club', type=int, default=5)
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply users, clubs, members and votes, e.g. 0.01 for a quick run.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT transaction.')
+        parser.add_argument('--password', default='benchmark', help=f'Password of every generated {USERNAME_PREFIX}* user.')
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        users = round(options['users'] * scale)
+        clubs = round(options['clubs'] * scale)
+        if users < 2 or clubs < 1:
+            raise CommandError('The dataset needs at least two users and one club.')
+        if options['options_per_poll'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--options-per-poll and --batch-size must be at least 1.')
+
+        written, elapsed = Seeder(options, self.stdout).seed(
+            users=users,
+            clubs=clubs,
+            members=round(options['members'] * scale),
+            votes=round(options['votes'] * scale),
+            proposal_votes=round(options['proposal_votes'] * scale),
+            polls_per_club=options['polls_per_club'],
+            options_per_poll=options['options_per_poll'],
+            proposals_per_club=options['proposals_per_club'],
+            password=options['password'],
+        )
+        summary = ', '.join(f'{count:,} {model._meta.verbose_name_plural}' for model, count in written.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary} in {elapsed:.1f}s.'))
@@ -0,0 +1,91 @@
+from functools import wraps
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import redirect
+
+# Seconds a user's role in a club stays in the cache; Member signals clear
+# it sooner, this bounds staleness for writes that bypass them and for other
+# processes, whose local caches the signals don't reach
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+# Requests that may use a cached role; everything else changes data, so
+# the role is read from the database
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Cached in place of a role for users who are not members, since the cache
+# cannot tell a stored None from a miss
+NOT_A_MEMBER = ''
+
+
+def _cache_key(user_id, club_id):
+    return f'clubs:role:{club_id}:{user_id}'
+
+
+def club_role(request, club_id, fresh=False):
+    """
+    Return the user's role in the club, or None if they are not a member.
+
+    The role is looked up at most once per request and kept in the Django
+    cache between requests. The cache may be stale by up to
+    MEMBERSHIP_CACHE_TIMEOUT seconds in other processes, so the role is read
+    from the database when fresh is true and for requests that change data.
+    """
+    if not request.user.is_authenticated:
+        return None
+    fresh = fresh or request.method not in SAFE_METHODS
+    roles = getattr(request, '_club_roles', None)
+    if roles is None:
+        roles = request._club_roles = {}
+    if club_id in roles and (roles[club_id][1] or not fresh):
+        return roles[club_id][0]
+
+    from .models import Member
+
+    key = _cache_key(request.user.id, club_id)
+    role = None if fresh else cache.get(key)
+    if role is None:
+        role = Member.objects.filter(club_id=club_id, user=request.user).values_list('role', flat=True).first()
+        cache.set(key, role or NOT_A_MEMBER, MEMBERSHIP_CACHE_TIMEOUT)
+        fresh = True
+    roles[club_id] = (role or None, fresh)
+    return role or None
+
+
+def is_club_member(request, club_id):
+    return club_role(request, club_id) is not None
+
+
+def is_club_admin(request, club_id):
+    return club_role(request, club_id) == 'ADMIN'
+
+
+def forget_club_role(user_id, club_id):
+    cache.delete(_cache_key(user_id, club_id))
+
+
+def forget_club_roles(pairs):
+    """Clear cached roles for many (user_id, club_id) pairs at once"""
+    cache.delete_many([_cache_key(user_id, club_id) for user_id, club_id in pairs])
+
+
+def club_member_required(admin=False, message=None):
+    """
+    Only let club members, or only club admins, into a view taking club_id.
+
+    Anyone else is sent back to the club page with message. Admin rights
+    are always checked against the database.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, club_id, *args, **kwargs):
+            role = club_role(request, club_id, fresh=admin)
+            if role is None or (admin and role != 'ADMIN'):
+                if admin:
+                    messages.error(request, message or 'Only club admins can do that.')
+                else:
+                    messages.error(request, message or 'You must be a member of this club.')
+                return redirect('club_detail', club_id=club_id)
+            return view(request, club_id, *args, **kwargs)
+        return wrapper
+    return decorator
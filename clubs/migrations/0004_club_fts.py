@@ -0,0 +1,73 @@
+import logging
+
+from django.db import DatabaseError, migrations
+
+logger = logging.getLogger(__name__)
+
+# The FTS table and triggers as they were when this migration was written;
+# clubs.fts re-creates missing triggers after every migrate
+CREATE_TABLE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS clubs_club_fts USING fts5(
+    name, description,
+    content='clubs_club', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)
+"""
+
+TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS clubs_club_fts_ai AFTER INSERT ON clubs_club BEGIN
+        INSERT INTO clubs_club_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clubs_club_fts_ad AFTER DELETE ON clubs_club BEGIN
+        INSERT INTO clubs_club_fts(clubs_club_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS clubs_club_fts_au AFTER UPDATE OF name, description ON clubs_club BEGIN
+        INSERT INTO clubs_club_fts(clubs_club_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO clubs_club_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def install(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_TABLE_SQL)
+        except DatabaseError as e:
+            # SQLite builds without FTS5 keep working with the other search backends
+            logger.warning('Could not create clubs_club_fts: %s', e)
+            return
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+        cursor.execute("INSERT INTO clubs_club_fts(clubs_club_fts) VALUES ('rebuild')")
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in ('clubs_club_fts_ai', 'clubs_club_fts_ad', 'clubs_club_fts_au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute('DROP TABLE IF EXISTS clubs_club_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0003_alter_member_role'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
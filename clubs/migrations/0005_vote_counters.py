@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    # Written against the historical models rather than clubs.counters, so
+    # later changes to the app code don't change what this migration does
+    for model_name, vote_model_name, fk_name in [('Proposal', 'ProposalVote', 'proposal'), ('PollOption', 'Vote', 'option')]:
+        model = apps.get_model('clubs', model_name)
+        votes = (
+            apps.get_model('clubs', vote_model_name).objects.filter(**{fk_name: OuterRef('pk')})
+            .order_by()
+            .values(fk_name)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        model.objects.update(vote_count=Coalesce(Subquery(votes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0004_club_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='polloption',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proposal',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['club', '-vote_count', '-created_at'], name='proposal_club_votes_idx'),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0005_vote_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='club',
+            name='logo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='club_logos/thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='logo_thumbnail_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='club_logos/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:35
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0008_club_deleted_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='club',
+            index=models.Index(django.db.models.functions.text.Lower('name'), models.F('id'), condition=models.Q(('deleted_at__isnull', True)), name='club_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['club', 'end_date'], name='poll_club_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['club', '-created_at', '-id'], name='proposal_club_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['user', 'poll', 'voted_at', 'option'], name='vote_user_poll_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0010_poll_closing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='role_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(role='ADMIN', then=models.Value(0)), models.When(role='PRESIDENT', then=models.Value(1)), models.When(role='VICE_PRESIDENT', then=models.Value(2)), models.When(role='SECRETARY', then=models.Value(3)), models.When(role='MEMBER', then=models.Value(4)), default=models.Value(5)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['club', 'role_rank', 'id'], name='member_club_role_rank_idx'),
+        ),
+    ]
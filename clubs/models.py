@@ -1,13 +1,35 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+class ClubManager(models.Manager):
+    """Clubs that have not been deleted; see clubs.deletion"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Club(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     logo = models.ImageField(upload_to='club_logos/', null=True, blank=True)
+    # Card-sized copies of the logo, generated by clubs.images
+    logo_thumbnail = models.ImageField(upload_to='club_logos/thumbnails/', null=True, blank=True, editable=False)
+    logo_thumbnail_webp = models.ImageField(upload_to='club_logos/thumbnails/', null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_clubs')
+    # Set when the club is deleted; its rows are purged in the background
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ClubManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # The club list and search pages sort live clubs by (lowercase name, id)
+            models.Index(Lower('name'), F('id'), name='club_name_lower_idx', condition=Q(deleted_at__isnull=True)),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,10 +45,23 @@ class Member(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     club = models.ForeignKey(Club, on_delete=models.CASCADE)
     role = models.CharField(max_length=15, choices=ROLE_CHOICES, default='MEMBER')
+    # Position of role in ROLE_CHOICES, computed by the database so the
+    # roster can be paged in role order from an index
+    role_rank = models.GeneratedField(
+        expression=Case(
+            *[When(role=role, then=Value(rank)) for rank, (role, _) in enumerate(ROLE_CHOICES)],
+            default=Value(len(ROLE_CHOICES)),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
     joined_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ['user', 'club']
+        indexes = [
+            models.Index(fields=['club', 'role_rank', 'id'], name='member_club_role_rank_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.club.name} ({self.role})'
@@ -38,9 +73,19 @@ class Poll(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     end_date = models.DateTimeField()
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Set by clubs.closing after the poll ends: the final results, then the
+    # time its votes finished moving to ArchivedVote
+    final_results = models.JSONField(null=True, blank=True, editable=False)
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # A club's active polls, shown on club_detail
+            models.Index(fields=['club', 'end_date'], name='poll_club_end_date_idx'),
+        ]
 
     def is_active(self):
-        return timezone.now() <= self.end_date
+        return self.closed_at is None and timezone.now() <= self.end_date
 
     def __str__(self):
         return self.title
@@ -48,6 +93,8 @@ class Poll(models.Model):
 class PollOption(models.Model):
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='options')
     text = models.CharField(max_length=200)
+    # Number of Vote rows for this option, kept in step by the voting views
+    vote_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.text
@@ -60,6 +107,20 @@ class Vote(models.Model):
 
     class Meta:
         unique_together = ['poll', 'user']
+        indexes = [
+            # Covers finding a removed member's votes in a club's polls
+            models.Index(fields=['user', 'poll', 'voted_at', 'option'], name='vote_user_poll_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} - {self.poll.title}'
+
+class ArchivedVote(models.Model):
+    """A vote in a closed poll, moved out of Vote by clubs.closing"""
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE)
+    option = models.ForeignKey(PollOption, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    voted_at = models.DateTimeField()
 
     def __str__(self):
         return f'{self.user.username} - {self.poll.title}'
@@ -70,9 +131,14 @@ class Proposal(models.Model):
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Number of ProposalVote rows, kept in step by the voting views
+    vote_count = models.PositiveIntegerField(default=0)
     
-    def vote_count(self):
-        return self.proposalvote_set.count()
+    class Meta:
+        indexes = [
+            models.Index(fields=['club', '-vote_count', '-created_at'], name='proposal_club_votes_idx'),
+            models.Index(fields=['club', '-created_at', '-id'], name='proposal_club_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -87,3 +153,33 @@ class ProposalVote(models.Model):
     
     def __str__(self):
         return f'{self.user.username} - {self.proposal.title}'
+
+
+class Job(models.Model):
+    """A unit of background work, run by clubs.jobs in-process or by the run_jobs worker"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    # Written by long-running handlers through clubs.jobs.report_progress
+    progress = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
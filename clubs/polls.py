@@ -0,0 +1,84 @@
+from django.core.cache import cache
+
+from .models import Member, PollOption
+
+# Seconds results of an open poll stay cached; every vote clears them sooner
+POLL_RESULTS_CACHE_TIMEOUT = 60
+
+
+def _cache_key(poll_id):
+    return f'clubs:poll-results:{poll_id}'
+
+
+def _options(poll):
+    return PollOption.objects.filter(poll=poll).order_by('id').values('id', 'text', 'vote_count')
+
+
+def _club_members(poll):
+    return Member.objects.filter(club_id=poll.club_id)
+
+
+def _build_results(poll, closed, options, member_count):
+    """Build results from the per-option tallies, never from the Vote table"""
+    total_votes = sum(option['vote_count'] for option in options)
+    return {
+        'poll': {
+            'id': poll.id,
+            'title': poll.title,
+            'end_date': poll.end_date.isoformat(),
+            'closed': closed,
+        },
+        'options': [{
+            'id': option['id'],
+            'text': option['text'],
+            'votes': option['vote_count'],
+            'percentage': round(option['vote_count'] * 100 / total_votes, 1) if total_votes else 0.0,
+        } for option in options],
+        'total_votes': total_votes,
+        'member_count': member_count,
+        'turnout': round(total_votes * 100 / member_count, 1) if member_count else 0.0,
+    }
+
+
+def snapshot_results(poll):
+    """The final results of an ended poll, stored on it by clubs.closing"""
+    return _build_results(poll, True, list(_options(poll)), _club_members(poll).count())
+
+
+def get_poll_results(poll):
+    """
+    Return per-option votes and percentages plus turnout for a poll.
+
+    Results of an open poll are cached briefly and cleared on every vote.
+    Once the poll has ended they are computed one last time and kept
+    without expiry, until clubs.closing stores them on the poll.
+    """
+    if poll.final_results is not None:
+        return poll.final_results
+    closed = not poll.is_active()
+    key = _cache_key(poll.id)
+    results = cache.get(key)
+    if results is not None and (results['poll']['closed'] or not closed):
+        return results
+    results = _build_results(poll, closed, list(_options(poll)), _club_members(poll).count())
+    cache.set(key, results, None if closed else POLL_RESULTS_CACHE_TIMEOUT)
+    return results
+
+
+async def aget_poll_results(poll):
+    """Async version of get_poll_results, for the async views"""
+    if poll.final_results is not None:
+        return poll.final_results
+    closed = not poll.is_active()
+    key = _cache_key(poll.id)
+    results = await cache.aget(key)
+    if results is not None and (results['poll']['closed'] or not closed):
+        return results
+    options = [option async for option in _options(poll)]
+    results = _build_results(poll, closed, options, await _club_members(poll).acount())
+    await cache.aset(key, results, None if closed else POLL_RESULTS_CACHE_TIMEOUT)
+    return results
+
+
+def forget_poll_results(*poll_ids):
+    cache.delete_many([_cache_key(poll_id) for poll_id in poll_ids])
@@ -0,0 +1,118 @@
+"""
+Removing members from a club.
+
+The Member rows are deleted straight away, in one transaction together with
+the job that cleans up after them. That job deletes the removed users' votes
+and proposals in chunks of PURGE_BATCH_SIZE rows, each in its own short
+transaction, so a member with a long history never holds SQLite's write lock
+for long. Every chunk adjusts the vote counters and deletes the rows it
+covers together, so the tallies stay right however far a purge gets; a
+failed purge is retried by the job runner and picks up where it stopped.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .jobs import enqueue, heartbeat
+from .models import ArchivedVote, PollOption, Proposal, ProposalVote, Vote
+from .polls import forget_poll_results
+
+# Rows deleted per transaction while purging a removed member's activity
+PURGE_BATCH_SIZE = 500
+
+
+def remove_members(club, members):
+    """
+    Remove members from club and schedule the purge of their activity.
+
+    Returns the usernames of the removed members.
+    """
+    members = list(members)
+    if not members:
+        return []
+    with transaction.atomic():
+        club.member_set.filter(id__in=[member.id for member in members]).delete()
+        enqueue(
+            'clubs.purge_member_activity',
+            club_id=club.id,
+            user_ids=[member.user_id for member in members],
+            removed_at=timezone.now().isoformat(),
+        )
+    return [member.user.username for member in members]
+
+
+def _decrement(model, counts):
+    """Take counts[id] off the vote_count of each row, one UPDATE per distinct amount"""
+    ids_by_amount = defaultdict(list)
+    for row_id, amount in counts.items():
+        ids_by_amount[amount].append(row_id)
+    for amount, row_ids in ids_by_amount.items():
+        model.objects.filter(id__in=row_ids).update(vote_count=F('vote_count') - amount)
+
+
+def _purge_votes(club_id, user_ids, removed_at, batch_size):
+    votes = Vote.objects.filter(poll__club_id=club_id, user_id__in=user_ids, voted_at__lte=removed_at)
+    while True:
+        with transaction.atomic():
+            batch = list(votes.values_list('id', 'poll_id', 'option_id')[:batch_size])
+            if not batch:
+                return
+            _decrement(PollOption, Counter(option_id for _, _, option_id in batch))
+            Vote.objects.filter(id__in=[vote_id for vote_id, _, _ in batch]).delete()
+        forget_poll_results(*{poll_id for _, poll_id, _ in batch})
+        heartbeat()
+
+
+def _purge_archived_votes(club_id, user_ids, removed_at, batch_size):
+    # Closed polls keep the results stored when they closed, so there are
+    # no counters to adjust
+    archived = ArchivedVote.objects.filter(poll__club_id=club_id, user_id__in=user_ids, voted_at__lte=removed_at)
+    while True:
+        with transaction.atomic():
+            batch = list(archived.values_list('id', flat=True)[:batch_size])
+            if not batch:
+                return
+            ArchivedVote.objects.filter(id__in=batch).delete()
+        heartbeat()
+
+
+def _purge_proposal_votes(club_id, user_ids, removed_at, batch_size):
+    proposal_votes = ProposalVote.objects.filter(
+        proposal__club_id=club_id, user_id__in=user_ids, voted_at__lte=removed_at
+    )
+    while True:
+        with transaction.atomic():
+            batch = list(proposal_votes.values_list('id', 'proposal_id')[:batch_size])
+            if not batch:
+                return
+            _decrement(Proposal, Counter(proposal_id for _, proposal_id in batch))
+            ProposalVote.objects.filter(id__in=[vote_id for vote_id, _ in batch]).delete()
+        heartbeat()
+
+
+def _purge_proposals(club_id, user_ids, removed_at, batch_size):
+    proposals = Proposal.objects.filter(club_id=club_id, created_by_id__in=user_ids, created_at__lte=removed_at)
+    while True:
+        with transaction.atomic():
+            batch = list(proposals.values_list('id', flat=True)[:batch_size])
+            if not batch:
+                return
+            # Votes on these proposals go with them through the cascade
+            Proposal.objects.filter(id__in=batch).delete()
+        heartbeat()
+
+
+def purge_member_activity(club_id, user_ids, removed_at, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete removed members' votes and proposals in a club, batch_size rows at a time.
+
+    Only rows from before removed_at are touched, so anything a user does
+    after rejoining the club is kept.
+    """
+    _purge_votes(club_id, user_ids, removed_at, batch_size)
+    # After the live votes, so votes archived in the meantime are caught too
+    _purge_archived_votes(club_id, user_ids, removed_at, batch_size)
+    _purge_proposal_votes(club_id, user_ids, removed_at, batch_size)
+    _purge_proposals(club_id, user_ids, removed_at, batch_size)
@@ -0,0 +1,194 @@
+import bisect
+import heapq
+import string
+import threading
+from collections import defaultdict
+
+from fuzzywuzzy import fuzz, utils
+
+# Score thresholds and per-field result limits used by the club search
+NAME_SCORE_CUTOFF = 55
+DESCRIPTION_SCORE_CUTOFF = 45
+MATCH_LIMIT = 15
+
+# Queries this short skip fuzzy matching and use a plain substring search
+SHORT_QUERY_LENGTH = 2
+
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def name_key(name):
+    """
+    Return name lowercased the way SQLite's LOWER() does it, folding ASCII
+    letters only, so clubs sort the same here as in the database.
+    """
+    return name.translate(_ASCII_LOWER)
+
+
+def _trigrams(text):
+    """Return the set of padded character trigrams for every token in text"""
+    grams = set()
+    for token in utils.full_process(text, force_ascii=True).split():
+        padded = f' {token} '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class ClubSearchIndex:
+    """
+    In-memory search index over club names and descriptions.
+
+    The index is built once per process on first use and kept up to date by
+    the Club save/delete signals in clubs.signals. Trigram postings narrow the
+    clubs a query is scored against, so fuzzy scoring only runs over candidates
+    that share text with the query instead of over every club. A search holds
+    the lock only to copy out its candidates; scoring runs without it, so
+    searches in different threads score in parallel.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._names = {}
+            self._descriptions = {}
+            self._lowered = {}
+            self._grams = {}
+            self._name_postings = defaultdict(set)
+            self._description_postings = defaultdict(set)
+            self._built = False
+
+    def ensure_built(self):
+        if self._built:
+            return
+        from .models import Club
+
+        with self._lock:
+            if self._built:
+                return
+            for club_id, name, description in Club.objects.values_list('id', 'name', 'description').iterator():
+                self._add(club_id, name, description)
+            self._built = True
+
+    def update(self, club_id, name, description):
+        """Add or refresh a club; a no-op until the index has been built"""
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(club_id)
+            self._add(club_id, name, description)
+
+    def remove(self, club_id):
+        with self._lock:
+            if self._built:
+                self._remove(club_id)
+
+    def _add(self, club_id, name, description):
+        name = name or ''
+        description = description or ''
+        name_grams = _trigrams(name)
+        description_grams = _trigrams(description)
+
+        self._names[club_id] = name
+        self._descriptions[club_id] = description
+        self._lowered[club_id] = (name.lower(), description.lower())
+        self._grams[club_id] = (name_grams, description_grams)
+        for gram in name_grams:
+            self._name_postings[gram].add(club_id)
+        for gram in description_grams:
+            self._description_postings[gram].add(club_id)
+
+    def _remove(self, club_id):
+        if club_id not in self._names:
+            return
+        name_grams, description_grams = self._grams.pop(club_id)
+        for gram in name_grams:
+            self._discard(self._name_postings, gram, club_id)
+        for gram in description_grams:
+            self._discard(self._description_postings, gram, club_id)
+        del self._names[club_id]
+        del self._descriptions[club_id]
+        del self._lowered[club_id]
+
+    @staticmethod
+    def _discard(mapping, key, club_id):
+        ids = mapping.get(key)
+        if ids is not None:
+            ids.discard(club_id)
+            if not ids:
+                del mapping[key]
+
+    def _candidates(self, postings, grams, texts):
+        """Return (id, text) for every club sharing a trigram with the query; call with the lock held"""
+        candidates = set()
+        for gram in grams:
+            candidates |= postings.get(gram, set())
+        # Keep the id order so score ties resolve the same way as a full scan
+        return [(club_id, texts[club_id]) for club_id in sorted(candidates)]
+
+    def sort_key(self, club_id):
+        """Return the (name_key(name), id) key results are ordered by"""
+        return (name_key(self._names[club_id]), club_id)
+
+    def search(self, query, after=None, limit=None):
+        """
+        Return the ids of clubs matching query, ordered by name.
+
+        after is a sort key from a previous page; only clubs that sort after
+        it are returned, at most limit of them.
+
+        Names are scored with token_sort_ratio and descriptions with
+        token_set_ratio against the same thresholds as before. When nothing
+        scores high enough, or the query is very short, a case-insensitive
+        substring match over names and descriptions is used instead.
+        """
+        self.ensure_built()
+        processed_query = utils.full_process(query)
+        fuzzy = len(query) > SHORT_QUERY_LENGTH and processed_query
+        grams = _trigrams(query) if fuzzy else ()
+        with self._lock:
+            name_candidates = self._candidates(self._name_postings, grams, self._names)
+            description_candidates = self._candidates(self._description_postings, grams, self._descriptions)
+
+        matched = set()
+        if fuzzy:
+            matched |= _fuzzy_matches(processed_query, name_candidates, fuzz.token_sort_ratio, NAME_SCORE_CUTOFF)
+            matched |= _fuzzy_matches(
+                processed_query, description_candidates, fuzz.token_set_ratio, DESCRIPTION_SCORE_CUTOFF,
+            )
+
+        if not matched:
+            with self._lock:
+                lowered = list(self._lowered.items())
+            needle = query.lower()
+            matched = {
+                club_id for club_id, (name, description) in lowered
+                if needle in name or needle in description
+            }
+
+        with self._lock:
+            # Clubs removed since the candidates were copied drop out here
+            keys = [self.sort_key(club_id) for club_id in matched if club_id in self._names]
+        keys.sort()
+        if after is not None:
+            keys = keys[bisect.bisect_right(keys, tuple(after)):]
+        return [club_id for _, club_id in keys[:limit]]
+
+
+def _fuzzy_matches(processed_query, candidates, scorer, cutoff):
+    """Return ids of the candidates whose text is among the MATCH_LIMIT best scoring ones above cutoff"""
+    scored = ((text, scorer(processed_query, text)) for _, text in candidates)
+    texts = {
+        text for text, score in heapq.nlargest(MATCH_LIMIT, scored, key=lambda item: item[1])
+        if score >= cutoff
+    }
+    # Every club sharing a matched text is a hit, as in the original scan
+    return {club_id for club_id, text in candidates if text in texts}
+
+
+club_index = ClubSearchIndex()
@@ -0,0 +1,55 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .cards import forget_home_cards
+from .counters import forget_club_counts
+from .fts import install_club_fts
+from .instrumentation import install_query_timer
+from .membership import forget_club_role
+from .models import Club, Member, Proposal
+from .search import club_index
+
+
+@receiver(post_save, sender=Club)
+def index_club(sender, instance, **kwargs):
+    if instance.deleted_at is not None:
+        club_index.remove(instance.id)
+    else:
+        club_index.update(instance.id, instance.name, instance.description)
+    forget_home_cards(club_ids=[instance.id])
+
+
+@receiver(post_delete, sender=Club)
+def unindex_club(sender, instance, **kwargs):
+    club_index.remove(instance.id)
+    forget_home_cards(club_ids=[instance.id])
+
+
+@receiver([post_save, post_delete], sender=Member)
+def forget_member_role(sender, instance, **kwargs):
+    forget_club_role(instance.user_id, instance.club_id)
+    # The user's club list and the club's member count have changed
+    forget_home_cards(user_ids=[instance.user_id], club_ids=[instance.club_id])
+    forget_club_counts(instance.club_id)
+
+
+@receiver([post_save, post_delete], sender=Proposal)
+def forget_proposal_count(sender, instance, created=True, **kwargs):
+    # Only creations and deletions change the count, not edits or vote updates
+    if created:
+        forget_club_counts(instance.club_id)
+
+
+@receiver(post_migrate)
+def ensure_club_fts(sender, using, **kwargs):
+    # Table rebuilds in later migrations drop the FTS triggers; put them back
+    if sender.name == 'clubs':
+        from django.db import connections
+
+        install_club_fts(connections[using])
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
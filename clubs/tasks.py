@@ -0,0 +1,42 @@
+"""Background job handlers; see clubs.jobs"""
+import logging
+from datetime import datetime
+
+from PIL import UnidentifiedImageError
+
+from .deletion import purge_club
+from .images import make_logo_thumbnails
+from .jobs import task
+from .models import Club
+from .removal import purge_member_activity
+
+logger = logging.getLogger(__name__)
+
+
+@task('clubs.make_logo_thumbnails')
+def make_club_logo_thumbnails(club_id, stale=()):
+    """Make thumbnails of a club's logo, then delete the stale files of the logo it replaced"""
+    club = Club.objects.filter(id=club_id).first()
+    if club is not None:
+        try:
+            make_logo_thumbnails(club)
+        except UnidentifiedImageError:
+            # Retrying will not help; cards fall back to the original logo
+            logger.warning('Logo of club %s is not a readable image', club_id)
+    storage = Club._meta.get_field('logo_thumbnail').storage
+    for name in stale:
+        storage.delete(name)
+
+
+@task('clubs.purge_member_activity')
+def purge_removed_member_activity(club_id, removed_at, user_ids=(), user_id=None):
+    """Delete the votes and proposals of members removed from a club; see clubs.removal"""
+    # Jobs queued before bulk removal carry a single user_id
+    if user_id is not None:
+        user_ids = [*user_ids, user_id]
+    purge_member_activity(club_id, user_ids, datetime.fromisoformat(removed_at))
+
+
+@task('clubs.purge_club')
+def purge_deleted_club(club_id):
+    purge_club(club_id)
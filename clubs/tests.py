@@ -1,3 +1,1607 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, OperationalError as DjangoOperationalError, connection, transaction
+from django.db.models.functions import Lower
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from fuzzywuzzy import fuzz
+from PIL import Image
+
+from . import async_views, views
+from .cards import home_club_cards
+from .closing import CLOSE_GRACE, close_due_polls
+from .counters import reconcile_vote_counts, record_vote, withdraw_votes
+from .db import is_lock_error
+from .deletion import PURGE_STEPS, mark_club_deleted, purge_club
+from .exports import export_rows
+from .fts import fts_search
+from .images import make_logo_thumbnails
+from .imports import import_members, read_member_rows
+from .instrumentation import fingerprint
+from .jobs import JOB_LOCK_TIMEOUT, claim, current_job, execute, report_progress, task
+from .live import Broker, LocalBroker, aevent_stream, get_broker, vote_counts
+from .membership import _cache_key as membership_cache_key, club_role
+from .models import ArchivedVote, Club, Job, Member, Poll, PollOption, Proposal, ProposalVote, Vote
+from .removal import purge_member_activity, remove_members
+from .search import club_index
+
+
+class ProposalListQueryTests(TestCase):
+    # session, user, club, membership, page count, proposals, user's votes
+    QUERY_BUDGET = 7
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='password')
+        self.author = User.objects.create_user(username='author', password='password')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.author)
+        Member.objects.create(user=self.user, club=self.club, role='ADMIN')
+        self.client.login(username='member', password='password')
+
+    def add_proposals(self, count):
+        proposals = Proposal.objects.bulk_create(
+            Proposal(club=self.club, title=f'Proposal {i}', description='Details', created_by=self.author)
+            for i in range(count)
+        )
+        # Vote on every other proposal so both button states are rendered
+        ProposalVote.objects.bulk_create(
+            ProposalVote(proposal=proposal, user=self.user) for proposal in proposals[::2]
+        )
+
+    def count_queries(self, **params):
+        # Measure with a cold membership cache so every size pays for the lookup
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('proposal_list', args=[self.club.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_is_constant(self):
+        counts = {}
+        total = 0
+        for size in (1, 100, 1000):
+            self.add_proposals(size - total)
+            total = size
+            counts[size] = self.count_queries()
+            self.assertLessEqual(counts[size], self.QUERY_BUDGET)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_sort_by_votes_query_count(self):
+        self.add_proposals(100)
+        self.assertLessEqual(self.count_queries(sort='votes', page=3), self.QUERY_BUDGET)
+
+    def test_voted_state_is_rendered(self):
+        self.add_proposals(2)
+        response = self.client.get(reverse('proposal_list', args=[self.club.id]))
+        self.assertContains(response, 'Voted (Click to Unvote)', count=1)
+        self.assertContains(response, 'Upvote', count=1)
+
+
+class ConcurrentVoteTests(TransactionTestCase):
+    USERS = 50
+    CLICKS_PER_USER = 4
+
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.creator)
+        self.users = User.objects.bulk_create(User(username=f'voter{i}') for i in range(self.USERS))
+        Member.objects.bulk_create(Member(user=user, club=self.club) for user in self.users)
+
+    def hammer(self, url, data=None):
+        """POST url as every user CLICKS_PER_USER times at once; returns the status codes"""
+        clients = []
+        for user in self.users:
+            client = Client()
+            client.force_login(user)
+            clients.extend([client] * self.CLICKS_PER_USER)
+        statuses = []
+        barrier = threading.Barrier(len(clients), timeout=30)
+
+        def click(client):
+            try:
+                barrier.wait()
+                response = client.post(url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                statuses.append(response.status_code)
+            except Exception as e:
+                statuses.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=click, args=[client]) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_concurrent_poll_votes(self):
+        poll = Poll.objects.create(
+            club=self.club, title='Captain', description='', created_by=self.creator,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        option = PollOption.objects.create(poll=poll, text='Alice')
+
+        statuses = self.hammer(reverse('vote_poll', args=[poll.id]), {'option': option.id})
+
+        # Every user gets one success and a clean conflict for each repeat click
+        self.assertEqual(statuses.count(200), self.USERS, statuses)
+        self.assertEqual(statuses.count(409), self.USERS * (self.CLICKS_PER_USER - 1), statuses)
+        self.assertEqual(Vote.objects.filter(poll=poll).count(), self.USERS)
+        self.assertEqual(Vote.objects.filter(poll=poll).values('user').distinct().count(), self.USERS)
+        option.refresh_from_db()
+        self.assertEqual(option.vote_count, self.USERS)
+
+    def test_concurrent_proposal_votes(self):
+        proposal = Proposal.objects.create(club=self.club, title='New boards', description='', created_by=self.creator)
+
+        statuses = self.hammer(reverse('vote_proposal', args=[proposal.id]))
+
+        self.assertEqual(statuses, [200] * len(statuses))
+        self.assertEqual(ProposalVote.objects.filter(proposal=proposal).count(), self.USERS)
+        proposal.refresh_from_db()
+        self.assertEqual(proposal.vote_count, self.USERS)
+
+
+class QueryBudgetMixin:
+    """
+    Query-count checks for views against data of increasing size.
+
+    Test cases using it implement grow(size), which adds data until the
+    fixtures are that size. assertQueryBudget() grows the data through SIZES
+    and fails when the view's query count changes with size, which is how an
+    N+1 query shows up, or when it goes over the view's budget.
+    """
+    SIZES = (1, 10, 40)
+
+    def count_queries(self, request, size):
+        """Return the queries run by request(size) with cold caches, and its response"""
+        cache.clear()
+        club_index.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = request(size)
+            # Streamed responses query while their content is read; event
+            # streams never end, so they are left unread
+            if response.streaming and response['Content-Type'] != 'text/event-stream':
+                b''.join(response.streaming_content)
+        return len(context.captured_queries), response
+
+    def assertQueryBudget(self, budget, request, status=200, prepare=None):
+        """
+        Check request(size) at every size in SIZES.
+
+        prepare(size), when given, runs before each request without being
+        counted, for setup such as logging in a fresh user.
+        """
+        counts = {}
+        for size in self.SIZES:
+            self.grow(size)
+            if prepare is not None:
+                prepare(size)
+            counts[size], response = self.count_queries(request, size)
+            self.assertEqual(response.status_code, status, f'size {size}')
+        self.assertEqual(len(set(counts.values())), 1, f'query count grows with data size: {counts}')
+        self.assertLessEqual(counts[self.SIZES[0]], budget, f'over the budget of {budget} queries: {counts}')
+
+
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    A query budget for every view in clubs.urls, named test_<url name>.
+
+    Budgets count the session and user lookups of a logged-in request, and
+    are measured with cold caches.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='password')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.admin)
+        Member.objects.create(user=self.admin, club=self.club, role='ADMIN')
+        self.poll = Poll.objects.create(
+            club=self.club, title='Captain', description='', created_by=self.admin,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        self.proposal = Proposal.objects.create(club=self.club, title='New boards', description='', created_by=self.admin)
+        self.size = 0
+        self.members = []
+        self.proposals = []
+        self.client.force_login(self.admin)
+
+    def grow(self, size):
+        """
+        Bring the admin's club up to size members, each voting in the poll and
+        on the proposal, with size proposals and size options in the poll.
+        The admin is also a member of size other clubs, so the home page grows.
+        """
+        new = range(self.size, size)
+        if not new:
+            return
+        users = User.objects.bulk_create(User(username=f'member{i}') for i in new)
+        members = Member.objects.bulk_create(Member(user=user, club=self.club) for user in users)
+        self.members.extend(members)
+        options = PollOption.objects.bulk_create(PollOption(poll=self.poll, text=f'Option {i}') for i in new)
+        Vote.objects.bulk_create(Vote(poll=self.poll, option=option, user=user) for option, user in zip(options, users))
+        PollOption.objects.filter(id__in=[option.id for option in options]).update(vote_count=1)
+        proposals = Proposal.objects.bulk_create(
+            Proposal(club=self.club, title=f'Proposal {i}', description='', created_by=user)
+            for i, user in zip(new, users)
+        )
+        self.proposals.extend(proposals)
+        ProposalVote.objects.bulk_create(ProposalVote(proposal=self.proposal, user=user) for user in users)
+        Proposal.objects.filter(id=self.proposal.id).update(vote_count=size)
+        clubs = Club.objects.bulk_create(
+            Club(name=f'Chess {i}', description='Another chess club', creator=self.admin) for i in new
+        )
+        Member.objects.bulk_create(Member(user=self.admin, club=club, role='ADMIN') for club in clubs)
+        self.size = size
+
+    def login_newcomer(self, size, join=False):
+        """Log the test client in as a new user, a member of the club if join is true"""
+        user = User.objects.create_user(username=f'newcomer{size}')
+        if join:
+            Member.objects.create(user=user, club=self.club)
+        self.client.force_login(user)
+
+    def test_every_view_has_a_budget(self):
+        from .urls import urlpatterns
+
+        missing = [pattern.name for pattern in urlpatterns if not hasattr(self, f'test_{pattern.name}')]
+        self.assertEqual(missing, [])
+
+    def test_home(self):
+        self.assertQueryBudget(4, lambda size: self.client.get(reverse('home')))
+
+    def test_club_list(self):
+        self.assertQueryBudget(4, lambda size: self.client.get(reverse('club_list'), {'q': 'chess'}))
+
+    def test_club_search(self):
+        self.assertQueryBudget(3, lambda size: self.client.get(reverse('club_search'), {'q': 'chess'}))
+
+    def test_club_detail(self):
+        self.assertQueryBudget(8, lambda size: self.client.get(reverse('club_detail', args=[self.club.id])))
+
+    def test_club_members(self):
+        self.assertQueryBudget(4, lambda size: self.client.get(reverse('club_members', args=[self.club.id])))
+
+    def test_club_events(self):
+        # Event streams are only served by the async view
+        self.assertQueryBudget(2, lambda size: self.client.get(reverse('club_events', args=[self.club.id])), status=204)
+
+    def test_create_club(self):
+        self.assertQueryBudget(8, lambda size: self.client.post(
+            reverse('create_club'), {'name': f'Go {size}', 'description': 'Go club'},
+        ), status=302)
+
+    def test_edit_club(self):
+        self.assertQueryBudget(5, lambda size: self.client.post(
+            reverse('edit_club', args=[self.club.id]), {'name': f'Chess {size}', 'description': 'Chess club'},
+        ), status=302)
+
+    def test_delete_club(self):
+        def restore(size):
+            Club.all_objects.filter(id=self.club.id).update(deleted_at=None)
+
+        self.assertQueryBudget(9, lambda size: self.client.post(reverse('delete_club', args=[self.club.id])), status=302, prepare=restore)
+
+    def test_join_club(self):
+        self.assertQueryBudget(8, lambda size: self.client.post(reverse('join_club', args=[self.club.id])), status=302, prepare=self.login_newcomer)
+
+    def test_create_poll(self):
+        self.assertQueryBudget(9, lambda size: self.client.post(reverse('create_poll', args=[self.club.id]), {
+            'title': 'Venue', 'description': '', 'end_date': timezone.now() + timedelta(days=1),
+            'options': ['Hall', 'Library', 'Cafe'],
+        }), status=302)
+
+    def test_vote_poll(self):
+        def vote(size):
+            option = PollOption.objects.filter(poll=self.poll).first()
+            return self.client.post(reverse('vote_poll', args=[self.poll.id]), {'option': option.id})
+
+        self.assertQueryBudget(9, vote, status=302, prepare=lambda size: self.login_newcomer(size, join=True))
+
+    def test_poll_results(self):
+        self.assertQueryBudget(6, lambda size: self.client.get(reverse('poll_results', args=[self.poll.id])))
+
+    def test_manage_roles(self):
+        self.assertQueryBudget(5, lambda size: self.client.get(reverse('manage_roles', args=[self.club.id])))
+
+    def test_export_club_data(self):
+        def export(size):
+            for dataset in ('members', 'votes', 'proposals'):
+                response = self.client.get(reverse('export_club_data', args=[self.club.id, dataset]))
+                b''.join(response.streaming_content)
+            return self.client.get(reverse('export_club_data', args=[self.club.id, 'proposal-votes']))
+
+        # Each of the four exports reads the admin's role from the database
+        self.assertQueryBudget(21, export)
+
+    def test_remove_member(self):
+        self.assertQueryBudget(11, lambda size: self.client.post(
+            reverse('remove_member', args=[self.club.id, self.members[size - 1].id]),
+        ), status=302)
+
+    def test_bulk_remove_members(self):
+        # Removes everyone added since the last size, so more members each time
+        removed = {'count': 0}
+
+        def remove(size):
+            member_ids = [member.id for member in self.members[removed['count']:size]]
+            removed['count'] = size
+            return self.client.post(reverse('bulk_remove_members', args=[self.club.id]), {'member_ids': member_ids})
+
+        self.assertQueryBudget(10, remove, status=302)
+
+    def test_update_member_role(self):
+        self.assertQueryBudget(7, lambda size: self.client.post(
+            reverse('update_member_role', args=[self.club.id, self.members[size - 1].id]), {'role': 'SECRETARY'},
+        ), status=302)
+
+    def test_register(self):
+        self.assertQueryBudget(3, lambda size: Client().post(reverse('register'), {
+            'username': f'student{size}', 'password1': 'a-long-password-1', 'password2': 'a-long-password-1',
+        }), status=302)
+
+    def test_proposal_list(self):
+        self.assertQueryBudget(7, lambda size: self.client.get(reverse('proposal_list', args=[self.club.id])))
+
+    def test_create_proposal(self):
+        self.assertQueryBudget(6, lambda size: self.client.post(
+            reverse('create_proposal', args=[self.club.id]), {'title': f'Idea {size}', 'description': ''},
+        ), status=302)
+
+    def test_vote_proposal(self):
+        self.assertQueryBudget(8, lambda size: self.client.post(
+            reverse('vote_proposal', args=[self.proposals[size - 1].id]),
+        ), status=302)
+
+    def test_unvote_proposal(self):
+        def voter(size):
+            self.login_newcomer(size, join=True)
+            ProposalVote.objects.create(proposal=self.proposal, user=User.objects.get(username=f'newcomer{size}'))
+
+        self.assertQueryBudget(8, lambda size: self.client.post(
+            reverse('unvote_proposal', args=[self.proposal.id]),
+        ), status=302, prepare=voter)
+
+    def test_delete_proposal(self):
+        doomed = {}
+
+        def create(size):
+            # A proposal with a vote from every member
+            doomed['proposal'] = Proposal.objects.create(club=self.club, title='Rejected', description='', created_by=self.admin)
+            ProposalVote.objects.bulk_create(ProposalVote(proposal=doomed['proposal'], user_id=member.user_id) for member in self.members)
+
+        self.assertQueryBudget(9, lambda size: self.client.post(
+            reverse('delete_proposal', args=[doomed['proposal'].id]),
+        ), status=302, prepare=create)
+
+
+class TimingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member', password='password')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.user)
+        Member.objects.create(user=self.user, club=self.club, role='ADMIN')
+        self.client.force_login(self.user)
+
+    def server_timing(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    @override_settings(CLUB_TIMING_SAMPLE_RATE=1.0, CLUB_SLOW_LOG='')
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('club_detail', args=[self.club.id]))
+        metrics = self.server_timing(response)
+        self.assertEqual(metrics['db']['desc'], f'"{len(context.captured_queries)} queries"')
+        self.assertIn('template', metrics)
+        self.assertIn('total', metrics)
+
+        metrics = self.server_timing(self.client.get(reverse('club_search'), {'q': 'chess'}))
+        self.assertIn('search', metrics)
+
+    @override_settings(CLUB_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client.get(reverse('club_detail', args=[self.club.id]))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_slow_requests_are_logged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.jsonl')
+            with override_settings(CLUB_TIMING_SAMPLE_RATE=1.0, CLUB_SLOW_REQUEST_MS=0, CLUB_SLOW_LOG=path):
+                self.client.get(reverse('proposal_list', args=[self.club.id]))
+            with open(path) as log:
+                entries = [json.loads(line) for line in log]
+
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry['view'], 'proposal_list')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(sum(query['count'] for query in entry['fingerprints']), entry['queries'])
+        # Values are taken out of the fingerprinted SQL
+        self.assertFalse(any(str(self.club.id) in query['sql'].split() for query in entry['fingerprints']))
+
+    def test_tests_do_not_write_the_slow_log(self):
+        self.assertEqual(settings.CLUB_SLOW_LOG, '')
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'y' LIMIT 5"),
+        )
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN QUERY PLAN checks that the hot queries use the indexes meant for them"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.user)
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index, sorted_by_index=True):
+        plan = self.query_plan(queryset)
+        self.assertTrue(any(index in step for step in plan), plan)
+        if sorted_by_index:
+            self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_active_polls(self):
+        polls = Poll.objects.filter(club=self.club, end_date__gt=timezone.now())
+        self.assertUsesIndex(polls, 'poll_club_end_date_idx (club_id=? AND end_date>?)')
+
+    def test_newest_proposals(self):
+        proposals = Proposal.objects.filter(club=self.club).order_by('-created_at', '-id')[:25]
+        self.assertUsesIndex(proposals, 'proposal_club_created_idx')
+
+    def test_proposals_by_votes(self):
+        proposals = Proposal.objects.filter(club=self.club).order_by('-vote_count', '-created_at', '-id')[:25]
+        self.assertUsesIndex(proposals, 'proposal_club_votes_idx', sorted_by_index=False)
+
+    def test_club_list_pages(self):
+        from .views import _keyset_queryset
+
+        self.assertUsesIndex(_keyset_queryset(Club.objects.all())[:24], 'club_name_lower_idx')
+        # Later pages seek to the cursor instead of scanning from the first club
+        next_page = _keyset_queryset(Club.objects.all(), after=('chess', self.club.id))[:24]
+        self.assertUsesIndex(next_page, 'club_name_lower_idx (<expr>>?)')
+
+    def test_removed_member_votes(self):
+        votes = Vote.objects.filter(
+            poll__club_id=self.club.id, user_id__in=[self.user.id], voted_at__lte=timezone.now(),
+        ).values_list('id', 'poll_id', 'option_id')
+        self.assertUsesIndex(votes, 'COVERING INDEX vote_user_poll_idx', sorted_by_index=False)
+
+    def test_role_lookup_and_home_clubs(self):
+        # The (user, club) unique index serves both; the home query reads only the index
+        role = Member.objects.filter(club_id=self.club.id, user=self.user).values_list('role', flat=True)
+        self.assertUsesIndex(role, 'clubs_member_user_id_club_id', sorted_by_index=False)
+        club_ids = Member.objects.filter(user=self.user).values_list('club_id', flat=True)
+        self.assertUsesIndex(club_ids, 'COVERING INDEX clubs_member_user_id_club_id', sorted_by_index=False)
+
+    def test_roster_pages(self):
+        def plans(after):
+            with CaptureQueriesContext(connection) as context:
+                views._roster_page(self.club, after, 51)
+            with connection.cursor() as cursor:
+                for query in context.captured_queries:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                    yield [row[-1] for row in cursor.fetchall()]
+
+        expected = {
+            None: ['member_club_role_rank_idx (club_id=?)'],
+            # Both queries of a later page seek into the index
+            (4, 10): [
+                'member_club_role_rank_idx (club_id=? AND role_rank=? AND id>?)',
+                'member_club_role_rank_idx (club_id=? AND role_rank>?)',
+            ],
+        }
+        for after, indexes in expected.items():
+            with self.subTest(after=after):
+                page_plans = list(plans(after))
+                self.assertEqual(len(page_plans), len(indexes))
+                for plan, index in zip(page_plans, indexes):
+                    self.assertTrue(any(index in step for step in plan), plan)
+                    self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+
+class RosterPaginationTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username='viewer')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.viewer)
+        roles = ['MEMBER', 'SECRETARY', 'MEMBER', 'ADMIN', 'MEMBER', 'PRESIDENT', 'SECRETARY', 'MEMBER', 'VICE_PRESIDENT']
+        users = User.objects.bulk_create(User(username=f'user{i}') for i in range(len(roles)))
+        Member.objects.bulk_create(Member(user=user, club=self.club, role=role) for user, role in zip(users, roles))
+        self.client.force_login(self.viewer)
+
+    def expected_order(self):
+        ranks = {role: rank for rank, (role, _) in enumerate(Member.ROLE_CHOICES)}
+        members = Member.objects.filter(club=self.club).select_related('user')
+        return [member.user.username for member in sorted(members, key=lambda m: (ranks[m.role], m.id))]
+
+    def walk(self, limit):
+        usernames, cursor = [], None
+        while True:
+            params = {'limit': limit}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(reverse('club_members', args=[self.club.id]), params).json()
+            usernames += [member['username'] for member in data['members']]
+            cursor = data['next']
+            if not cursor:
+                return usernames
+
+    def test_pages_cover_roster_in_role_order(self):
+        expected = self.expected_order()
+        self.assertEqual(expected[0], 'user3')
+        for limit in (1, 2, 4, len(expected), 50):
+            self.assertEqual(self.walk(limit), expected)
+
+    def test_role_rank_follows_role_changes(self):
+        member = Member.objects.get(club=self.club, user__username='user0')
+        member.role = 'ADMIN'
+        member.save(update_fields=['role'])
+        Member.objects.filter(club=self.club, user__username='user3').update(role='MEMBER')
+        self.assertEqual(self.walk(2), self.expected_order())
+        self.assertEqual(self.walk(2)[0], 'user0')
+
+    def test_club_detail_links_second_page(self):
+        with mock.patch('clubs.views.ROSTER_PAGE_SIZE', 4):
+            response = self.client.get(reverse('club_detail', args=[self.club.id]))
+        first = [member.user.username for member in response.context['members']]
+        data = self.client.get(reverse('club_members', args=[self.club.id]), {
+            'cursor': response.context['members_next'], 'limit': 50,
+        }).json()
+        self.assertEqual(first + [member['username'] for member in data['members']], self.expected_order())
+        self.assertIsNone(data['next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('nope', base64.urlsafe_b64encode(b'["a", 1]').decode()):
+            response = self.client.get(reverse('club_members', args=[self.club.id]), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+class PollClosingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.admin)
+        Member.objects.create(user=self.admin, club=self.club, role='ADMIN')
+        self.voters = User.objects.bulk_create(User(username=f'voter{i}') for i in range(5))
+        Member.objects.bulk_create(Member(user=user, club=self.club) for user in self.voters)
+        self.ended = self.add_poll('Captain', timezone.now() - timedelta(hours=1))
+        self.open = self.add_poll('Venue', timezone.now() + timedelta(days=1))
+        self.client.force_login(self.admin)
+
+    def add_poll(self, title, end_date):
+        poll = Poll.objects.create(club=self.club, title=title, description='', created_by=self.admin, end_date=end_date)
+        first, second = PollOption.objects.bulk_create([
+            PollOption(poll=poll, text='First', vote_count=3),
+            PollOption(poll=poll, text='Second', vote_count=2),
+        ])
+        Vote.objects.bulk_create(
+            Vote(poll=poll, option=first if i < 3 else second, user=user) for i, user in enumerate(self.voters)
+        )
+        return poll
+
+    def test_closes_ended_polls_only(self):
+        vote_ids = set(Vote.objects.filter(poll=self.ended).values_list('id', flat=True))
+        recent = self.add_poll('Treasurer', timezone.now() - CLOSE_GRACE / 2)
+
+        closed = close_due_polls(batch_size=2)
+
+        self.assertEqual([(poll.id, moved) for poll, moved in closed], [(self.ended.id, 5)])
+        self.assertFalse(Vote.objects.filter(poll=self.ended).exists())
+        self.assertEqual(set(ArchivedVote.objects.filter(poll=self.ended).values_list('id', flat=True)), vote_ids)
+        self.assertEqual(Vote.objects.filter(poll__in=[self.open, recent]).count(), 10)
+
+        self.ended.refresh_from_db()
+        self.assertIsNotNone(self.ended.closed_at)
+        self.assertFalse(self.ended.is_active())
+        self.assertEqual(self.ended.final_results['total_votes'], 5)
+        self.assertEqual([option['votes'] for option in self.ended.final_results['options']], [3, 2])
+        self.assertEqual(self.ended.final_results['turnout'], round(5 * 100 / 6, 1))
+
+        # A second run has nothing left to do
+        self.assertEqual(close_due_polls(), [])
+
+    def test_closed_poll_results_come_from_the_snapshot(self):
+        close_due_polls()
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('poll_results', args=[self.ended.id]), {'format': 'json'})
+        self.assertEqual(response.json()['total_votes'], 5)
+        self.assertTrue(response.json()['poll']['closed'])
+        tables = ' '.join(query['sql'] for query in context.captured_queries)
+        for table in ('clubs_vote', 'clubs_polloption', 'clubs_member'):
+            self.assertNotIn(table, tables)
+
+    def test_closed_poll_refuses_votes(self):
+        close_due_polls()
+        voter = User.objects.create_user(username='late')
+        Member.objects.create(user=voter, club=self.club)
+        self.client.force_login(voter)
+        option = PollOption.objects.filter(poll=self.ended).first()
+        response = self.client.post(
+            reverse('vote_poll', args=[self.ended.id]), {'option': option.id}, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ArchivedVote.objects.filter(poll=self.ended).count(), 5)
+
+    def test_vote_export_includes_archived_votes(self):
+        close_due_polls()
+        response = self.client.get(reverse('export_club_data', args=[self.club.id, 'votes']), {'format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertEqual({row['poll_id'] for row in rows}, {self.ended.id, self.open.id})
+
+
+class LiveTalliesTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.admin)
+        Member.objects.create(user=self.admin, club=self.club, role='ADMIN')
+        self.poll = Poll.objects.create(
+            club=self.club, title='Captain', description='', created_by=self.admin,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        self.option = PollOption.objects.create(poll=self.poll, text='Alice', vote_count=2)
+        ended = Poll.objects.create(
+            club=self.club, title='Venue', description='', created_by=self.admin,
+            end_date=timezone.now() - timedelta(days=1),
+        )
+        PollOption.objects.create(poll=ended, text='Library', vote_count=4)
+        self.proposal = Proposal.objects.create(club=self.club, title='New boards', description='', created_by=self.admin, vote_count=3)
+        self.client.force_login(self.admin)
+
+    def read_stream(self, events, between=None):
+        """Return the first events messages of the club's stream, calling between() after the first two"""
+        async def read():
+            stream = aevent_stream(self.club.id)
+            messages = []
+            try:
+                async for message in stream:
+                    messages.append(message)
+                    if len(messages) == 2 and between is not None:
+                        await sync_to_async(between)()
+                    if len(messages) == events:
+                        return messages
+            finally:
+                await stream.aclose()
+
+        return async_to_sync(read)()
+
+    def test_vote_counts(self):
+        self.assertEqual(vote_counts(self.club.id), {('option', self.option.id): 2, ('proposal', self.proposal.id): 3})
+        self.assertEqual(vote_counts(self.club.id, {('proposal', self.proposal.id)}), {('proposal', self.proposal.id): 3})
+
+    @mock.patch('clubs.live.LIVE_TICK', 0.01)
+    def test_stream_starts_with_counts_and_sends_changed_counts(self):
+        def vote():
+            Proposal.objects.filter(id=self.proposal.id).update(vote_count=4)
+            get_broker().publish(self.club.id, {('proposal', self.proposal.id): 1})
+
+        messages = self.read_stream(3, between=vote)
+        self.assertTrue(messages[0].startswith('retry: '))
+        snapshot = json.loads(messages[1].split('data: ')[1])
+        self.assertEqual(snapshot, {'options': {str(self.option.id): 2}, 'proposals': {str(self.proposal.id): 3}})
+        # The event has the count itself, not the change
+        self.assertEqual(json.loads(messages[2].split('data: ')[1]), {'options': {}, 'proposals': {str(self.proposal.id): 4}})
+        self.assertEqual(get_broker()._subscriptions.get(self.club.id), None)
+
+    def test_pages_subscribe_only_under_asgi(self):
+        response = self.client.get(reverse('proposal_list', args=[self.club.id]))
+        self.assertNotContains(response, 'data-live-url')
+        self.assertEqual(self.client.get(reverse('club_events', args=[self.club.id])).status_code, 204)
+        with override_settings(CLUB_ASYNC_VIEWS=True):
+            response = self.client.get(reverse('poll_results', args=[self.poll.id]))
+        self.assertContains(response, 'data-live-url')
+
+    def test_broker_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Broker()
+        self.assertIsInstance(LocalBroker(), Broker)
+
+
+class MembershipTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin')
+        self.user = User.objects.create_user(username='member')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.admin)
+        Member.objects.create(user=self.admin, club=self.club, role='ADMIN')
+        self.member = Member.objects.create(user=self.user, club=self.club)
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def role(self, method='get', **kwargs):
+        request = getattr(RequestFactory(), method)('/')
+        request.user = self.user
+        return club_role(request, self.club.id, **kwargs)
+
+    def test_role_is_cached_between_requests(self):
+        self.assertEqual(self.role(), 'MEMBER')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.role(), 'MEMBER')
+
+    def test_non_members_are_cached_too(self):
+        self.member.delete()
+        self.assertIsNone(self.role())
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.role())
+
+    def test_saving_or_deleting_a_member_clears_the_cached_role(self):
+        self.assertEqual(self.role(), 'MEMBER')
+        self.member.role = 'SECRETARY'
+        self.member.save()
+        self.assertEqual(self.role(), 'SECRETARY')
+        self.member.delete()
+        self.assertIsNone(self.role())
+
+    def test_writes_read_the_role_from_the_database(self):
+        # Another process promoted the user and cached it; this one demoted
+        # them without that process hearing about it
+        cache.set(membership_cache_key(self.user.id, self.club.id), 'ADMIN')
+        self.assertEqual(self.role(), 'ADMIN')
+        self.assertEqual(self.role(method='post'), 'MEMBER')
+        self.assertEqual(self.role(fresh=True), 'MEMBER')
+
+    def test_admin_views_ignore_a_stale_cached_role(self):
+        cache.set(membership_cache_key(self.user.id, self.club.id), 'ADMIN')
+        response = self.client.get(reverse('manage_roles', args=[self.club.id]))
+        self.assertRedirects(response, reverse('club_detail', args=[self.club.id]), fetch_redirect_response=False)
+        response = self.client.post(reverse('create_poll', args=[self.club.id]), {'title': 'Captain'})
+        self.assertRedirects(response, reverse('club_detail', args=[self.club.id]), fetch_redirect_response=False)
+        self.assertFalse(Poll.objects.exists())
+
+    def test_member_required(self):
+        outsider = User.objects.create_user(username='outsider')
+        self.client.force_login(outsider)
+        response = self.client.get(reverse('create_proposal', args=[self.club.id]))
+        self.assertRedirects(response, reverse('club_detail', args=[self.club.id]), fetch_redirect_response=False)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('create_proposal', args=[self.club.id])).status_code, 200)
+
+
+@task('clubs.tests.long_job')
+def long_job(steps):
+    # Claimed long enough ago that the lock would have expired by now
+    for step in range(steps):
+        Job.objects.filter(id=current_job().id).update(locked_at=timezone.now() - JOB_LOCK_TIMEOUT * 2)
+        report_progress(step=step)
+        LockRenewalTests.reclaimed.append(claim(current_job().id))
+
+
+class LockRenewalTests(TestCase):
+    reclaimed = []
+
+    def setUp(self):
+        LockRenewalTests.reclaimed = []
+
+    def test_job_with_a_fresh_heartbeat_is_not_reclaimed(self):
+        job = Job.objects.create(name='clubs.tests.long_job', payload={'steps': 3})
+        execute(claim(job.id))
+        self.assertEqual(self.reclaimed, [None, None, None])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.progress), ('DONE', 1, {'step': 2}))
+
+    def test_job_with_an_expired_lock_is_reclaimed(self):
+        job = Job.objects.create(
+            name='clubs.tests.long_job', payload={'steps': 0}, status='RUNNING', attempts=1,
+            locked_at=timezone.now() - JOB_LOCK_TIMEOUT * 2,
+        )
+        reclaimed = claim(job.id)
+        self.assertEqual((reclaimed.status, reclaimed.attempts), ('RUNNING', 2))
+        # Freshly locked, so a third runner can't take it
+        self.assertIsNone(claim(job.id))
+
+
+@override_settings(CLUB_SEARCH_BACKEND='fts')
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator')
+
+    def add_club(self, name, description=''):
+        return Club.objects.create(name=name, description=description, creator=self.creator)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('club_search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def search_all(self, query, limit):
+        """Walk every page of a search; returns the club ids in order"""
+        ids, cursor = [], None
+        while True:
+            page = self.search(query, limit=limit, **({'cursor': cursor} if cursor else {}))
+            ids += [club['id'] for club in page['clubs']]
+            cursor = page['next']
+            if cursor is None:
+                return ids
+
+    def test_triggers_keep_the_index_in_sync(self):
+        club = self.add_club('Robotics Guild', 'We build robots')
+        self.assertEqual([club_id for club_id, _ in fts_search('robotics')], [club.id])
+        club.name = 'Drone Guild'
+        club.save()
+        self.assertEqual(fts_search('robotics'), [])
+        self.assertEqual([club_id for club_id, _ in fts_search('drone')], [club.id])
+        club.delete()
+        self.assertEqual(fts_search('drone'), [])
+
+    def test_results_are_ranked_by_bm25_not_by_name(self):
+        in_description = self.add_club('Alpha Club', 'We play chess on Fridays and Sundays')
+        in_name = self.add_club('Zugzwang Chess', 'Board games')
+        self.assertEqual([club_id for club_id, _ in fts_search('chess')], [in_name.id, in_description.id])
+
+    def test_first_page_is_reranked_by_fuzzy_score(self):
+        # BM25 weighs the hit in the name most; the fuzzy scorers prefer the
+        # description that is all about chess
+        in_name = self.add_club('Chess Masters', 'Board games')
+        in_description = self.add_club('Alpha Club', 'Chess')
+        self.assertEqual([club_id for club_id, _ in fts_search('chess')], [in_name.id, in_description.id])
+        self.assertEqual([club['id'] for club in self.search('chess')['clubs']], [in_description.id, in_name.id])
+        # Later pages are not re-ranked
+        cursor = self.search('chess', limit=1)['next']
+        self.assertEqual([club['id'] for club in self.search('chess', limit=1, cursor=cursor)['clubs']], [in_description.id])
+
+    def test_pages_follow_the_ranking_past_any_cap(self):
+        clubs = [self.add_club(f'Chess {i}', 'chess ' * (i % 3) + 'board games') for i in range(60)]
+        bm25 = [club_id for club_id, _ in fts_search('chess')]
+        self.assertEqual(sorted(bm25), sorted(club.id for club in clubs))
+        # The first page holds the top hits in fuzzy order; later pages carry
+        # on in BM25 order with nothing skipped or repeated
+        for limit in (7, 100):
+            everything = self.search_all('chess', limit=limit)
+            self.assertEqual(sorted(everything[:limit]), sorted(bm25[:limit]))
+            self.assertEqual(everything[limit:], bm25[limit:])
+
+    def test_accents_are_folded_by_the_tokenizer(self):
+        club = self.add_club('Échecs Français', 'Le club des échecs')
+        self.add_club('Chess Club')
+        for query in ('échecs', 'Échecs', 'echecs', 'franç'):
+            with self.subTest(query=query):
+                self.assertEqual([club_id for club_id, _ in fts_search(query)], [club.id])
+                self.assertEqual([found['id'] for found in self.search(query)['clubs']], [club.id])
+
+    def test_deleted_clubs_are_left_out(self):
+        kept = self.add_club('Chess Club')
+        deleted = self.add_club('Chess Society')
+        Club.objects.filter(id=deleted.id).update(deleted_at=timezone.now())
+        self.assertEqual(self.search_all('chess', limit=1), [kept.id])
+
+    def test_substring_fallback_pages_by_name(self):
+        # FTS only matches word prefixes, so 'hess' falls back to a substring search
+        clubs = [self.add_club(f'Chess {name}') for name in ('Circle', 'Alpha', 'Beta')]
+        self.assertEqual(self.search_all('hess', limit=1), [clubs[1].id, clubs[2].id, clubs[0].id])
+
+    def test_missing_fts_table_falls_back_to_substring_search(self):
+        club = self.add_club('Chess Club')
+        with mock.patch('clubs.fts.FTS_TABLE', 'clubs_missing_fts'), self.assertLogs('clubs.views', 'ERROR'):
+            self.assertEqual(self.search_all('chess', limit=5), [club.id])
+
+
+class SearchCursorTests(TestCase):
+    NAMES = ['Échecs', 'echo', 'Zebra', 'éclair', 'Eagle', 'apple', 'Über', 'Chess', 'chess']
+
+    def setUp(self):
+        creator = User.objects.create_user(username='creator')
+        self.clubs = Club.objects.bulk_create(
+            Club(name=name, description='A club', creator=creator) for name in self.NAMES
+        )
+        club_index.clear()
+
+    def walk(self, query, limit=2):
+        ids, cursor = [], None
+        while True:
+            params = {'q': query, 'limit': limit, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(reverse('club_search'), params).json()
+            ids += [club['id'] for club in page['clubs']]
+            cursor = page['next']
+            if cursor is None:
+                return ids
+
+    def database_order(self, clubs):
+        return list(
+            clubs.annotate(name_key=Lower('name')).order_by('name_key', 'id').values_list('id', flat=True)
+        )
+
+    def test_pages_of_every_club_follow_the_database_order(self):
+        self.assertEqual(self.walk(''), self.database_order(Club.objects.all()))
+
+    def test_index_pages_sort_like_the_database(self):
+        # Short queries are substring matches, so this matches every name with an e
+        expected = self.database_order(Club.objects.filter(name__contains='e') | Club.objects.filter(name__contains='E'))
+        self.assertEqual(self.walk('e'), expected)
+        self.assertEqual(club_index.search('e'), expected)
+
+    def test_substring_pages_sort_like_the_database(self):
+        with mock.patch('clubs.search.ClubSearchIndex.search', side_effect=RuntimeError), \
+                self.assertLogs('clubs.views', 'ERROR') as logs:
+            self.assertEqual(self.walk('club', limit=1), self.database_order(Club.objects.all()))
+        self.assertIn('falling back to a substring search', logs.output[0])
+
+    def test_cursor_round_trip(self):
+        # SQLite's LOWER() leaves É alone, so the cursor must too
+        first = self.client.get(reverse('club_search'), {'limit': 7}).json()
+        name_key, club_id = json.loads(base64.urlsafe_b64decode(first['next']))
+        self.assertEqual((name_key, club_id), ('Échecs', self.clubs[0].id))
+        second = self.client.get(reverse('club_search'), {'limit': 7, 'cursor': first['next']}).json()
+        self.assertEqual([club['name'] for club in second['clubs']], ['Über', 'éclair'])
+        self.assertEqual(self.client.get(reverse('club_search'), {'cursor': 'not a cursor'}).status_code, 400)
+
+
+def full_scan_search(query, clubs):
+    """The club search as it was before the index: fuzzywuzzy over every club"""
+    from fuzzywuzzy import fuzz, process
+
+    matched = set()
+    for field, scorer, cutoff in (('name', fuzz.token_sort_ratio, 55), ('description', fuzz.token_set_ratio, 45)):
+        texts = [(club.id, getattr(club, field) or '') for club in clubs]
+        for text, score in process.extract(query, [text for _, text in texts], scorer=scorer, limit=15):
+            if score >= cutoff:
+                matched |= {club_id for club_id, club_text in texts if club_text == text}
+    if not matched or len(query) <= 2:
+        needle = query.lower()
+        matched = {club.id for club in clubs if needle in club.name.lower() or needle in club.description.lower()}
+    return matched
+
+
+class SearchIndexTests(TestCase):
+    QUERIES = ['chess', 'ches', 'robot club', 'photo', 'hiking society', 'debate team', 'jazz', 'go', 'xyz', 'Board games']
+
+    def setUp(self):
+        creator = User.objects.create_user(username='creator')
+        topics = ['Chess', 'Robotics', 'Debate', 'Photography', 'Hiking', 'Jazz', 'Go', 'Film']
+        kinds = ['Club', 'Society', 'Team', 'Circle']
+        self.clubs = Club.objects.bulk_create(
+            Club(
+                name=f'{topic} {kinds[i % len(kinds)]}',
+                description=f'A friendly {topic.lower()} group. We play board games on {["Monday", "Friday"][i % 2]}.',
+                creator=creator,
+            )
+            for i, topic in enumerate(topics * 3)
+        )
+        club_index.clear()
+
+    def test_matches_the_full_scan(self):
+        for query in self.QUERIES:
+            with self.subTest(query=query):
+                self.assertEqual(set(club_index.search(query)), full_scan_search(query, self.clubs))
+
+    def test_scoring_runs_without_the_lock(self):
+        club_index.ensure_built()
+        acquired = []
+        score = fuzz.token_sort_ratio
+
+        def scorer(*args):
+            # Another thread must be able to take the lock while this one scores
+            def try_lock():
+                if club_index._lock.acquire(blocking=False):
+                    acquired.append(True)
+                    club_index._lock.release()
+                else:
+                    acquired.append(False)
+
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return score(*args)
+
+        with mock.patch('clubs.search.fuzz.token_sort_ratio', scorer):
+            club_index.search('chess')
+        self.assertTrue(acquired)
+        self.assertTrue(all(acquired))
+
+    def test_updates_reach_the_next_search(self):
+        club = self.clubs[0]
+        club.name = 'Quidditch Club'
+        club.save()
+        self.assertIn(club.id, club_index.search('quidditch'))
+        club.delete()
+        self.assertNotIn(club.id, club_index.search('quidditch'))
+
+
+class LockErrorTests(TestCase):
+    def sqlite_error(self, locked):
+        """Return the Django OperationalError for a real SQLite error, a lock error if locked"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'locks.sqlite3')
+            holder = sqlite3.connect(path, isolation_level=None)
+            writer = sqlite3.connect(path, timeout=0)
+            try:
+                holder.execute('CREATE TABLE busy (id INTEGER)')
+                if locked:
+                    holder.execute('BEGIN EXCLUSIVE')
+                try:
+                    writer.execute('INSERT INTO busy VALUES (1)' if locked else 'SELECT * FROM no_busy_table')
+                except sqlite3.Error as e:
+                    try:
+                        raise DjangoOperationalError(*e.args) from e
+                    except DjangoOperationalError as wrapped:
+                        return wrapped
+            finally:
+                holder.close()
+                writer.close()
+        self.fail('No error raised')
+
+    def test_busy_database_is_a_lock_error(self):
+        self.assertTrue(is_lock_error(self.sqlite_error(locked=True)))
+
+    def test_other_errors_mentioning_busy_are_not(self):
+        error = self.sqlite_error(locked=False)
+        self.assertIn('busy', str(error))
+        self.assertFalse(is_lock_error(error))
+
+
+class VoteCounterTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.creator)
+        self.users = User.objects.bulk_create(User(username=f'voter{i}') for i in range(5))
+        self.proposals = Proposal.objects.bulk_create(
+            Proposal(club=self.club, title=f'Proposal {i}', description='', created_by=self.creator) for i in range(5)
+        )
+        self.proposal = self.proposals[0]
+
+    def assertCountsMatchRows(self):
+        for proposal in Proposal.objects.all():
+            self.assertEqual(proposal.vote_count, ProposalVote.objects.filter(proposal=proposal).count(), proposal.title)
+
+    def test_record_and_withdraw_keep_the_count_equal_to_the_rows(self):
+        for user in self.users:
+            self.assertTrue(record_vote(ProposalVote(proposal=self.proposal, user=user), self.proposal))
+        self.assertFalse(record_vote(ProposalVote(proposal=self.proposal, user=self.users[0]), self.proposal))
+        self.assertCountsMatchRows()
+
+        self.assertEqual(withdraw_votes(ProposalVote.objects.filter(proposal=self.proposal, user__in=self.users[:2]), self.proposal), 2)
+        self.assertEqual(withdraw_votes(ProposalVote.objects.filter(proposal=self.proposal, user=self.users[0]), self.proposal), 0)
+        self.assertCountsMatchRows()
+        self.proposal.refresh_from_db()
+        self.assertEqual(self.proposal.vote_count, 3)
+
+    def test_record_vote_only_swallows_duplicate_votes(self):
+        poll = Poll.objects.create(
+            club=self.club, title='Captain', description='', created_by=self.creator,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        option = PollOption.objects.create(poll=poll, text='First')
+        self.assertTrue(record_vote(Vote(poll=poll, option=option, user=self.users[0]), option))
+        self.assertFalse(record_vote(Vote(poll=poll, option=option, user=self.users[0]), option))
+        with self.assertRaises(IntegrityError):
+            record_vote(Vote(poll=poll, option=option, user_id=None), option)
+        with self.assertRaises(IntegrityError):
+            record_vote(ProposalVote(proposal=self.proposal, user_id=None), self.proposal)
+        option.refresh_from_db()
+        self.proposal.refresh_from_db()
+        self.assertEqual((option.vote_count, self.proposal.vote_count), (1, 0))
+
+    def test_reconcile_fixes_drifted_counts_across_batches(self):
+        ProposalVote.objects.bulk_create(
+            ProposalVote(proposal=proposal, user=user)
+            for i, proposal in enumerate(self.proposals) for user in self.users[:i]
+        )
+        # Proposals 1 and 3 are right already; the rest have drifted
+        Proposal.objects.filter(id=self.proposals[1].id).update(vote_count=1)
+        Proposal.objects.filter(id=self.proposals[3].id).update(vote_count=3)
+        Proposal.objects.filter(id=self.proposals[4].id).update(vote_count=9)
+        Proposal.objects.filter(id=self.proposals[2].id).update(vote_count=0)
+        Proposal.objects.filter(id=self.proposals[0].id).update(vote_count=2)
+
+        self.assertEqual(reconcile_vote_counts(Proposal, ProposalVote, 'proposal', batch_size=2), 3)
+        self.assertCountsMatchRows()
+        self.assertEqual(reconcile_vote_counts(Proposal, ProposalVote, 'proposal', batch_size=2), 0)
+
+    def test_reconcile_only_checks_the_given_rows(self):
+        Proposal.objects.update(vote_count=7)
+        rows = Proposal.objects.filter(id__in=[proposal.id for proposal in self.proposals[:2]])
+        self.assertEqual(reconcile_vote_counts(Proposal, ProposalVote, 'proposal', rows=rows), 2)
+        self.assertEqual(Proposal.objects.filter(vote_count=7).count(), 3)
+
+    def test_migration_backfill(self):
+        ProposalVote.objects.bulk_create(ProposalVote(proposal=self.proposal, user=user) for user in self.users)
+        Proposal.objects.update(vote_count=0)
+        import_module('clubs.migrations.0005_vote_counters').backfill_vote_counts(apps, None)
+        self.assertCountsMatchRows()
+
+
+class MemberRemovalTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin')
+        self.other_admin = User.objects.create_user(username='other_admin')
+        self.voters = User.objects.bulk_create(User(username=f'voter{i}') for i in range(4))
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.admin)
+        Member.objects.create(user=self.admin, club=self.club, role='ADMIN')
+        Member.objects.create(user=self.other_admin, club=self.club, role='ADMIN')
+        Member.objects.bulk_create(Member(user=user, club=self.club) for user in self.voters)
+        everyone = [self.admin, self.other_admin, *self.voters]
+
+        poll = Poll.objects.create(
+            club=self.club, title='Captain', description='', created_by=self.admin,
+            end_date=timezone.now() + timedelta(days=1),
+        )
+        options = PollOption.objects.bulk_create(PollOption(poll=poll, text=text) for text in ('First', 'Second'))
+        Vote.objects.bulk_create(Vote(poll=poll, option=options[i % 2], user=user) for i, user in enumerate(everyone))
+        closed = Poll.objects.create(
+            club=self.club, title='Venue', description='', created_by=self.admin,
+            end_date=timezone.now() - timedelta(days=1), closed_at=timezone.now(),
+        )
+        closed_option = PollOption.objects.create(poll=closed, text='Hall')
+        ArchivedVote.objects.bulk_create(
+            ArchivedVote(poll=closed, option=closed_option, user=user, voted_at=timezone.now()) for user in everyone
+        )
+        proposals = Proposal.objects.bulk_create(
+            Proposal(club=self.club, title=f'By {user.username}', description='', created_by=user)
+            for user in (self.admin, *self.voters[:2])
+        )
+        ProposalVote.objects.bulk_create(
+            ProposalVote(proposal=proposal, user=user) for proposal in proposals for user in everyone
+        )
+        reconcile_vote_counts(PollOption, Vote, 'option')
+        reconcile_vote_counts(Proposal, ProposalVote, 'proposal')
+        self.removed = self.voters[:2]
+        self.removed_ids = [user.id for user in self.removed]
+
+    def assertCountsMatchRows(self):
+        for option in PollOption.objects.all():
+            self.assertEqual(option.vote_count, Vote.objects.filter(option=option).count(), option.text)
+        for proposal in Proposal.objects.all():
+            self.assertEqual(proposal.vote_count, ProposalVote.objects.filter(proposal=proposal).count(), proposal.title)
+
+    def assertPurged(self):
+        self.assertFalse(Vote.objects.filter(user__in=self.removed).exists())
+        self.assertFalse(ArchivedVote.objects.filter(user__in=self.removed).exists())
+        self.assertFalse(ProposalVote.objects.filter(user__in=self.removed).exists())
+        self.assertEqual(list(Proposal.objects.values_list('title', flat=True)), ['By admin'])
+        # Everyone else's votes are kept
+        self.assertEqual(Vote.objects.count(), 4)
+        self.assertEqual(ArchivedVote.objects.count(), 4)
+        self.assertEqual(Proposal.objects.get().vote_count, 4)
+        self.assertCountsMatchRows()
+
+    def test_remove_members_deletes_rows_and_queues_the_purge(self):
+        members = Member.objects.filter(club=self.club, user__in=self.removed).select_related('user')
+        self.assertEqual(remove_members(self.club, members), ['voter0', 'voter1'])
+        self.assertFalse(Member.objects.filter(user__in=self.removed).exists())
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'clubs.purge_member_activity')
+        self.assertEqual((job.payload['club_id'], job.payload['user_ids']), (self.club.id, self.removed_ids))
+        # The activity itself goes in the background
+        self.assertEqual(Vote.objects.filter(user__in=self.removed).count(), 2)
+
+    def test_removing_nobody_queues_nothing(self):
+        self.assertEqual(remove_members(self.club, []), [])
+        self.assertFalse(Job.objects.exists())
+
+    def test_purge_is_the_same_at_every_batch_size(self):
+        # 2 votes, 2 archived votes, 6 proposal votes and 2 proposals of the removed users
+        for batch_size in (1, 2, 3, 4, 6, 500):
+            with self.subTest(batch_size=batch_size), transaction.atomic():
+                purge_member_activity(self.club.id, self.removed_ids, timezone.now(), batch_size=batch_size)
+                self.assertPurged()
+                transaction.set_rollback(True)
+
+    def test_purge_resumes_after_a_partial_run(self):
+        with mock.patch('clubs.removal.heartbeat', side_effect=[None, None, RuntimeError('worker stopped')]):
+            with self.assertRaises(RuntimeError):
+                purge_member_activity(self.club.id, self.removed_ids, timezone.now(), batch_size=1)
+        # Both live votes and one archived vote went, each batch with its counter change
+        self.assertFalse(Vote.objects.filter(user__in=self.removed).exists())
+        self.assertEqual(ArchivedVote.objects.filter(user__in=self.removed).count(), 1)
+        self.assertCountsMatchRows()
+
+        purge_member_activity(self.club.id, self.removed_ids, timezone.now(), batch_size=1)
+        self.assertPurged()
+
+    def test_purge_keeps_activity_after_the_removal(self):
+        removed_at = timezone.now()
+        rejoined = Proposal.objects.create(club=self.club, title='Rejoined', description='', created_by=self.removed[0])
+        purge_member_activity(self.club.id, self.removed_ids, removed_at)
+        self.assertTrue(Proposal.objects.filter(id=rejoined.id).exists())
+        self.assertFalse(Proposal.objects.filter(created_by__in=self.removed, created_at__lte=removed_at).exists())
+
+    def test_bulk_remove_skips_other_admins(self):
+        members = dict(Member.objects.filter(club=self.club).values_list('user__username', 'id'))
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('bulk_remove_members', args=[self.club.id]), {
+            'member_ids': [members['other_admin'], members['voter0'], members['voter1'], 'all'],
+        })
+        self.assertRedirects(response, reverse('manage_roles', args=[self.club.id]), fetch_redirect_response=False)
+        self.assertEqual(
+            set(Member.objects.filter(club=self.club).values_list('user__username', flat=True)),
+            {'admin', 'other_admin', 'voter2', 'voter3'},
+        )
+        messages = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertIn('You cannot remove other admins from the club.', messages)
+        self.assertIn('Removed 2 member(s): voter0, voter1.', messages)
+
+        job = Job.objects.get(name='clubs.purge_member_activity')
+        execute(claim(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertPurged()
+
+
+class ClubDeletionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin')
+        self.users = User.objects.bulk_create(User(username=f'user{i}') for i in range(3))
+        self.club = self.add_club('Chess')
+        self.other = self.add_club('Go')
+        self.counts = {step: model.objects.filter(**{field: self.club.id}).count() for step, model, field in PURGE_STEPS}
+
+    def add_club(self, name):
+        club = Club.objects.create(name=name, description='', creator=self.admin)
+        Member.objects.bulk_create(Member(user=user, club=club) for user in [self.admin, *self.users])
+        for title, end_date, closed_at in [
+            ('Open', timezone.now() + timedelta(days=1), None),
+            ('Closed', timezone.now() - timedelta(days=1), timezone.now()),
+        ]:
+            poll = Poll.objects.create(
+                club=club, title=title, description='', created_by=self.admin, end_date=end_date, closed_at=closed_at,
+            )
+            options = PollOption.objects.bulk_create(PollOption(poll=poll, text=text) for text in ('First', 'Second'))
+            model = Vote if closed_at is None else ArchivedVote
+            extra = {} if closed_at is None else {'voted_at': timezone.now()}
+            model.objects.bulk_create(
+                model(poll=poll, option=options[i % 2], user=user, **extra) for i, user in enumerate(self.users)
+            )
+        proposals = Proposal.objects.bulk_create(
+            Proposal(club=club, title=f'Proposal {i}', description='', created_by=self.admin) for i in range(2)
+        )
+        ProposalVote.objects.bulk_create(
+            ProposalVote(proposal=proposal, user=user) for proposal in proposals for user in self.users
+        )
+        return club
+
+    def other_club_rows(self):
+        return {step: model.objects.filter(**{field: self.other.id}).count() for step, model, field in PURGE_STEPS}
+
+    def assertPurged(self):
+        self.assertFalse(Club.all_objects.filter(id=self.club.id).exists())
+        for step, model, field in PURGE_STEPS:
+            self.assertFalse(model.objects.filter(**{field: self.club.id}).exists(), step)
+        self.assertEqual(self.other_club_rows(), self.counts)
+
+    def test_steps_cover_every_club_table_leaves_first(self):
+        models = [model for _, model, _ in PURGE_STEPS]
+        self.assertEqual(set(models), set(apps.get_app_config('clubs').get_models()) - {Club, Job})
+        for position, model in enumerate(models):
+            for relation in model._meta.related_objects:
+                # Anything that would cascade from this table is purged before it
+                self.assertIn(relation.related_model, models[:position], model.__name__)
+
+    def test_mark_club_deleted_hides_the_club_and_queues_the_purge(self):
+        mark_club_deleted(self.club)
+        self.assertFalse(Club.objects.filter(id=self.club.id).exists())
+        self.assertTrue(Club.all_objects.filter(id=self.club.id).exists())
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload), ('clubs.purge_club', {'club_id': self.club.id}))
+
+    def test_live_clubs_are_not_purged(self):
+        purge_club(self.club.id)
+        self.assertTrue(Club.objects.filter(id=self.club.id).exists())
+        self.assertEqual(Member.objects.filter(club=self.club).count(), 4)
+
+    def test_purge_is_the_same_at_every_batch_size(self):
+        mark_club_deleted(self.club)
+        for batch_size in (1, 2, 3, 4, 1000):
+            with self.subTest(batch_size=batch_size), transaction.atomic():
+                purge_club(self.club.id, batch_size=batch_size)
+                self.assertPurged()
+                transaction.set_rollback(True)
+
+    def test_purge_resumes_after_an_interrupted_run(self):
+        mark_club_deleted(self.club)
+        job = Job.objects.get()
+        calls = []
+
+        def report_then_stop(**progress):
+            report_progress(**progress)
+            calls.append(progress)
+            if len(calls) == 3:
+                raise RuntimeError('worker stopped')
+
+        # Stopped part way through the archived votes, two rows at a time
+        with mock.patch('clubs.deletion.report_progress', side_effect=report_then_stop), \
+                mock.patch.object(purge_club, '__defaults__', (2,)), self.assertLogs('clubs.jobs', 'ERROR'):
+            execute(claim(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+        self.assertEqual(job.progress['deleted'], {'votes': 3, 'archived_votes': 2})
+        self.assertEqual(ArchivedVote.objects.filter(poll__club=self.club).count(), 1)
+        self.assertTrue(Club.all_objects.filter(id=self.club.id).exists())
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        execute(claim(job.id))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('DONE', 2))
+        self.assertEqual(job.progress, {'step': 'done', 'deleted': self.counts})
+        self.assertPurged()
+
+
+class AsyncViewTests(TestCase):
+    """The async views share their queries with clubs.views and must give the same results"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='member')
+        names = ['Chess Club', 'chess masters', 'Go Club', 'Debate Society', 'Échecs']
+        self.clubs = Club.objects.bulk_create(
+            Club(name=name, description='Board games' if 'Club' in name else 'Talks', creator=self.user)
+            for name in names
+        )
+        club_index.clear()
+
+    def search(self, module, query, after=None, limit=None):
+        if module is views:
+            return [club.id for club in views._search_clubs(query, after=after, limit=limit)]
+
+        async def search():
+            return [club.id for club in await async_views._search_clubs(query, after=after, limit=limit)]
+        return async_to_sync(search)()
+
+    def test_search_matches_the_sync_view(self):
+        for backend in ('index', 'fts'):
+            for query in ('', 'chess', 'club', 'board', 'lub'):
+                with self.subTest(backend=backend, query=query), override_settings(CLUB_SEARCH_BACKEND=backend):
+                    expected = self.search(views, query)
+                    self.assertEqual(self.search(async_views, query), expected)
+                    self.assertEqual(self.search(async_views, query, limit=2), expected[:2])
+
+    def test_search_errors_are_logged(self):
+        with mock.patch('clubs.search.ClubSearchIndex.search', side_effect=RuntimeError), \
+                self.assertLogs('clubs.async_views', 'ERROR'):
+            ids = self.search(async_views, 'club')
+        # Substring matches in name order
+        self.assertEqual(ids, [club.id for club in views._keyset_queryset(views._substring_matches('club'))])
+        self.assertEqual(len(ids), 2)
+
+    def test_proposal_list_matches_the_sync_view(self):
+        club = self.clubs[0]
+        Member.objects.create(user=self.user, club=club)
+        proposals = Proposal.objects.bulk_create(
+            Proposal(club=club, title=f'Proposal {i}', description='', created_by=self.user, vote_count=i % 3)
+            for i in range(30)
+        )
+        ProposalVote.objects.create(proposal=proposals[-1], user=self.user)
+        self.client.force_login(self.user)
+        for params in ({}, {'sort': 'votes'}, {'page': 2}):
+            with self.subTest(params=params):
+                request = RequestFactory().get('/', params)
+                request.user = self.user
+                request.session = self.client.session
+                request.auser = sync_to_async(lambda: self.user)
+                with mock.patch('clubs.async_views.render', side_effect=lambda request, template, context: context):
+                    context = async_to_sync(async_views.proposal_list)(request, club.id)
+                expected = self.client.get(reverse('proposal_list', args=[club.id]), params).context
+                self.assertEqual(list(context['proposals']), list(expected['proposals']))
+                self.assertEqual(context['user_voted'], expected['user_voted'])
+                self.assertEqual(context['sort'], expected['sort'])
+
+
+class HomeCardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member')
+        self.other = User.objects.create_user(username='other')
+        self.chess = Club.objects.create(name='Chess', description='Chess club', creator=self.user)
+        self.go = Club.objects.create(name='Go', description='Go club', creator=self.user)
+        Member.objects.create(user=self.user, club=self.chess)
+        Member.objects.create(user=self.other, club=self.chess)
+        Member.objects.create(user=self.other, club=self.go)
+        cache.clear()
+
+    def titles(self, user):
+        return [card.split('card-title">')[1].split('<')[0] for card in home_club_cards(user)]
+
+    def test_warm_cards_need_no_queries(self):
+        self.assertEqual(self.titles(self.user), ['Chess'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(self.user), ['Chess'])
+
+    def test_joining_and_leaving_update_the_list(self):
+        self.assertEqual(self.titles(self.user), ['Chess'])
+        member = Member.objects.create(user=self.user, club=self.go)
+        self.assertEqual(self.titles(self.user), ['Chess', 'Go'])
+        member.delete()
+        self.assertEqual(self.titles(self.user), ['Chess'])
+
+    def test_club_changes_update_every_members_card(self):
+        self.assertIn('2 members', home_club_cards(self.other)[0])
+        self.chess.name = 'Checkers'
+        self.chess.save()
+        Member.objects.filter(user=self.user, club=self.chess).get().delete()
+        cards = home_club_cards(self.other)
+        self.assertEqual(self.titles(self.other), ['Checkers', 'Go'])
+        self.assertIn('1 members', cards[0])
+
+    def test_deleted_club_leaves_home_pages_before_the_purge(self):
+        self.assertEqual(self.titles(self.user), ['Chess'])
+        self.assertEqual(self.titles(self.other), ['Chess', 'Go'])
+        mark_club_deleted(self.chess)
+        self.assertEqual(self.titles(self.user), [])
+        self.assertEqual(self.titles(self.other), ['Go'])
+        # The rebuilt lists leave the club out while its members remain
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(self.other), ['Go'])
+        self.assertTrue(Member.objects.filter(club=self.chess).exists())
+
+
+class MemberImportTests(TestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create(User(username=f'user{i}') for i in range(4))
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.users[0])
+        Member.objects.create(user=self.users[0], club=self.club)
+
+    def rows(self, text):
+        return read_member_rows(text.splitlines())
+
+    def test_counts_created_skipped_and_errors(self):
+        result = import_members(self.rows(
+            'username,club,role\n'
+            f'user0,Chess\nuser1,Chess,secretary\nuser2,{self.club.id}\nuser2,Chess\nnobody,Chess\nuser3\n'
+        ), batch_size=2)
+        self.assertEqual((result.rows, result.created, result.skipped, result.error_count), (6, 2, 2, 2))
+        self.assertEqual(Member.objects.get(user=self.users[1]).role, 'SECRETARY')
+
+    def test_members_added_during_the_import_are_not_counted(self):
+        real_atomic = transaction.atomic
+        raced = []
+
+        def atomic(*args, **kwargs):
+            # Someone else adds user1 between the existence check and the insert
+            if not raced:
+                raced.append(Member.objects.create(user=self.users[1], club=self.club))
+            return real_atomic(*args, **kwargs)
+
+        with mock.patch('clubs.imports.transaction.atomic', side_effect=atomic):
+            result = import_members(self.rows('user1,Chess\nuser2,Chess\n'))
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(Member.objects.filter(club=self.club).count(), 3)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='=HYPERLINK("http://example.com")')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.user)
+        Member.objects.create(user=self.user, club=self.club)
+        for title in ('+1 new boards', '-5 chairs', '@SUM(A1)', '\tTabbed', 'Plain - title', '2024 budget'):
+            Proposal.objects.create(club=self.club, title=title, description='', created_by=self.user)
+
+    def test_csv_cells_that_start_a_formula_are_quoted(self):
+        rows = list(csv.reader(export_rows(self.club, 'proposals', 'csv')))
+        self.assertEqual([row[1] for row in rows[1:]], [
+            "'+1 new boards", "'-5 chairs", "'@SUM(A1)", "'\tTabbed", 'Plain - title', '2024 budget',
+        ])
+        self.assertEqual({row[2] for row in rows[1:]}, {'\'=HYPERLINK("http://example.com")'})
+
+    def test_jsonl_values_are_unchanged(self):
+        rows = [json.loads(line) for line in export_rows(self.club, 'proposals', 'jsonl')]
+        self.assertEqual(rows[0]['title'], '+1 new boards')
+        self.assertEqual(rows[0]['created_by'], self.user.username)
+
+
+class LogoThumbnailTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+        self.user = User.objects.create_user(username='creator')
+
+    def club_with_logo(self, image, fmt='PNG'):
+        buffer = io.BytesIO()
+        image.save(buffer, fmt)
+        club = Club(name='Chess', description='Chess club', creator=self.user)
+        club.logo.save(f'logo.{fmt.lower()}', ContentFile(buffer.getvalue()), save=False)
+        club.save()
+        make_logo_thumbnails(club)
+        return club
+
+    def open(self, field):
+        with field.open('rb') as file, Image.open(file) as image:
+            image.load()
+            return image
+
+    def test_transparent_logo_is_white_in_jpeg_and_clear_in_webp(self):
+        # A red square in the middle of a transparent canvas
+        image = Image.new('RGBA', (360, 200), (0, 0, 0, 0))
+        image.paste((255, 0, 0, 255), (130, 50, 230, 150))
+        club = self.club_with_logo(image)
+
+        jpeg = self.open(club.logo_thumbnail)
+        self.assertEqual(jpeg.mode, 'RGB')
+        self.assertGreater(min(jpeg.getpixel((5, 5))), 245)
+        red = jpeg.getpixel((180, 100))
+        self.assertGreater(red[0], 200)
+        self.assertLess(red[1], 40)
+
+        webp = self.open(club.logo_thumbnail_webp)
+        self.assertEqual(webp.mode, 'RGBA')
+        self.assertEqual(webp.getpixel((5, 5))[3], 0)
+        self.assertEqual(webp.getpixel((180, 100))[3], 255)
+
+    def test_palette_transparency_is_kept(self):
+        image = Image.new('P', (100, 100), 0)
+        image.putpalette([0, 0, 0, 0, 0, 255] + [0] * 762)
+        image.paste(1, (25, 25, 75, 75))
+        image.info['transparency'] = 0
+        club = self.club_with_logo(image)
+        self.assertGreater(min(self.open(club.logo_thumbnail).getpixel((2, 2))), 245)
+        self.assertEqual(self.open(club.logo_thumbnail_webp).getpixel((2, 2))[3], 0)
+
+    def test_replacing_the_logo_drops_the_old_thumbnails_at_once(self):
+        club = self.club_with_logo(Image.new('RGB', (800, 800), (0, 128, 0)), fmt='JPEG')
+        Member.objects.create(user=self.user, club=club, role='ADMIN')
+        old_files = [club.logo_thumbnail.name, club.logo_thumbnail_webp.name]
+        storage = club.logo_thumbnail.storage
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 800), (0, 0, 255)).save(buffer, 'PNG')
+        buffer.name = 'new.png'
+        buffer.seek(0)
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('edit_club', args=[club.id]), {'name': 'Chess', 'description': '', 'logo': buffer})
+        club.refresh_from_db()
+        self.assertFalse(club.logo_thumbnail)
+        self.assertFalse(club.logo_thumbnail_webp)
+        # Until the job runs, cards show the new original logo
+        self.assertEqual(views._club_json([club])[0]['logo'], club.logo.url)
+        self.assertTrue(all(storage.exists(name) for name in old_files))
+
+        job = Job.objects.get(name='clubs.make_logo_thumbnails')
+        self.assertEqual(job.payload, {'club_id': club.id, 'stale': old_files})
+        execute(claim(job.id))
+        club.refresh_from_db()
+        red, green, blue = self.open(club.logo_thumbnail).getpixel((5, 5))
+        self.assertGreater(blue, 200)
+        self.assertLess(green, 40)
+        self.assertFalse(any(storage.exists(name) for name in old_files))
+
+    def test_opaque_logo_stays_rgb(self):
+        club = self.club_with_logo(Image.new('RGB', (800, 800), (0, 128, 0)), fmt='JPEG')
+        self.assertEqual(self.open(club.logo_thumbnail_webp).mode, 'RGB')
+        self.assertEqual(self.open(club.logo_thumbnail).size, (720, 400))
+
+
+class ProposalVoteMethodTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='member')
+        self.club = Club.objects.create(name='Chess', description='Chess club', creator=self.user)
+        Member.objects.create(user=self.user, club=self.club)
+        self.proposal = Proposal.objects.create(club=self.club, title='New boards', description='', created_by=self.user)
+        self.client.force_login(self.user)
+
+    def test_get_never_votes(self):
+        ProposalVote.objects.create(proposal=Proposal.objects.create(
+            club=self.club, title='Chairs', description='', created_by=self.user,
+        ), user=self.user)
+        for name, proposal in [('vote_proposal', self.proposal), ('unvote_proposal', Proposal.objects.get(title='Chairs'))]:
+            url = reverse(name, args=[proposal.id])
+            with self.subTest(name=name):
+                self.assertRedirects(self.client.get(url), reverse('proposal_list', args=[self.club.id]))
+                response = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                self.assertEqual(response.status_code, 405)
+        self.assertEqual(list(ProposalVote.objects.values_list('proposal__title', flat=True)), ['Chairs'])
+
+    def test_post_votes(self):
+        response = self.client.post(reverse('vote_proposal', args=[self.proposal.id]), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'proposal': self.proposal.id, 'vote_count': 1, 'voted': True})
@@ -1,17 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the read-heavy pages are served by their async versions
+read_views = async_views if settings.CLUB_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('clubs/search/', views.club_search, name='club_search'),
+    path('clubs/search/', read_views.club_search, name='club_search'),
     path('', views.home, name='home'),
-    path('clubs/', views.club_list, name='club_list'),
+    path('clubs/', read_views.club_list, name='club_list'),
     path('clubs/<int:club_id>/', views.club_detail, name='club_detail'),
+    path('clubs/<int:club_id>/members/', views.club_members, name='club_members'),
+    path('clubs/<int:club_id>/events/', read_views.club_events, name='club_events'),
     path('clubs/create/', views.create_club, name='create_club'),
     path('clubs/<int:club_id>/edit/', views.edit_club, name='edit_club'),
+    path('clubs/<int:club_id>/delete/', views.delete_club, name='delete_club'),
     path('clubs/<int:club_id>/join/', views.join_club, name='join_club'),
     path('clubs/<int:club_id>/polls/create/', views.create_poll, name='create_poll'),
     path('polls/<int:poll_id>/vote/', views.vote_poll, name='vote_poll'),
-    path('clubs/<int:club_id>/proposals/', views.proposal_list, name='proposal_list'),
+    path('polls/<int:poll_id>/results/', read_views.poll_results, name='poll_results'),
+    path('clubs/<int:club_id>/proposals/', read_views.proposal_list, name='proposal_list'),
     path('clubs/<int:club_id>/proposals/create/', views.create_proposal, name='create_proposal'),
     path('proposals/<int:proposal_id>/vote/', views.vote_proposal, name='vote_proposal'),
     path('proposals/<int:proposal_id>/unvote/', views.unvote_proposal, name='unvote_proposal'),
@@ -20,4 +28,6 @@ urlpatterns = [
     path('clubs/<int:club_id>/manage-roles/', views.manage_roles, name='manage_roles'),
     path('clubs/<int:club_id>/update-member-role/<int:member_id>/', views.update_member_role, name='update_member_role'),
     path('clubs/<int:club_id>/remove-member/<int:member_id>/', views.remove_member, name='remove_member'),
+    path('clubs/<int:club_id>/remove-members/', views.bulk_remove_members, name='bulk_remove_members'),
+    path('clubs/<int:club_id>/export/<str:dataset>/', views.export_club_data, name='export_club_data'),
 ]
\ No newline at end of file
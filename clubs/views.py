@@ -1,119 +1,322 @@
+import base64
+import binascii
+import json
+import logging
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from .models import Club, Member, Poll, PollOption, Vote, Proposal, ProposalVote
+from .cards import home_club_cards
+from .counters import club_counts, record_vote, withdraw_votes
+from .db import retry_write
+from .deletion import mark_club_deleted
+from .jobs import enqueue
+from .live import publish_vote_deltas
+from .exports import CONTENT_TYPES, EXPORTS, export_rows
+from .instrumentation import timed
+from .polls import forget_poll_results, get_poll_results
+from .removal import remove_members
+from .membership import club_member_required, club_role, is_club_admin, is_club_member
 from django.contrib.auth.forms import UserCreationForm
 from django.shortcuts import render, redirect
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.text import Truncator
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 def home(request):
     if request.user.is_authenticated:
-        # Get clubs where the user is a member, ordered by name and creation date
-        clubs = Club.objects.filter(member__user=request.user).order_by('name', '-created_at')
+        # Cards for the clubs where the user is a member, ordered by name and
+        # creation date, served from the cache when warm
+        club_cards = home_club_cards(request.user)
     else:
-        # For non-authenticated users, show empty queryset
-        clubs = Club.objects.none()
+        # Non-authenticated users see no clubs
+        club_cards = []
     
-    return render(request, 'home.html', {'clubs': clubs})
+    return render(request, 'home.html', {'club_cards': club_cards})
+
+# Proposals shown per page on the proposal list
+PROPOSALS_PER_PAGE = 25
+
+# Members per page of the club roster
+ROSTER_PAGE_SIZE = 50
+ROSTER_MAX_PAGE_SIZE = 200
+
+# Page sizes and snippet length for the JSON search API
+SEARCH_PAGE_SIZE = 24
+SEARCH_MAX_PAGE_SIZE = 100
+SNIPPET_WORDS = 30
+
+# Top full-text hits re-ranked by fuzzy score on the club list page
+SEARCH_RERANK_LIMIT = 50
+
+def _keyset_queryset(clubs, after=None, limit=None):
+    """
+    Order a club queryset by (lowercase name, id) and apply a keyset page.
+
+    The lowercase name is SQLite's LOWER(), which only folds ASCII letters;
+    clubs.search.name_key gives the same for clubs ordered in Python.
+    """
+    clubs = clubs.annotate(name_key=Lower('name')).order_by('name_key', 'id')
+    if after is not None:
+        name_key, club_id = after
+        # The name_key__gte bound lets SQLite seek club_name_lower_idx
+        # rather than scan it from the start
+        clubs = clubs.filter(Q(name_key__gte=name_key), Q(name_key__gt=name_key) | Q(name_key=name_key, id__gt=club_id))
+    return list(clubs[:limit]) if limit is not None else clubs
+
+def _search_clubs(search_query, after=None, limit=None, rerank=0):
+    """
+    Return clubs matching search_query, best matches first.
+
+    Clubs come in keyset order so they can be paged with after/limit: by
+    (rank, id) for full-text results, each club carrying its search_rank,
+    and by (lowercase name, id) otherwise. On the first page, the top
+    rerank full-text hits are then re-ordered by fuzzy score; later pages
+    follow on from the last of them in BM25 order.
+    """
+    if not search_query:
+        return _keyset_queryset(Club.objects.all(), after, limit)
+    
+    club_ids = ranks = None
+    if not _continues_fallback(after):
+        try:
+            with timed('search'):
+                club_ids, ranks = _search_backend(search_query, after, limit)
+        except Exception:
+            logger.exception('Search failed, falling back to a substring search')
+    
+    if _use_fallback(club_ids, after):
+        return _keyset_queryset(_substring_matches(search_query), after, limit)
+    return _search_results(Club.objects.in_bulk(club_ids), club_ids, ranks, search_query, _rerank_size(after, rerank))
+
+def _continues_fallback(after):
+    """A name cursor in full-text mode comes from the substring fallback, so later pages carry on with it"""
+    return settings.CLUB_SEARCH_BACKEND == 'fts' and after is not None and not isinstance(after[0], float)
+
+def _search_backend(search_query, after, limit):
+    """
+    Return (club ids, ranks) for one page from CLUB_SEARCH_BACKEND.
+
+    ranks maps club ids to their full-text rank, and is None for the
+    in-memory index, which pages its own results.
+    """
+    if settings.CLUB_SEARCH_BACKEND == 'fts':
+        from .fts import fts_search
+
+        ranks = dict(fts_search(search_query, after=after, limit=limit))
+        return list(ranks), ranks
+    from .search import club_index
+
+    return club_index.search(search_query, after=after, limit=limit), None
+
+def _use_fallback(club_ids, after):
+    # Full-text search only matches whole words and prefixes, so fall back to
+    # a substring search when it finds nothing
+    if club_ids is None:
+        return True
+    return settings.CLUB_SEARCH_BACKEND == 'fts' and not club_ids and after is None
+
+def _substring_matches(search_query):
+    return Club.objects.filter(
+        Q(name__icontains=search_query) |
+        Q(description__icontains=search_query)
+    )
+
+def _rerank_size(after, rerank):
+    # Only the first page is re-ranked, so later pages can keep to BM25 order
+    return rerank if after is None else 0
+
+def _search_results(clubs_by_id, club_ids, ranks, search_query, rerank=0):
+    """
+    The clubs of club_ids in that order, each with its sort key.
+
+    The first rerank full-text hits are re-ordered by fuzzy score.
+    """
+    clubs = [clubs_by_id[club_id] for club_id in club_ids if club_id in clubs_by_id]
+    _add_sort_keys(clubs, ranks)
+    if ranks is not None and rerank:
+        from .fts import rerank as fuzzy_rerank
+
+        clubs[:rerank] = fuzzy_rerank(search_query, clubs[:rerank])
+    return clubs
+
+def _add_sort_keys(clubs, ranks):
+    """Give clubs from a search the key they were ordered by, for the next page's cursor"""
+    from .search import name_key
+
+    for club in clubs:
+        if ranks is not None:
+            club.search_rank = ranks[club.id]
+        else:
+            club.name_key = name_key(club.name)
+
+def _search_sort_key(club):
+    rank = getattr(club, 'search_rank', None)
+    return (rank, club.id) if rank is not None else (club.name_key, club.id)
+
+def _search_cursor(clubs):
+    """
+    The cursor for the page after clubs, a page from _search_clubs.
+
+    A re-ranked first page is out of keyset order, so the cursor comes from
+    its highest key rather than its last club.
+    """
+    return _encode_cursor(list(max(_search_sort_key(club) for club in clubs)))
+
+def _encode_cursor(key):
+    payload = json.dumps(key).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+def _decode_cursor(cursor, types):
+    """Turn a cursor from a previous page back into a sort key of the given types"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError('Invalid cursor.')
+    if (
+        not isinstance(key, list)
+        or len(key) != len(types)
+        or not all(isinstance(value, kind) and not isinstance(value, bool) for value, kind in zip(key, types))
+    ):
+        raise ValueError('Invalid cursor.')
+    return tuple(key)
+
+def _decode_search_cursor(cursor):
+    """Search cursors hold (rank, id) after full-text results and (lowercase name, id) otherwise"""
+    try:
+        return _decode_cursor(cursor, (float, int))
+    except ValueError:
+        return _decode_cursor(cursor, (str, int))
+
+def _club_json(clubs, snippet=False):
+    club_data = []
+    for club in clubs:
+        data = {
+            'id': club.id,
+            'name': club.name,
+            # Cards only need the thumbnail; fall back to the original logo
+            # for clubs whose thumbnails have not been generated yet
+            'logo': club.logo_thumbnail.url if club.logo_thumbnail else (club.logo.url if club.logo else None),
+            'logo_webp': club.logo_thumbnail_webp.url if club.logo_thumbnail_webp else None,
+            'created_at': club.created_at.isoformat()
+        }
+        if snippet:
+            data['snippet'] = Truncator(club.description or '').words(SNIPPET_WORDS)
+        else:
+            data['description'] = club.description
+        club_data.append(data)
+    return club_data
+
+def _club_search_response(request, search_query):
+    """
+    Return one page of search results as JSON.
+
+    Accepts limit (capped at SEARCH_MAX_PAGE_SIZE), cursor (the next token
+    of a previous page) and snippet, which sends descriptions truncated to
+    SNIPPET_WORDS words instead of in full.
+    """
+    try:
+        limit = int(request.GET.get('limit', SEARCH_PAGE_SIZE))
+        after = _decode_search_cursor(request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit or cursor.'}, status=400)
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    snippet = request.GET.get('snippet', '').lower() in ('1', 'true', 'yes')
+    
+    # Fetch one extra club to find out whether there is a next page
+    clubs = _search_clubs(search_query, after=after, limit=limit + 1, rerank=limit)
+    next_cursor = _search_cursor(clubs[:limit]) if len(clubs) > limit else None
+    return JsonResponse({'clubs': _club_json(clubs[:limit], snippet), 'next': next_cursor})
 
 def club_list(request):
     search_query = request.GET.get('q', '').strip()
-    clubs = Club.objects.all()
-    
-    if search_query:
-        try:
-            # Import required libraries
-            from fuzzywuzzy import process, fuzz
-            from django.db.models import Q
-            
-            # Get all clubs for fuzzy matching
-            all_clubs = list(clubs)
-            matched_clubs = set()  # Using set to avoid duplicates
-            
-            # Fuzzy match on club names with token sort ratio for better partial matches
-            club_names = [(club.id, club.name) for club in all_clubs]
-            name_matches = process.extract(
-                search_query,
-                [name for _, name in club_names],
-                scorer=fuzz.token_sort_ratio,
-                limit=15
-            )
-            
-            # Add clubs with name matches that score above 55
-            for name, score in name_matches:
-                if score >= 55:
-                    for club_id, club_name in club_names:
-                        if club_name == name:
-                            matched_clubs.add(next(club for club in all_clubs if club.id == club_id))
-            
-            # Fuzzy match on descriptions with token set ratio for better content matching
-            club_descriptions = [(club.id, club.description or '') for club in all_clubs]
-            desc_matches = process.extract(
-                search_query,
-                [desc for _, desc in club_descriptions],
-                scorer=fuzz.token_set_ratio,
-                limit=15
-            )
-            
-            # Add clubs with description matches that score above 45
-            for desc, score in desc_matches:
-                if score >= 45:
-                    for club_id, club_desc in club_descriptions:
-                        if club_desc == desc:
-                            matched_clubs.add(next(club for club in all_clubs if club.id == club_id))
-            
-            # If no fuzzy matches or search query is very short, fall back to contains search
-            if not matched_clubs or len(search_query) <= 2:
-                clubs = clubs.filter(
-                    Q(name__icontains=search_query) |
-                    Q(description__icontains=search_query)
-                ).distinct()
-            else:
-                clubs = sorted(list(matched_clubs), key=lambda x: x.name.lower())
-        except Exception as e:
-            # Log the error and fallback to basic search
-            print(f'Search error: {str(e)}')
-            clubs = clubs.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-    
-    # Sort results
-    clubs = sorted(clubs, key=lambda x: x.name.lower()) if isinstance(clubs, list) else clubs.order_by('name')
     
     # Return JSON response for AJAX requests
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        from django.http import JsonResponse
-        club_data = [{
-            'id': club.id,
-            'name': club.name,
-            'description': club.description,
-            'logo': club.logo.url if club.logo else None,
-            'created_at': club.created_at.isoformat()
-        } for club in clubs]
-        return JsonResponse({'clubs': club_data})
+        return _club_search_response(request, search_query)
     
+    clubs = _search_clubs(search_query, rerank=SEARCH_RERANK_LIMIT)
     return render(request, 'clubs/club_list.html', {'clubs': clubs, 'search_query': search_query})
 
 @login_required
 def club_detail(request, club_id):
-    club = get_object_or_404(Club, id=club_id)
-    is_member = Member.objects.filter(club=club, user=request.user).exists()
-    user_is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
+    club = get_object_or_404(Club.objects.select_related('creator'), id=club_id)
+    role = club_role(request, club.id)
+    is_member = role is not None
+    user_is_admin = role == 'ADMIN'
     active_polls = Poll.objects.filter(club=club, end_date__gt=timezone.now())
+    # Only the first page of the roster is rendered; the rest is loaded
+    # from club_members as the list is scrolled
+    members = _roster_page(club, None, ROSTER_PAGE_SIZE + 1)
     return render(request, 'clubs/club_detail.html', {
         'club': club,
         'is_member': is_member,
         'user_is_admin': user_is_admin,
-        'active_polls': active_polls
+        'active_polls': active_polls,
+        'counts': club_counts(club.id),
+        'members': members[:ROSTER_PAGE_SIZE],
+        'members_next': _roster_cursor(members, ROSTER_PAGE_SIZE)
+    })
+
+def _roster_page(club, after, limit):
+    """
+    Return up to limit members of the club ordered by role and then join order.
+
+    after is the (role rank, id) key of the last member of the previous page.
+    The rest of that role and the roles after it are read separately, so
+    both queries are range scans of member_club_role_rank_idx.
+    """
+    members = Member.objects.filter(club=club).select_related('user').order_by('role_rank', 'id')
+    if after is None:
+        return list(members[:limit])
+    role_rank, member_id = after
+    page = list(members.filter(role_rank=role_rank, id__gt=member_id)[:limit])
+    if len(page) < limit:
+        page += members.filter(role_rank__gt=role_rank)[:limit - len(page)]
+    return page
+
+def _roster_cursor(members, limit):
+    if len(members) <= limit:
+        return None
+    last = members[limit - 1]
+    return _encode_cursor([last.role_rank, last.id])
+
+@login_required
+def club_members(request, club_id):
+    """One keyset page of the club roster as JSON, for infinite scrolling on club_detail"""
+    club = get_object_or_404(Club, id=club_id)
+    try:
+        limit = int(request.GET.get('limit', ROSTER_PAGE_SIZE))
+        after = _decode_cursor(request.GET.get('cursor'), (int, int))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit or cursor.'}, status=400)
+    limit = max(1, min(limit, ROSTER_MAX_PAGE_SIZE))
+    
+    members = _roster_page(club, after, limit + 1)
+    return JsonResponse({
+        'members': [{
+            'id': member.id,
+            'username': member.user.username,
+            'role': member.role,
+            'role_display': member.get_role_display(),
+        } for member in members[:limit]],
+        'next': _roster_cursor(members, limit),
     })
 
 @login_required
 def edit_club(request, club_id):
     club = get_object_or_404(Club, id=club_id)
     # Check if user is an admin of the club
-    if not Member.objects.filter(club=club, user=request.user, role='ADMIN').exists():
+    if not is_club_admin(request, club.id):
         return HttpResponseForbidden("You don't have permission to edit this club.")
     
     if request.method == 'POST':
@@ -123,15 +326,36 @@ def edit_club(request, club_id):
         
         club.name = name
         club.description = description
+        stale_thumbnails = []
         if logo:
             club.logo = logo
+            # The old thumbnails show the old logo; cards show the new
+            # original until the job makes new ones and deletes these files
+            stale_thumbnails = [field.name for field in (club.logo_thumbnail, club.logo_thumbnail_webp) if field]
+            club.logo_thumbnail = None
+            club.logo_thumbnail_webp = None
         club.save()
+        if logo:
+            enqueue('clubs.make_logo_thumbnails', club_id=club.id, stale=stale_thumbnails)
         
         messages.success(request, 'Club updated successfully!')
         return redirect('club_detail', club_id=club.id)
     
     return render(request, 'clubs/edit_club.html', {'club': club})
 
+@login_required
+@club_member_required(admin=True, message='Only club admins can delete the club.')
+def delete_club(request, club_id):
+    club = get_object_or_404(Club, id=club_id)
+    if request.method != 'POST':
+        return redirect('edit_club', club_id=club.id)
+    
+    # The club disappears now; its polls, proposals and members are purged
+    # by a background job
+    mark_club_deleted(club)
+    messages.success(request, f'{club.name} has been deleted.')
+    return redirect('club_list')
+
 @login_required
 def create_club(request):
     if request.method == 'POST':
@@ -145,6 +369,8 @@ def create_club(request):
             logo=logo,
             creator=request.user
         )
+        if logo:
+            enqueue('clubs.make_logo_thumbnails', club_id=club.id)
         
         # Make the creator an admin member
         Member.objects.create(user=request.user, club=club, role='ADMIN')
@@ -157,19 +383,16 @@ def create_club(request):
 @login_required
 def join_club(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    if not Member.objects.filter(club=club, user=request.user).exists():
-        Member.objects.create(user=request.user, club=club)
+    if not is_club_member(request, club.id):
+        # get_or_create copes with a second click that joined in the meantime
+        retry_write(Member.objects.get_or_create, user=request.user, club=club)
         messages.success(request, f'You have joined {club.name}!')
     return redirect('club_detail', club_id=club.id)
 
 @login_required
+@club_member_required(admin=True, message='Only club admins can create polls.')
 def create_poll(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    member = get_object_or_404(Member, club=club, user=request.user)
-    
-    if member.role != 'ADMIN':
-        messages.error(request, 'Only club admins can create polls.')
-        return redirect('club_detail', club_id=club.id)
     
     if request.method == 'POST':
         title = request.POST.get('title')
@@ -195,35 +418,82 @@ def create_poll(request, club_id):
 
 @login_required
 def vote_poll(request, poll_id):
-    poll = get_object_or_404(Poll, id=poll_id)
+    poll = get_object_or_404(Poll, id=poll_id, club__deleted_at__isnull=True)
+    wants_json = _wants_json(request)
     
     if not poll.is_active():
+        if wants_json:
+            return JsonResponse({'error': 'This poll has ended.'}, status=400)
         messages.error(request, 'This poll has ended.')
-        return redirect('club_detail', club_id=poll.club.id)
+        return redirect('club_detail', club_id=poll.club_id)
     
     if request.method == 'POST':
         option_id = request.POST.get('option')
         option = get_object_or_404(PollOption, id=option_id, poll=poll)
         
-        # Check if user has already voted
-        if not Vote.objects.filter(poll=poll, user=request.user).exists():
-            Vote.objects.create(poll=poll, option=option, user=request.user)
+        # One INSERT; the (poll, user) constraint turns away a second vote,
+        # even from a request racing this one
+        if retry_write(record_vote, Vote(poll=poll, option=option, user=request.user), option):
+            publish_vote_deltas(poll.club_id, options={option.id: 1})
+            forget_poll_results(poll.id)
+            if wants_json:
+                return JsonResponse(_poll_vote_state(poll, option.id))
             messages.success(request, 'Your vote has been recorded!')
         else:
+            if wants_json:
+                voted_option_id = Vote.objects.filter(poll=poll, user=request.user).values_list('option_id', flat=True).first()
+                return JsonResponse({'error': 'You have already voted in this poll.', **_poll_vote_state(poll, voted_option_id)}, status=409)
             messages.error(request, 'You have already voted in this poll.')
+    elif wants_json:
+        return JsonResponse({'error': 'Votes must be POSTed.'}, status=405)
     
-    return redirect('club_detail', club_id=poll.club.id)
+    return redirect('club_detail', club_id=poll.club_id)
+
+def _poll_vote_state(poll, option_id):
+    """The poll's option counts and the option the user voted for, for JSON vote responses"""
+    options = PollOption.objects.filter(poll=poll).order_by('id').values_list('id', 'vote_count')
+    return {
+        'poll': poll.id,
+        'voted': True,
+        'option': option_id,
+        'options': {str(pk): count for pk, count in options},
+    }
+
+@login_required
+def club_events(request, club_id):
+    """
+    Club event streams are served by clubs.async_views under ASGI only; a
+    stream here would hold a WSGI worker for minutes. 204 tells EventSource
+    not to reconnect.
+    """
+    return HttpResponse(status=204)
 
+def _wants_json(request):
+    return (
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('Accept', '')
+    )
 
 @login_required
+def poll_results(request, poll_id):
+    poll = get_object_or_404(Poll.objects.select_related('club'), id=poll_id, club__deleted_at__isnull=True)
+    results = get_poll_results(poll)
+    
+    if _wants_json(request) or request.GET.get('format') == 'json':
+        return JsonResponse(results)
+    
+    return render(request, 'clubs/poll_results.html', {
+        'club': poll.club,
+        'poll': poll,
+        'results': results,
+        'live_updates': settings.CLUB_ASYNC_VIEWS
+    })
+
+
+@login_required
+@club_member_required(admin=True, message='Only club admins can manage roles.')
 def manage_roles(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    user_is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
-    
-    if not user_is_admin:
-        messages.error(request, 'Only club admins can manage roles.')
-        return redirect('club_detail', club_id=club.id)
-    
     members = Member.objects.filter(club=club).select_related('user')
     role_choices = Member.ROLE_CHOICES
     
@@ -234,50 +504,67 @@ def manage_roles(request, club_id):
     })
 
 @login_required
+@club_member_required(admin=True, message='Only club admins can export club data.')
+def export_club_data(request, club_id, dataset):
+    club = get_object_or_404(Club, id=club_id)
+    fmt = request.GET.get('format', 'csv')
+    if dataset not in EXPORTS or fmt not in CONTENT_TYPES:
+        raise Http404('Unknown export.')
+    
+    response = StreamingHttpResponse(export_rows(club, dataset, fmt), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="club-{club.id}-{dataset}.{fmt}"'
+    return response
+
+@login_required
+@club_member_required(admin=True, message='Only club admins can remove members.')
 def remove_member(request, club_id, member_id):
     club = get_object_or_404(Club, id=club_id)
     member = get_object_or_404(Member, id=member_id, club=club)
-    user_is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
-    
-    if not user_is_admin:
-        messages.error(request, 'Only club admins can remove members.')
-        return redirect('club_detail', club_id=club.id)
     
     if member.role == 'ADMIN' and member.user != request.user:
         messages.error(request, 'You cannot remove other admins from the club.')
         return redirect('manage_roles', club_id=club.id)
     
     if request.method == 'POST':
-        # Delete all votes by this member in this club's polls
-        Vote.objects.filter(poll__club=club, user=member.user).delete()
-        
-        # Delete all proposal votes by this member in this club
-        ProposalVote.objects.filter(proposal__club=club, user=member.user).delete()
-        
-        # Delete the member's proposals in this club
-        Proposal.objects.filter(club=club, created_by=member.user).delete()
-        
-        # Finally remove the member
-        member.delete()
+        # Remove the member now; their votes and proposals in this club
+        # are deleted by a background job
+        retry_write(remove_members, club, [member])
         messages.success(request, f'{member.user.username} has been removed from the club.')
     
     return redirect('manage_roles', club_id=club.id)
 
 @login_required
+@club_member_required(admin=True, message='Only club admins can remove members.')
+def bulk_remove_members(request, club_id):
+    club = get_object_or_404(Club, id=club_id)
+    if request.method != 'POST':
+        return redirect('manage_roles', club_id=club.id)
+    
+    member_ids = [value for value in request.POST.getlist('member_ids') if value.isdigit()]
+    members = Member.objects.filter(club=club, id__in=member_ids).select_related('user')
+    removable = [member for member in members if member.role != 'ADMIN' or member.user_id == request.user.id]
+    if len(removable) < len(members):
+        messages.error(request, 'You cannot remove other admins from the club.')
+    
+    removed = retry_write(remove_members, club, removable)
+    if removed:
+        messages.success(request, f'Removed {len(removed)} member(s): {", ".join(removed)}.')
+    elif not members:
+        messages.error(request, 'Select the members to remove.')
+    
+    return redirect('manage_roles', club_id=club.id)
+
+@login_required
+@club_member_required(admin=True, message='Only club admins can update roles.')
 def update_member_role(request, club_id, member_id):
     club = get_object_or_404(Club, id=club_id)
     member = get_object_or_404(Member, id=member_id, club=club)
-    user_is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
-    
-    if not user_is_admin:
-        messages.error(request, 'Only club admins can update roles.')
-        return redirect('club_detail', club_id=club.id)
     
     if request.method == 'POST':
         new_role = request.POST.get('role')
         if new_role in dict(Member.ROLE_CHOICES):
             member.role = new_role
-            member.save()
+            retry_write(member.save, update_fields=['role'])
             messages.success(request, f'Role updated successfully for {member.user.username}.')
         else:
             messages.error(request, 'Invalid role selected.')
@@ -296,32 +583,49 @@ def register(request):
 @login_required
 def proposal_list(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    is_member = Member.objects.filter(club=club, user=request.user).exists()
-    is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
-    proposals = Proposal.objects.filter(club=club).order_by('-created_at')
+    role = club_role(request, club.id)
+    is_member = role is not None
+    is_admin = role == 'ADMIN'
     
-    # Check if the user has voted on each proposal
-    user_voted = {}
+    sort = _proposal_sort(request)
+    page = Paginator(_club_proposals(club, sort), PROPOSALS_PER_PAGE).get_page(request.GET.get('page'))
+    
+    # Ids of the proposals on this page the user has voted on, in one query
+    user_voted = set()
     if is_member:
-        for proposal in proposals:
-            user_voted[proposal.id] = ProposalVote.objects.filter(proposal=proposal, user=request.user).exists()
+        user_voted = set(_voted_proposal_ids(request.user, page))
     
     return render(request, 'clubs/proposal_list.html', {
         'club': club,
-        'proposals': proposals,
+        'proposals': page,
         'is_member': is_member,
         'is_admin': is_admin,
-        'user_voted': user_voted
+        'user_voted': user_voted,
+        'sort': sort,
+        'live_updates': settings.CLUB_ASYNC_VIEWS
     })
 
+def _proposal_sort(request):
+    return 'votes' if request.GET.get('sort') == 'votes' else None
+
+def _club_proposals(club, sort):
+    """The club's proposals in the proposal list's order for sort"""
+    proposals = Proposal.objects.filter(club=club).select_related('created_by')
+    if sort == 'votes':
+        # Served from the (club, -vote_count, -created_at) index
+        return proposals.order_by('-vote_count', '-created_at', '-id')
+    return proposals.order_by('-created_at', '-id')
+
+def _voted_proposal_ids(user, proposals):
+    return ProposalVote.objects.filter(
+        user=user,
+        proposal__in=[proposal.id for proposal in proposals],
+    ).values_list('proposal_id', flat=True)
+
 @login_required
+@club_member_required(message='You must be a member to create proposals.')
 def create_proposal(request, club_id):
     club = get_object_or_404(Club, id=club_id)
-    is_member = Member.objects.filter(club=club, user=request.user).exists()
-    
-    if not is_member:
-        messages.error(request, 'You must be a member to create proposals.')
-        return redirect('club_detail', club_id=club.id)
     
     if request.method == 'POST':
         title = request.POST.get('title')
@@ -344,12 +648,12 @@ def create_proposal(request, club_id):
 
 @login_required
 def delete_proposal(request, proposal_id):
-    proposal = get_object_or_404(Proposal, id=proposal_id)
+    proposal = get_object_or_404(Proposal, id=proposal_id, club__deleted_at__isnull=True)
     club = proposal.club
     
     # Check if user is the creator of the proposal or an admin of the club
     is_creator = proposal.created_by == request.user
-    is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
+    is_admin = is_club_admin(request, club.id)
     
     if not (is_creator or is_admin):
         messages.error(request, 'You do not have permission to delete this proposal.')
@@ -366,31 +670,47 @@ def delete_proposal(request, proposal_id):
 
 @login_required
 def vote_proposal(request, proposal_id):
-    proposal = get_object_or_404(Proposal, id=proposal_id)
-    club = proposal.club
-    is_member = Member.objects.filter(club=club, user=request.user).exists()
-    
-    if not is_member:
+    proposal = get_object_or_404(Proposal, id=proposal_id, club__deleted_at__isnull=True)
+    club_id = proposal.club_id
+    wants_json = _wants_json(request)
+    
+    # Voting changes data, so a plain link or prefetch must not do it
+    if request.method != 'POST':
+        if wants_json:
+            return JsonResponse({'error': 'Votes must be POSTed.'}, status=405)
+        return redirect('proposal_list', club_id=club_id)
+    
+    if not is_club_member(request, club_id):
+        if wants_json:
+            return JsonResponse({'error': 'You must be a member to vote on proposals.'}, status=403)
         messages.error(request, 'You must be a member to vote on proposals.')
-        return redirect('club_detail', club_id=club.id)
+        return redirect('club_detail', club_id=club_id)
     
-    # Check if user has already voted
-    if not ProposalVote.objects.filter(proposal=proposal, user=request.user).exists():
-        ProposalVote.objects.create(proposal=proposal, user=request.user)
-        messages.success(request, 'Your vote has been recorded!')
-    else:
+    # One INSERT; the (proposal, user) constraint turns away a second vote
+    if retry_write(record_vote, ProposalVote(proposal=proposal, user=request.user), proposal):
+        publish_vote_deltas(club_id, proposals={proposal.id: 1})
+        if not wants_json:
+            messages.success(request, 'Your vote has been recorded!')
+    elif not wants_json:
         messages.info(request, 'You have already voted on this proposal.')
     
-    return redirect('proposal_list', club_id=club.id)
+    if wants_json:
+        return JsonResponse(_proposal_vote_state(proposal, voted=True))
+    return redirect('proposal_list', club_id=club_id)
+
+def _proposal_vote_state(proposal, voted):
+    """The proposal's current vote count and whether the user has voted, for JSON vote responses"""
+    vote_count = Proposal.objects.values_list('vote_count', flat=True).get(id=proposal.id)
+    return {'proposal': proposal.id, 'vote_count': vote_count, 'voted': voted}
 
 @login_required
 def delete_proposal(request, proposal_id):
-    proposal = get_object_or_404(Proposal, id=proposal_id)
+    proposal = get_object_or_404(Proposal, id=proposal_id, club__deleted_at__isnull=True)
     club = proposal.club
     
     # Check if user is the creator of the proposal or an admin of the club
     is_creator = proposal.created_by == request.user
-    is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
+    is_admin = is_club_admin(request, club.id)
     
     if not (is_creator or is_admin):
         messages.error(request, 'You do not have permission to delete this proposal.')
@@ -407,32 +727,43 @@ def delete_proposal(request, proposal_id):
 
 @login_required
 def unvote_proposal(request, proposal_id):
-    proposal = get_object_or_404(Proposal, id=proposal_id)
-    club = proposal.club
-    is_member = Member.objects.filter(club=club, user=request.user).exists()
-    
-    if not is_member:
+    proposal = get_object_or_404(Proposal, id=proposal_id, club__deleted_at__isnull=True)
+    club_id = proposal.club_id
+    wants_json = _wants_json(request)
+    
+    # Voting changes data, so a plain link or prefetch must not do it
+    if request.method != 'POST':
+        if wants_json:
+            return JsonResponse({'error': 'Votes must be POSTed.'}, status=405)
+        return redirect('proposal_list', club_id=club_id)
+    
+    if not is_club_member(request, club_id):
+        if wants_json:
+            return JsonResponse({'error': 'You must be a member to unvote on proposals.'}, status=403)
         messages.error(request, 'You must be a member to unvote on proposals.')
-        return redirect('club_detail', club_id=club.id)
+        return redirect('club_detail', club_id=club_id)
     
     # Check if user has already voted and remove the vote
-    vote = ProposalVote.objects.filter(proposal=proposal, user=request.user).first()
-    if vote:
-        vote.delete()
+    deleted = retry_write(withdraw_votes, ProposalVote.objects.filter(proposal=proposal, user=request.user), proposal)
+    if deleted:
+        publish_vote_deltas(club_id, proposals={proposal.id: -deleted})
+    if wants_json:
+        return JsonResponse(_proposal_vote_state(proposal, voted=False))
+    if deleted:
         messages.success(request, 'Your vote has been removed!')
     else:
         messages.info(request, 'You have not voted on this proposal.')
     
-    return redirect('proposal_list', club_id=club.id)
+    return redirect('proposal_list', club_id=club_id)
 
 @login_required
 def delete_proposal(request, proposal_id):
-    proposal = get_object_or_404(Proposal, id=proposal_id)
+    proposal = get_object_or_404(Proposal, id=proposal_id, club__deleted_at__isnull=True)
     club = proposal.club
     
     # Check if user is the creator of the proposal or an admin of the club
     is_creator = proposal.created_by == request.user
-    is_admin = Member.objects.filter(club=club, user=request.user, role='ADMIN').exists()
+    is_admin = is_club_admin(request, club.id)
     
     if not (is_creator or is_admin):
         messages.error(request, 'You do not have permission to delete this proposal.')
@@ -449,76 +780,4 @@ def delete_proposal(request, proposal_id):
 
 def club_search(request):
     search_query = request.GET.get('q', '').strip()
-    clubs = Club.objects.all()
-    
-    if search_query:
-        try:
-            # Import required libraries
-            from fuzzywuzzy import process, fuzz
-            from django.db.models import Q
-            
-            # Get all clubs for fuzzy matching
-            all_clubs = list(clubs)
-            matched_clubs = set()  # Using set to avoid duplicates
-            
-            # Fuzzy match on club names with token sort ratio for better partial matches
-            club_names = [(club.id, club.name) for club in all_clubs]
-            name_matches = process.extract(
-                search_query,
-                [name for _, name in club_names],
-                scorer=fuzz.token_sort_ratio,
-                limit=15
-            )
-            
-            # Add clubs with name matches that score above 55
-            for name, score in name_matches:
-                if score >= 55:
-                    for club_id, club_name in club_names:
-                        if club_name == name:
-                            matched_clubs.add(next(club for club in all_clubs if club.id == club_id))
-            
-            # Fuzzy match on descriptions with token set ratio for better content matching
-            club_descriptions = [(club.id, club.description or '') for club in all_clubs]
-            desc_matches = process.extract(
-                search_query,
-                [desc for _, desc in club_descriptions],
-                scorer=fuzz.token_set_ratio,
-                limit=15
-            )
-            
-            # Add clubs with description matches that score above 45
-            for desc, score in desc_matches:
-                if score >= 45:
-                    for club_id, club_desc in club_descriptions:
-                        if club_desc == desc:
-                            matched_clubs.add(next(club for club in all_clubs if club.id == club_id))
-            
-            # If no fuzzy matches or search query is very short, fall back to contains search
-            if not matched_clubs or len(search_query) <= 2:
-                clubs = clubs.filter(
-                    Q(name__icontains=search_query) |
-                    Q(description__icontains=search_query)
-                ).distinct()
-            else:
-                clubs = sorted(list(matched_clubs), key=lambda x: x.name.lower())
-        except Exception as e:
-            # Log the error and fallback to basic search
-            print(f'Search error: {str(e)}')
-            clubs = clubs.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
-    
-    # Sort results
-    clubs = sorted(clubs, key=lambda x: x.name.lower()) if isinstance(clubs, list) else clubs.order_by('name')
-    
-    # Return JSON response
-    from django.http import JsonResponse
-    club_data = [{
-        'id': club.id,
-        'name': club.name,
-        'description': club.description,
-        'logo': club.logo.url if club.logo else None,
-        'created_at': club.created_at.isoformat()
-    } for club in clubs]
-    return JsonResponse({'clubs': club_data})
+    return _club_search_response(request, search_query)
@@ -3,7 +3,16 @@ document.addEventListener('DOMContentLoaded', function() {
     const searchButton = document.getElementById('search-button');
     const searchFeedback = document.getElementById('search-feedback');
     const clubsContainer = document.getElementById('clubs-container');
+    const pageSize = 24;
     let debounceTimer;
+    let nextCursor = null;
+
+    const loadMoreButton = document.createElement('button');
+    loadMoreButton.type = 'button';
+    loadMoreButton.className = 'btn btn-outline-primary d-block mx-auto mb-4';
+    loadMoreButton.textContent = 'Load more';
+    loadMoreButton.style.display = 'none';
+    clubsContainer.after(loadMoreButton);
 
     function debounce(func, delay) {
         return function() {
@@ -14,8 +23,8 @@ document.addEventListener('DOMContentLoaded', function() {
         };
     }
 
-    function renderClubs(clubs) {
-        if (clubs.length === 0) {
+    function renderClubs(clubs, append) {
+        if (clubs.length === 0 && !append) {
             clubsContainer.innerHTML = `
                 <div class="col-12">
                     <p class="text-center">No clubs found matching your search.</p>
@@ -27,10 +36,14 @@ document.addEventListener('DOMContentLoaded', function() {
         const clubsHtml = clubs.map(club => `
             <div class="col-md-4 mb-4">
                 <div class="card h-100">
-                    ${club.logo ? `<img src="${club.logo}" class="card-img-top" alt="${club.name}">` : ''}
+                    ${club.logo ? `
+                        <picture>
+                            ${club.logo_webp ? `<source srcset="${club.logo_webp}" type="image/webp">` : ''}
+                            <img src="${club.logo}" class="card-img-top" alt="${club.name}" loading="lazy" decoding="async">
+                        </picture>` : ''}
                     <div class="card-body">
                         <h5 class="card-title">${club.name}</h5>
-                        <p class="card-text">${club.description ? club.description.split(' ').slice(0, 30).join(' ') + '...' : ''}</p>
+                        <p class="card-text">${club.snippet || ''}</p>
                         <div class="d-flex justify-content-between align-items-center">
                             <a href="/clubs/${club.id}/" class="btn btn-primary">View Details</a>
                             <small class="text-muted">Created ${new Date(club.created_at).toLocaleDateString()}</small>
@@ -40,11 +53,21 @@ document.addEventListener('DOMContentLoaded', function() {
             </div>
         `).join('');
 
-        clubsContainer.innerHTML = clubsHtml;
+        if (append) {
+            clubsContainer.insertAdjacentHTML('beforeend', clubsHtml);
+        } else {
+            clubsContainer.innerHTML = clubsHtml;
+        }
     }
 
-    async function performSearch() {
+    async function performSearch(append) {
         const query = searchInput.value.trim();
+        const params = new URLSearchParams({q: query, limit: pageSize, snippet: 1});
+        if (append === true && nextCursor) {
+            params.set('cursor', nextCursor);
+        } else {
+            append = false;
+        }
 
         // Show loading state
         searchButton.disabled = true;
@@ -52,11 +75,13 @@ document.addEventListener('DOMContentLoaded', function() {
         searchFeedback.style.display = 'block';
 
         try {
-            const response = await fetch(`/clubs/search/?q=${encodeURIComponent(query)}`);
+            const response = await fetch(`/clubs/search/?${params}`);
             if (!response.ok) throw new Error('Search failed');
             
             const data = await response.json();
-            renderClubs(data.clubs);
+            renderClubs(data.clubs, append);
+            nextCursor = data.next;
+            loadMoreButton.style.display = nextCursor ? 'block' : 'none';
             
             // Update feedback only for errors
             searchFeedback.style.display = 'none';
@@ -70,7 +95,10 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Handle search button click
-    searchButton.addEventListener('click', performSearch);
+    searchButton.addEventListener('click', () => performSearch());
+
+    // Fetch the next page of results
+    loadMoreButton.addEventListener('click', () => performSearch(true));
 
     // Handle enter key press
     searchInput.addEventListener('keypress', function(e) {
@@ -81,5 +109,5 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Handle input changes with debouncing
-    searchInput.addEventListener('input', debounce(performSearch, 300));
+    searchInput.addEventListener('input', debounce(() => performSearch(), 300));
 });
\ No newline at end of file
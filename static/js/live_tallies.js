@@ -0,0 +1,57 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.querySelector('[data-live-url]');
+    if (!container || !window.EventSource) return;
+
+    function plural(count, word) {
+        return `${count} ${word}${count === 1 ? '' : 's'}`;
+    }
+
+    function updateProposals(counts) {
+        for (const [id, count] of Object.entries(counts)) {
+            const badge = container.querySelector(`[data-proposal-votes="${id}"]`);
+            if (!badge) continue;
+            badge.dataset.count = count;
+            badge.textContent = `${count} votes`;
+        }
+    }
+
+    function updatePollOptions(counts) {
+        const options = container.querySelectorAll('[data-option-votes]');
+        let changed = false;
+        options.forEach(option => {
+            const count = counts[option.dataset.optionVotes];
+            if (count !== undefined && count !== Number(option.dataset.count)) {
+                option.dataset.count = count;
+                changed = true;
+            }
+        });
+        if (!changed) return;
+
+        // Percentages and turnout depend on the total, so redraw every option
+        const total = Array.from(options).reduce((sum, option) => sum + Number(option.dataset.count), 0);
+        options.forEach(option => {
+            const count = Number(option.dataset.count);
+            const percentage = total ? Math.round(count * 1000 / total) / 10 : 0;
+            option.querySelector('.option-tally').textContent = `${plural(count, 'vote')} (${percentage}%)`;
+            const bar = option.querySelector('.progress-bar');
+            bar.style.width = `${percentage}%`;
+            bar.setAttribute('aria-valuenow', percentage);
+        });
+
+        const turnout = document.getElementById('poll-turnout');
+        const members = Number(container.dataset.memberCount);
+        if (turnout) {
+            const rate = members ? Math.round(total * 1000 / members) / 10 : 0;
+            turnout.textContent = `${total} of ${plural(members, 'member')} voted (${rate}% turnout)`;
+        }
+    }
+
+    // Events carry counts, not changes: the first one has every count as of
+    // the (re)connect, later ones the counts changed in the last tick
+    const source = new EventSource(container.dataset.liveUrl);
+    source.addEventListener('votes', event => {
+        const data = JSON.parse(event.data);
+        updateProposals(data.proposals);
+        updatePollOptions(data.options);
+    });
+});
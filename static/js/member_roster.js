@@ -0,0 +1,65 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const roster = document.getElementById('member-roster');
+    const sentinel = document.getElementById('member-roster-more');
+    if (!roster || !sentinel) return;
+
+    const badgeClasses = {
+        ADMIN: 'bg-danger',
+        PRESIDENT: 'bg-primary',
+        VICE_PRESIDENT: 'bg-success',
+        SECRETARY: 'bg-info'
+    };
+    let nextCursor = roster.dataset.next;
+    let loading = false;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    function renderMembers(members) {
+        const html = members.map(member => `
+            <li class="mb-2">
+                ${escapeHtml(member.username)}
+                <span class="badge ${badgeClasses[member.role] || 'bg-secondary'}">${escapeHtml(member.role_display)}</span>
+            </li>
+        `).join('');
+        roster.insertAdjacentHTML('beforeend', html);
+    }
+
+    async function loadMore() {
+        if (loading || !nextCursor) return;
+        loading = true;
+        try {
+            const params = new URLSearchParams({cursor: nextCursor});
+            const response = await fetch(`${roster.dataset.url}?${params}`);
+            if (!response.ok) throw new Error('Could not load members');
+
+            const data = await response.json();
+            renderMembers(data.members);
+            nextCursor = data.next;
+        } catch (error) {
+            console.error('Roster error:', error);
+            nextCursor = null;
+        } finally {
+            loading = false;
+            if (!nextCursor) {
+                sentinel.hidden = true;
+                observer.disconnect();
+            } else {
+                // The observer only fires on changes, so if the new page did
+                // not push the sentinel out of view, observe it afresh to get
+                // an initial entry and keep loading
+                observer.unobserve(sentinel);
+                observer.observe(sentinel);
+            }
+        }
+    }
+
+    // Fetch the next page whenever the end of the list scrolls into view
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadMore();
+    });
+    if (nextCursor) observer.observe(sentinel);
+});
@@ -0,0 +1,43 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const buttons = {
+        voted: '<i class="bi bi-check-circle"></i> Voted (Click to Unvote)',
+        notVoted: '<i class="bi bi-arrow-up-circle"></i> Upvote'
+    };
+
+    function showState(form, state) {
+        const button = form.querySelector('button[type="submit"]');
+        form.action = state.voted ? form.dataset.unvoteUrl : form.dataset.voteUrl;
+        button.innerHTML = state.voted ? buttons.voted : buttons.notVoted;
+        button.classList.toggle('btn-outline-success', state.voted);
+        button.classList.toggle('btn-outline-primary', !state.voted);
+
+        const badge = document.querySelector(`[data-proposal-votes="${state.proposal}"]`);
+        if (badge) {
+            badge.dataset.count = state.vote_count;
+            badge.textContent = `${state.vote_count} votes`;
+        }
+    }
+
+    document.querySelectorAll('.proposal-vote-form').forEach(form => {
+        form.addEventListener('submit', async function(event) {
+            event.preventDefault();
+            const button = form.querySelector('button[type="submit"]');
+            button.disabled = true;
+            try {
+                const response = await fetch(form.action, {
+                    method: 'POST',
+                    body: new FormData(form),
+                    headers: {'X-Requested-With': 'XMLHttpRequest'}
+                });
+                if (!response.ok) throw new Error(`Vote failed with ${response.status}`);
+                showState(form, await response.json());
+            } catch (error) {
+                console.error('Vote error:', error);
+                // Fall back to a normal submit, which reloads with a message
+                form.submit();
+            } finally {
+                button.disabled = false;
+            }
+        });
+    });
+});
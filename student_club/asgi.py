@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_club.settings')
+# Serve the read-heavy club pages from their async views (clubs.async_views)
+os.environ.setdefault('CLUB_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
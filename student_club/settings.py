@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'clubs.instrumentation.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +56,8 @@ ROOT_URLCONF = 'student_club.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, with render time reported by clubs.instrumentation
+        'BACKEND': 'clubs.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,10 +80,45 @@ WSGI_APPLICATION = 'student_club.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        # A file rather than the shared in-memory database, so tests that
+        # write from several threads see SQLite's real locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# High-concurrency SQLite, for many simultaneous writers such as during an
+# election. WAL lets reads carry on while a write is in progress, IMMEDIATE
+# transactions take the write lock up front so waiting writers queue on the
+# busy timeout instead of failing, and connections are kept between
+# requests. Opt in with SQLITE_HIGH_CONCURRENCY=1 in production; it is off
+# otherwise so manage.py and test runs leave the database file's journal
+# mode alone.
+SQLITE_HIGH_CONCURRENCY = os.environ.get('SQLITE_HIGH_CONCURRENCY', '0') == '1'
+
+# Times clubs.db.retry_write runs a vote or membership write again after
+# "database is locked"
+SQLITE_WRITE_RETRIES = 0
+
+if SQLITE_HIGH_CONCURRENCY:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds to wait for the write lock (SQLite's busy timeout)
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-65536;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
+    })
+    SQLITE_WRITE_RETRIES = 4
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -127,6 +165,36 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Club search backend: 'index' keeps an in-memory fuzzy index in each process,
+# 'fts' ranks matches by BM25 with the SQLite FTS5 table and re-ranks the
+# first page of hits with the index's fuzzy scorers
+CLUB_SEARCH_BACKEND = 'index'
+
+# Background jobs (clubs.jobs): run them on a small thread pool inside each
+# web process; `manage.py run_jobs` can run them out of process as well
+JOBS_RUN_IN_PROCESS = True
+JOBS_WORKERS = 2
+JOBS_MAX_QUEUED = 100
+
+# Carries live vote tallies to the club event streams (clubs.live); the local
+# broker only reaches streams served by the same process
+CLUB_LIVE_BROKER = 'clubs.live.LocalBroker'
+
+# Route club search, the club list's AJAX requests, proposal lists, poll
+# results and club event streams to the async views in clubs.async_views;
+# asgi.py turns this on
+CLUB_ASYNC_VIEWS = os.environ.get('CLUB_ASYNC_VIEWS') == '1'
+
+# Request timings (clubs.instrumentation): the share of requests that get a
+# Server-Timing header, and where timed requests slower than
+# CLUB_SLOW_REQUEST_MS are logged as JSON lines; an empty path turns the log off
+CLUB_TIMING_SAMPLE_RATE = float(os.environ.get('CLUB_TIMING_SAMPLE_RATE', '1' if DEBUG else '0.1'))
+CLUB_SLOW_REQUEST_MS = int(os.environ.get('CLUB_SLOW_REQUEST_MS', '500'))
+CLUB_SLOW_LOG = os.environ.get('CLUB_SLOW_LOG', str(BASE_DIR / 'logs' / 'slow_requests.jsonl'))
+
+# Turns the slow-request log off while the tests run
+TEST_RUNNER = 'student_club.test_runner.TestRunner'
+
 # Authentication settings
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    The default test runner, with the slow-request log turned off.
+
+    Tests that check the log point CLUB_SLOW_LOG at a temporary file
+    themselves; nothing else writes to the project's logs directory.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._no_slow_log = override_settings(CLUB_SLOW_LOG='')
+        self._no_slow_log.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._no_slow_log.disable()
+        super().teardown_test_environment(**kwargs)